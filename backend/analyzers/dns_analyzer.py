@@ -1,13 +1,29 @@
+import asyncio
 import checkdmarc
 import dns.resolver
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Optional
+from config import settings
 from api.models import ModuleResult, SeverityLevel
+from core import aio, dns_cache
+from core.deadline import Deadline, budget, timeout_result
+from core.process_pool import ProcessPool
 
+# checkdmarc tourne dans des processus dédiés : ses timeouts par signaux Unix y fonctionnent, et un
+# appel trop long est tué au lieu de fuir dans un thread
+checkdmarc_pool = ProcessPool(
+    size=settings.CHECKDMARC_PROCESSES,
+    max_tasks=settings.CHECKDMARC_MAX_TASKS,
+    preload=["checkdmarc"],
+)
+CHECKDMARC_TIMEOUT = 35
+# Temps gardé en réserve pour la vérification de secours si checkdmarc n'aboutit pas
+FALLBACK_RESERVE = 5
 
-def _check_dnskey(domain: str):
+
+async def _check_dnskey(domain: str, deadline: Optional[Deadline] = None):
     #Vérifie s'il y a des enregistrements DNSKEY (= DNSSEC activé), None si la requête échoue
     try:
-        dns.resolver.resolve(domain, 'DNSKEY', lifetime=5)
+        await dns_cache.resolve_async(domain, 'DNSKEY', lifetime=budget(deadline, 5))
         return True
     except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
         return False  # le DNS répond clairement qu'il n'y a pas de DNSKEY
@@ -15,49 +31,73 @@ def _check_dnskey(domain: str):
         return None  # requête échouée, on ne peut pas conclure
 
 
-def _fallback_dns_check(domain: str) -> dict:
-    #Vérification DNS basique via dnspython quand checkdmarc timeout
-    result = {'spf': {'valid': False}, 'dmarc': {'valid': False, 'record': None}, 'dnssec': _check_dnskey(domain), 'mx': {'hosts': []}}
-    try:
-        txts = dns.resolver.resolve(domain, 'TXT', lifetime=5)
-        for r in txts:
-            if 'v=spf1' in str(r).lower():
-                result['spf']['valid'] = True
-    except Exception:
-        pass
+async def _resolve_or_none(qname: str, rdtype: str, deadline: Optional[Deadline]):
+    # Réponse DNS, ou None si la requête échoue (le secours ne conclut que sur ce qu'il voit)
     try:
-        dmrcs = dns.resolver.resolve(f'_dmarc.{domain}', 'TXT', lifetime=5)
-        for r in dmrcs:
-            if 'v=dmarc1' in str(r).lower():
-                result['dmarc']['valid'] = True
-                result['dmarc']['record'] = str(r).strip('"')
+        return await dns_cache.resolve_async(qname, rdtype, lifetime=budget(deadline, 5))
     except Exception:
-        pass
-    try:
-        mxs = dns.resolver.resolve(domain, 'MX', lifetime=5)
+        return None
+
+
+async def _fallback_dns_check(domain: str, deadline: Optional[Deadline] = None) -> dict:
+    #Vérification DNS basique via dnspython quand checkdmarc timeout (requêtes lancées en parallèle)
+    dnssec, txts, dmrcs, mxs = await asyncio.gather(
+        _check_dnskey(domain, deadline),
+        _resolve_or_none(domain, 'TXT', deadline),
+        _resolve_or_none(f'_dmarc.{domain}', 'TXT', deadline),
+        _resolve_or_none(domain, 'MX', deadline),
+    )
+    result = {'spf': {'valid': False}, 'dmarc': {'valid': False, 'record': None}, 'dnssec': dnssec, 'mx': {'hosts': []}}
+    for r in txts or []:
+        if 'v=spf1' in str(r).lower():
+            result['spf']['valid'] = True
+    for r in dmrcs or []:
+        if 'v=dmarc1' in str(r).lower():
+            result['dmarc']['valid'] = True
+            result['dmarc']['record'] = str(r).strip('"')
+    if mxs is not None:
         result['mx']['hosts'] = [str(mx.exchange).rstrip('.') for mx in mxs]
-    except Exception:
-        pass
     return result
 
 
-def analyze_dns(domain: str) -> ModuleResult:
+def _run_checkdmarc(domain: str, timeout: float = CHECKDMARC_TIMEOUT) -> dict:
+    #Analyse checkdmarc dans le pool de processus. skip_tls : le STARTTLS des MX est déjà testé par
+    #email_analyzer, et ses connexions SMTP (jusqu'à ~35 s) garderaient les processus occupés
+    return checkdmarc_pool.run(checkdmarc.check_domains, [domain], timeout=timeout, skip_tls=True)
+
+
+def _checkdmarc_timeout(deadline: Optional[Deadline]) -> float:
+    # Délai laissé à checkdmarc : ce qui reste du scan, moins la réserve pour le secours
+    if deadline is None:
+        return CHECKDMARC_TIMEOUT
+    return min(CHECKDMARC_TIMEOUT, deadline.remaining() - FALLBACK_RESERVE)
+
+
+async def analyze_dns_async(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
     try:
-        executor = ThreadPoolExecutor(max_workers=1)
-        # skip_tls sinon checkdmarc plante dans un thread (il utilise des signaux Unix
-        # pour ses timeouts), et le STARTTLS est déjà testé dans email_analyzer
-        future = executor.submit(checkdmarc.check_domains, [domain], skip_tls=True)
-        try:
-            result = future.result(timeout=35)
-        except FuturesTimeoutError:
-            executor.shutdown(wait=False)
-            result = _fallback_dns_check(domain)
-        executor.shutdown(wait=False)
+        result = None
+        fallback = None
+        checkdmarc_timeout = _checkdmarc_timeout(deadline)
+        if checkdmarc_timeout >= 1:
+            try:
+                # le pool de processus est bloquant : l'attente se fait dans un thread de l'exécuteur
+                result = await aio.blocking(_run_checkdmarc, domain, checkdmarc_timeout)
+            except (TimeoutError, aio.ExecutorSaturated) as e:
+                fallback = f"checkdmarc indisponible : {e}"
+        if result is None:
+            fallback = fallback or "plus de temps pour checkdmarc"
+            result = await _fallback_dns_check(domain, deadline)
+            if deadline is not None and deadline.expired:
+                # même le secours n'a pas eu le temps d'aboutir : résultats non fiables
+                return timeout_result("DNS Security")
         
         # Initialiser le score
         score = 0
         details = {}
         recommendations = []
+        if fallback is not None:
+            # vérification de secours, moins complète que checkdmarc : le rapport le signale
+            details['verification'] = f"secours dnspython ({fallback})"
         
         # 1. Vérifier SPF (25 points)
         if result.get('spf', {}).get('valid'):
@@ -98,7 +138,7 @@ def analyze_dns(domain: str) -> ModuleResult:
         if dnssec_ok is False:
             # checkdmarc rate parfois le test DNSSEC (timeout), on revérifie
             # les DNSKEY nous-même avant d'enlever les points
-            recheck = _check_dnskey(domain)
+            recheck = await _check_dnskey(domain, deadline)
             if recheck is not None:
                 dnssec_ok = recheck
 
@@ -159,6 +199,8 @@ def analyze_dns(domain: str) -> ModuleResult:
         )
     
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            return timeout_result("DNS Security")
         return ModuleResult(
             module_name="DNS Security",
             status="error",
@@ -167,3 +209,7 @@ def analyze_dns(domain: str) -> ModuleResult:
             details={"error": str(e)},
             recommendations=["Vérifier la configuration DNS du domaine"]
         )
+
+
+def analyze_dns(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_dns_async(domain, deadline))
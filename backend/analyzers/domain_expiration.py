@@ -1,10 +1,11 @@
 
-import whois  # type: ignore[import-untyped]
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timezone
 from typing import Optional
 from dateutil import parser as dateutil_parser
 from api.models import ModuleResult, SeverityLevel
+from core import aio, whois_cache, whois_dispatch
+from core.domains import registered_domain
+from core.deadline import Deadline
 
 
 def _parse_expiration_date(raw) -> Optional[datetime]:
@@ -32,32 +33,43 @@ def _parse_expiration_date(raw) -> Optional[datetime]:
     return raw.astimezone(timezone.utc)
 
 
-def analyze_domain_expiration(domain: str) -> ModuleResult:
+async def analyze_domain_expiration_async(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
     #Vérifie la date d'expiration du domaine via WHOIS
     try:
         details = {}
         recommendations = []
 
-        executor = ThreadPoolExecutor(max_workers=1)
-        future = executor.submit(whois.whois, domain)
-        try:
-            w = future.result(timeout=15)
-        except FuturesTimeoutError:
-            executor.shutdown(wait=False)
-            return ModuleResult(
-                module_name="Domain Expiration",
-                status="warning",
-                severity=SeverityLevel.MEDIUM,
-                score=50,
-                details={"expiration_date": "non disponible (timeout WHOIS)"},
-                recommendations=[
-                    "Impossible de vérifier automatiquement la date d'expiration de votre nom de domaine. "
-                    "Connectez-vous à l'interface de votre registrar (OVH, Gandi, Namecheap…) "
-                    "pour vérifier et renouveler votre domaine manuellement."
-                ]
-            )
-        executor.shutdown(wait=False)
-        expiration_date = _parse_expiration_date(w.expiration_date)
+        # Les dates d'expiration changent une fois par an : WHOIS interrogé seulement si le cache
+        # (par domaine enregistré) n'a rien d'encore valide
+        registered = registered_domain(domain)
+        entry = await whois_cache.cache.get(registered)
+        if entry is not None:
+            details["whois_verifie_le"] = entry.fetched_at.strftime("%Y-%m-%d")
+        else:
+            try:
+                # file du serveur de registre : débit et connexions bornés, nouvelles tentatives
+                w = await whois_dispatch.dispatcher.lookup(registered, deadline)
+            except (TimeoutError, whois_dispatch.WhoisUnavailable, aio.ExecutorSaturated) as e:
+                if isinstance(e, TimeoutError):
+                    reason = "timeout WHOIS"
+                elif isinstance(e, whois_dispatch.WhoisUnavailable):
+                    reason = str(e)
+                else:
+                    reason = "serveur d'audit surchargé"
+                return ModuleResult(
+                    module_name="Domain Expiration",
+                    status="warning",
+                    severity=SeverityLevel.MEDIUM,
+                    score=50,
+                    details={"expiration_date": f"non disponible ({reason})"},
+                    recommendations=[
+                        "Impossible de vérifier automatiquement la date d'expiration de votre nom de domaine. "
+                        "Connectez-vous à l'interface de votre registrar (OVH, Gandi, Namecheap…) "
+                        "pour vérifier et renouveler votre domaine manuellement."
+                    ]
+                )
+            entry = await whois_cache.cache.put(registered, _parse_expiration_date(w.expiration_date), w.registrar)
+        expiration_date = entry.expiration_date
 
         if expiration_date is None:
             return ModuleResult(
@@ -79,8 +91,8 @@ def analyze_domain_expiration(domain: str) -> ModuleResult:
         details["expiration_date"] = expiration_date.strftime("%Y-%m-%d")
         details["days_remaining"] = days_remaining
 
-        if w.registrar:
-            details["registrar"] = w.registrar
+        if entry.registrar:
+            details["registrar"] = entry.registrar
 
         if days_remaining < 0:
             score = 0
@@ -155,3 +167,7 @@ def analyze_domain_expiration(domain: str) -> ModuleResult:
                 "Impossible d'interroger le WHOIS pour ce domaine."
             ]
         )
+
+
+def analyze_domain_expiration(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_domain_expiration_async(domain, deadline))
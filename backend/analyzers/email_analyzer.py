@@ -1,11 +1,56 @@
 
-import dns.resolver
-import smtplib
+import asyncio
 import socket
+from typing import Optional
 from api.models import ModuleResult, SeverityLevel
+from core import aio, dns_cache, mail_policies, smtp_probe
+from core.deadline import Deadline, budget, timeout_result
 
 
-def analyze_email(domain: str) -> ModuleResult:
+def _policy_details(policies: mail_policies.MailPolicies, details: dict, recommendations: list):
+    #DKIM, MTA-STS et TLS-RPT : informatifs, sans effet sur le score
+    dkim = policies.dkim
+    if dkim is None:
+        details["dkim"] = "non évalué"
+    elif dkim.selectors:
+        details["dkim"] = f"trouvé (sélecteurs : {', '.join(dkim.selectors)})"
+    elif not dkim.complete:
+        details["dkim"] = f"non trouvé (recherche interrompue, {dkim.tested} sélecteurs testés)"
+    else:
+        details["dkim"] = "aucun sélecteur courant trouvé"
+        recommendations.append(
+            "Nous n'avons pas trouvé de signature DKIM pour votre domaine parmi les sélecteurs courants. "
+            "Sans elle, vos emails sont plus souvent classés en spam et plus faciles à usurper. "
+            "Vérifiez auprès de votre prestataire de messagerie que la signature DKIM est activée."
+        )
+
+    mta_sts = policies.mta_sts
+    if mta_sts is None:
+        details["mta_sts"] = "absent" if policies.evaluated else "non évalué"
+    elif "error" in mta_sts:
+        details["mta_sts"] = f"enregistrement présent, {mta_sts['error']}"
+        recommendations.append(
+            "Votre domaine annonce une politique MTA-STS (chiffrement obligatoire des emails reçus) "
+            "mais le fichier de politique est introuvable ou invalide : elle n'est pas appliquée. "
+            "Demandez à votre prestataire de publier le fichier https://mta-sts.<votre-domaine>/.well-known/mta-sts.txt."
+        )
+    else:
+        details["mta_sts"] = f"activé (mode {mta_sts['mode']})"
+        if mta_sts["mx_non_couverts"]:
+            details["mta_sts_mx_non_couverts"] = mta_sts["mx_non_couverts"]
+            recommendations.append(
+                "Certains de vos serveurs de messagerie ne sont pas déclarés dans votre politique MTA-STS "
+                f"({', '.join(mta_sts['mx_non_couverts'])}). En mode « enforce », les emails qui leur sont "
+                "destinés peuvent être refusés. Mettez la politique à jour avec la liste de vos serveurs MX."
+            )
+
+    if policies.tls_rpt is not None:
+        details["tls_rpt"] = "activé"
+    else:
+        details["tls_rpt"] = "absent" if policies.evaluated else "non évalué"
+
+
+async def analyze_email_async(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
     #Analyse la sécurité de la configuration email (MX, anti-spam, STARTTLS)
     try:
         score = 0
@@ -14,12 +59,14 @@ def analyze_email(domain: str) -> ModuleResult:
 
         # 1. Vérifier les enregistrements MX (25 points)
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
+            mx_records = await dns_cache.resolve_async(domain, 'MX', lifetime=budget(deadline, 5))
             mx_hosts = [str(mx.exchange).rstrip('.') for mx in mx_records]
             score += 25
             details["mx_records"] = f"{len(mx_hosts)} serveur(s) trouvé(s)"
             details["mx_hosts"] = mx_hosts
         except Exception:
+            if deadline is not None and deadline.expired:
+                return timeout_result("Email Security")  # pas de réponse faute de temps, pas faute de MX
             mx_hosts = []
             details["mx_records"] = "aucun enregistrement MX"
             recommendations.append(
@@ -28,6 +75,9 @@ def analyze_email(domain: str) -> ModuleResult:
                 "Contactez votre hébergeur pour configurer la messagerie."
             )
 
+        # DKIM, MTA-STS et TLS-RPT (requêtes DNS via le cache partagé) pendant la sonde SMTP
+        policies = asyncio.ensure_future(mail_policies.check(domain, mx_hosts, deadline)) if mx_hosts else None
+
         # 2. Redondance MX - plusieurs serveurs (20 points)
         mx_primary = mx_hosts[0].lower() if mx_hosts else ''
         is_m365 = 'protection.outlook.com' in mx_primary
@@ -68,52 +118,59 @@ def analyze_email(domain: str) -> ModuleResult:
                 details["smtp_banner"] = "géré par Google Workspace"
                 details["banner_exposure"] = "discret (géré par Google)"
             else:
-                # Tenter une connexion SMTP sur port 25, puis 587 en fallback
-                smtp_connected = False
-                for port in [25, 587]:
-                    try:
-                        smtp = smtplib.SMTP(mx_hosts[0], port, timeout=10)
-                        # La bannière est dans la réponse initiale du serveur
-                        banner = smtp.getwelcome()
-                        if isinstance(banner, bytes):
-                            banner = banner.decode('utf-8', errors='ignore')
-                        banner = str(banner).strip()
-                        smtp.ehlo()
-
-                        # Vérifier STARTTLS (30 points)
-                        if smtp.has_extn('STARTTLS'):
-                            score += 30
-                            details["starttls"] = f"supporté (port {port})"
-                        else:
-                            details["starttls"] = "non supporté"
-                            recommendations.append(
-                                "Les emails reçus sur votre serveur ne sont pas chiffrés pendant leur transit. "
-                                "Le contenu de vos emails professionnels pourrait être intercepté par un tiers. "
-                                "Contactez votre prestataire de messagerie pour activer le chiffrement STARTTLS."
-                            )
-
-                        # Vérifier bannière (25 points)
-                        details["smtp_banner"] = banner
-                        keywords_verbose = ["version", "ubuntu", "debian", "centos", "postfix"]
-                        is_verbose = any(kw in banner.lower() for kw in keywords_verbose)
-                        if not is_verbose:
-                            score += 25
-                            details["banner_exposure"] = "discret"
-                        else:
-                            details["banner_exposure"] = "trop d'informations exposées"
-                            recommendations.append(
-                                "Votre serveur de messagerie révèle des informations techniques à quiconque le contacte "
-                                "(version du logiciel, système d'exploitation). Ces informations aident les pirates à "
-                                "cibler des failles connues. Demandez à votre administrateur système de masquer ces données."
-                            )
-
-                        smtp.quit()
-                        smtp_connected = True
-                        break
-                    except Exception:
-                        continue
-
-                if not smtp_connected:
+                # Tous les serveurs MX, ports 25 et 587, en même temps : le premier serveur qui répond suffit.
+                # Résultats gardés par serveur : les MX hébergés partagés ne sont contactés qu'une fois
+                smtp_skipped = None
+                try:
+                    smtp = await smtp_probe.cache.probe(mx_hosts, deadline)
+                except TimeoutError:
+                    smtp, smtp_skipped = None, "délai du scan dépassé"
+                except aio.ExecutorSaturated:
+                    smtp, smtp_skipped = None, "serveur d'audit surchargé"
+                smtp_connected = smtp is not None
+                if smtp_connected:
+                    port, banner = smtp.port, smtp.banner
+                    details["smtp_host"] = smtp.host
+
+                    # Vérifier STARTTLS (30 points)
+                    if smtp.starttls:
+                        score += 30
+                        details["starttls"] = f"supporté (port {port})"
+                    else:
+                        details["starttls"] = "non supporté"
+                        recommendations.append(
+                            "Les emails reçus sur votre serveur ne sont pas chiffrés pendant leur transit. "
+                            "Le contenu de vos emails professionnels pourrait être intercepté par un tiers. "
+                            "Contactez votre prestataire de messagerie pour activer le chiffrement STARTTLS."
+                        )
+
+                    # Vérifier bannière (25 points)
+                    details["smtp_banner"] = banner
+                    keywords_verbose = ["version", "ubuntu", "debian", "centos", "postfix"]
+                    is_verbose = any(kw in banner.lower() for kw in keywords_verbose)
+                    if not is_verbose:
+                        score += 25
+                        details["banner_exposure"] = "discret"
+                    else:
+                        details["banner_exposure"] = "trop d'informations exposées"
+                        recommendations.append(
+                            "Votre serveur de messagerie révèle des informations techniques à quiconque le contacte "
+                            "(version du logiciel, système d'exploitation). Ces informations aident les pirates à "
+                            "cibler des failles connues. Demandez à votre administrateur système de masquer ces données."
+                        )
+
+                if smtp_skipped:
+                    # essai non abouti côté scanner : rien ne dit que les ports sont filtrés
+                    smtp_unreachable = True
+                    details["starttls"] = f"non évalué ({smtp_skipped})"
+                    details["smtp_banner"] = "non évalué"
+                    details["banner_exposure"] = "non évalué"
+                    recommendations.append(
+                        "La vérification du chiffrement STARTTLS et de la bannière SMTP n'a pas pu aboutir "
+                        f"pendant ce scan ({smtp_skipped}) : ces critères sont exclus du calcul du score. "
+                        "Relancez le scan pour les évaluer."
+                    )
+                elif not smtp_connected:
                     smtp_unreachable = True
                     details["starttls"] = "non évalué (ports 25 et 587 inaccessibles depuis le scanner)"
                     details["smtp_banner"] = "non évalué"
@@ -129,6 +186,9 @@ def analyze_email(domain: str) -> ModuleResult:
             details["starttls"] = "non applicable"
             details["smtp_banner"] = "non applicable"
 
+        if policies is not None:
+            _policy_details(await policies, details, recommendations)
+
         # Ports SMTP filtrés : impossible de vérifier STARTTLS et la bannière (55 pts),
         # on note sur les 45 points vérifiables et on remet sur 100
         if smtp_unreachable:
@@ -159,6 +219,8 @@ def analyze_email(domain: str) -> ModuleResult:
         )
 
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            return timeout_result("Email Security")
         return ModuleResult(
             module_name="Email Security",
             status="error",
@@ -169,3 +231,7 @@ def analyze_email(domain: str) -> ModuleResult:
                 "Impossible d'analyser la configuration email du domaine"
             ]
         )
+
+
+def analyze_email(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_email_async(domain, deadline))
@@ -1,78 +1,50 @@
 
-import requests
+from typing import Optional
 from config import settings
 from api.models import ModuleResult, SeverityLevel
+from core import aio, hibp, urlhaus
+from core.deadline import Deadline, budget, timeout_result
 
-HIBP_BASE_URL = "https://haveibeenpwned.com/api/v3"
-HIBP_HEADERS = {"user-agent": "EON-Security-Audit/1.0"}
 
-
-def _check_domain_as_breach_source(domain: str) -> tuple[list[dict], int]:
-    #Vérifie si le domaine est lui-même source d'une fuite connue (endpoint public, sans clé)
+async def _check_domain_as_breach_source(domain: str, deadline: Optional[Deadline] = None) -> tuple[list[dict], int]:
+    #Vérifie si le domaine est lui-même source d'une fuite connue (catalogue public HIBP, en cache)
     #Retourne (fuites_trouvées, total_fuites_vérifiées)
-    response = requests.get(
-        f"{HIBP_BASE_URL}/breaches",
-        headers=HIBP_HEADERS,
-        timeout=settings.REQUEST_TIMEOUT,
-    )
-    response.raise_for_status()
-
-    all_breaches = response.json()
-    total = len(all_breaches)
-    parts = domain.lower().split(".")
-    # Cherche les 2 et 3 dernières parties pour couvrir .co.uk, .com.br, etc.
-    candidates = {".".join(parts[-2:])}
-    if len(parts) >= 3:
-        candidates.add(".".join(parts[-3:]))
-    matched = [
-        b for b in all_breaches
-        if any(c in b.get("Domain", "").lower() for c in candidates)
-    ]
-    return matched, total
-
-
-def _check_emails_in_breaches(domain: str) -> dict:
-    #Vérifie les emails @domaine dans toutes les fuites (endpoint payant, clé requise)
-    headers = {**HIBP_HEADERS, "hibp-api-key": settings.HIBP_API_KEY}
-    response = requests.get(
-        f"{HIBP_BASE_URL}/breacheddomain/{domain}",
-        headers=headers,
-        timeout=settings.REQUEST_TIMEOUT,
-    )
-
-    if response.status_code == 404:
-        return {}
-    if response.status_code == 401:
-        raise PermissionError("Clé API HIBP invalide ou expirée")
-    if response.status_code == 429:
-        raise ConnectionError("Limite de requêtes HIBP atteinte (10 req/min)")
-
-    response.raise_for_status()
-    return response.json()
-
-
-def _check_urlhaus(domain: str) -> dict:
-    #Vérifie si le domaine distribue des malwares (URLhaus/abuse.ch — gratuit, sans clé)
-    try:
-        response = requests.post(
-            "https://urlhaus-api.abuse.ch/v1/host/",
-            data={"host": domain},
-            timeout=10,
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception:
-        return {"query_status": "unavailable"}
+    return await hibp.catalog.lookup(domain, deadline)
+
+
+async def _check_emails_in_breaches(domain: str, deadline: Optional[Deadline] = None) -> dict:
+    #Vérifie les emails @domaine dans toutes les fuites (endpoint payant, clé requise), via la file HIBP partagée
+    return await hibp.domain_search.search(domain, settings.HIBP_API_KEY, deadline)
+
+
+async def _check_urlhaus(domain: str, deadline: Optional[Deadline] = None) -> dict:
+    #Vérifie si le domaine distribue des malwares (URLhaus/abuse.ch — gratuit, sans clé) : instantané
+    #local d'abord, API en ligne pour le détail d'un domaine listé ou en secours sans instantané
+    listed = urlhaus.feed.lookup(domain)
+    if listed is False:
+        return {"query_status": "no_results"}
+    if settings.URLHAUS_LIVE_FALLBACK:
+        try:
+            response = await aio.post(
+                "https://urlhaus-api.abuse.ch/v1/host/",
+                data={"host": domain},
+                timeout=budget(deadline, 10),
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            pass
+    return {"query_status": "is_host" if listed else "unavailable"}
 
 
-def analyze_osint_breaches(domain: str) -> ModuleResult:
+async def analyze_osint_breaches_async(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
     #Interroge Have I Been Pwned et URLhaus pour détecter les fuites et menaces liées au domaine
     try:
         details: dict = {}
         recommendations: list[str] = []
 
         # 1. Vérification gratuite HIBP : le domaine est-il lui-même source de fuite ?
-        source_breaches, total_hibp = _check_domain_as_breach_source(domain)
+        source_breaches, total_hibp = await _check_domain_as_breach_source(domain, deadline)
         details["hibp_base_verifiee"] = total_hibp
         details["source_fuite"] = len(source_breaches) > 0
 
@@ -92,21 +64,22 @@ def analyze_osint_breaches(domain: str) -> ModuleResult:
             )
 
         # 2. Vérification URLhaus (gratuit) : malwares / réputation domaine
-        urlhaus_data = _check_urlhaus(domain)
+        urlhaus_data = await _check_urlhaus(domain, deadline)
         urlhaus_status = urlhaus_data.get("query_status", "unavailable")
         urlhaus_listed = urlhaus_status == "is_host"
 
         if urlhaus_listed:
-            url_count = urlhaus_data.get("url_count", 0)
+            url_count = urlhaus_data.get("url_count")  # absent si seul l'instantané local a répondu
             blacklists = urlhaus_data.get("blacklists", {})
             details["malware_urlhaus"] = {
                 "liste": True,
-                "urls_malveillantes": url_count,
+                "urls_malveillantes": url_count if url_count is not None else "non détaillé",
                 "spamhaus_dbl": blacklists.get("spamhaus_dbl", "not listed"),
                 "surbl": blacklists.get("surbl", "not listed"),
             }
+            listed_with = f" avec {url_count} URL malveillante(s)" if url_count is not None else ""
             recommendations.append(
-                f"Domaine référencé dans URLhaus avec {url_count} URL malveillante(s). "
+                f"Domaine référencé dans URLhaus{listed_with}. "
                 "Vérifier immédiatement l'intégrité du serveur et des fichiers hébergés."
             )
         elif urlhaus_status == "no_results":
@@ -115,8 +88,20 @@ def analyze_osint_breaches(domain: str) -> ModuleResult:
             details["malware_urlhaus"] = "Indisponible"
 
         # 3. Vérification avancée HIBP : emails @domaine dans fuites (clé API requise)
+        email_data = None
         if settings.HIBP_API_KEY:
-            email_data = _check_emails_in_breaches(domain)
+            try:
+                email_data = await _check_emails_in_breaches(domain, deadline)
+            except hibp.HibpBusy as e:
+                # quota HIBP déjà réservé par d'autres scans : vérification reportée, pas d'échec du module
+                details["emails_compromis"] = "non vérifié"
+                details["hibp_attente"] = round(e.wait)
+                recommendations.append(
+                    "La recherche des adresses email dans les fuites n'a pas pu être effectuée avant la fin "
+                    f"du scan (file d'attente HIBP d'environ {round(e.wait)} s). Relancez le scan plus tard."
+                )
+
+        if email_data is not None:
             emails_count = len(email_data)
 
             all_breaches_set: set[str] = set()
@@ -145,7 +130,7 @@ def analyze_osint_breaches(domain: str) -> ModuleResult:
                         "Forcer immédiatement la réinitialisation des mots de passe, "
                         "activer le MFA et alerter les utilisateurs concernés."
                     )
-        else:
+        elif not settings.HIBP_API_KEY:
             details["emails_compromis"] = "non vérifié"
             if not source_breaches and not urlhaus_listed:
                 recommendations.append(
@@ -189,6 +174,8 @@ def analyze_osint_breaches(domain: str) -> ModuleResult:
         )
 
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            return timeout_result("OSINT Breaches")
         return ModuleResult(
             module_name="OSINT Breaches",
             status="error",
@@ -197,3 +184,7 @@ def analyze_osint_breaches(domain: str) -> ModuleResult:
             details={"error": str(e)},
             recommendations=["Impossible d'interroger Have I Been Pwned pour ce domaine."],
         )
+
+
+def analyze_osint_breaches(domain: str, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_osint_breaches_async(domain, deadline))
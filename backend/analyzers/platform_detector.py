@@ -1,20 +1,151 @@
-import requests
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+from config import settings
 from api.models import PlatformType
+from core import aio
+from core.deadline import Deadline
+from core.http_fetch import HomepageFetch, HomepageResponse
+from core.matching import PatternAutomaton
 
-def detect_platform(domain: str)-> PlatformType :
+# Empreintes des CMS, boutiques en ligne, créateurs de sites et hébergeurs, versionnées dans data/
+FINGERPRINTS_FILE = Path(__file__).parent.parent / "data" / "platform_fingerprints.json"
+
+# Poids d'un indice selon sa source : un en-tête ou un cookie propre à la plateforme est plus sûr
+# qu'un texte trouvé dans la page
+WEIGHTS = {"header": 3, "cookie": 2, "body": 1}
+# Score minimum pour que la priorité joue (un en-tête, un cookie ou deux textes) : un texte isolé
+# dans la page ne fait pas passer un CMS devant l'hébergeur reconnu à ses en-têtes
+MIN_SCORE = 2
+
+
+@dataclass(frozen=True)
+class PlatformRule:
+    platform: PlatformType
+    name: str
+    priority: int  # départage : CMS/boutique (2) avant framework (1) avant hébergeur (0)
+    headers: tuple[str, ...] = ()  # "nom" (en-tête présent) ou "nom: texte" (texte dans sa valeur)
+    cookies: tuple[str, ...] = ()  # préfixes de noms de cookies
+    body: tuple[str, ...] = ()  # textes dans le début de la page
+
+
+@dataclass(frozen=True)
+class _Clue:
+    rule: PlatformRule
+    source: str  # header, cookie ou body
+    pattern: str  # texte cherché : deux textes trouvés comptent pour deux indices
+    header: Optional[str] = None  # en-tête dont la valeur doit contenir le texte
+
+
+@dataclass
+class PlatformMatch:
+    rule: PlatformRule
+    score: int
+    clues: int
+
+
+class FingerprintEngine:
+    #Toutes les empreintes compilées une fois dans un seul automate : noms d'en-têtes, valeurs,
+    #cookies et début de page sont parcourus sans que le coût grandisse avec le nombre de règles
+
+    def __init__(self, rules: Iterable[PlatformRule], version: str = "inconnue"):
+        self.version = version
+        self.rules = tuple(rules)
+        patterns: list[tuple[str, _Clue]] = []
+        for rule in self.rules:
+            for header in rule.headers:
+                name, sep, value = header.partition(":")
+                name = name.strip().lower()
+                if sep:
+                    patterns.append((value.strip(), _Clue(rule, "header", header, name)))
+                else:
+                    # nom exact : encadré par un saut de ligne et ':' dans la liste des noms
+                    patterns.append((f"\n{name}:", _Clue(rule, "header", header)))
+            patterns += [(f"\n{cookie}", _Clue(rule, "cookie", cookie)) for cookie in rule.cookies]
+            patterns += [(text, _Clue(rule, "body", text)) for text in rule.body]
+        self._automaton: PatternAutomaton[_Clue] = PatternAutomaton(patterns)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FingerprintEngine":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            (
+                PlatformRule(
+                    PlatformType(entry["platform"]),
+                    entry["name"],
+                    int(entry.get("priority", 2)),
+                    tuple(entry.get("headers", ())),
+                    tuple(entry.get("cookies", ())),
+                    tuple(entry.get("body", ())),
+                )
+                for entry in data["platforms"]
+            ),
+            str(data.get("version", "inconnue")),
+        )
+
+    def match(self, headers, body: str) -> list[PlatformMatch]:
+        #Plateformes reconnues, la plus probable en premier
+        items = [(name.lower(), value) for name, value in headers.items()]
+        clues: set[_Clue] = set()
+        names = "\n" + "".join(f"{name}:\n" for name, _ in items)
+        clues.update(c for c in self._automaton.search(names) if c.source == "header" and c.header is None)
+        for name, value in items:
+            clues.update(c for c in self._automaton.search(value) if c.header == name)
+        cookies = "\n" + "\n".join(_cookie_names(headers))
+        clues.update(c for c in self._automaton.search(cookies) if c.source == "cookie")
+        clues.update(c for c in self._automaton.search(body) if c.source == "body")
+
+        matches: dict[PlatformRule, PlatformMatch] = {}
+        for clue in clues:
+            found = matches.setdefault(clue.rule, PlatformMatch(clue.rule, 0, 0))
+            found.score += WEIGHTS[clue.source]
+            found.clues += 1
+        order = {rule: i for i, rule in enumerate(self.rules)}
+        return sorted(
+            matches.values(),
+            key=lambda m: (m.score < MIN_SCORE, -m.rule.priority, -m.score, order[m.rule]),
+        )
+
+
+def _cookie_names(headers) -> list[str]:
+    # Set-Cookie peut être répété : httpx.Headers les donne tous, un dict seulement le dernier
+    get_list = getattr(headers, "get_list", None)
+    values = get_list("set-cookie") if get_list is not None else [headers.get("set-cookie") or headers.get("Set-Cookie") or ""]
+    return [value.split("=", 1)[0].strip().lower() for value in values if "=" in value]
+
+
+@lru_cache(maxsize=4)
+def load_fingerprints(path: str) -> FingerprintEngine:
+    return FingerprintEngine.load(path)
+
+
+def _engine() -> FingerprintEngine:
+    # Base configurée (PLATFORM_FINGERPRINTS), sinon celle livrée avec le projet
+    return load_fingerprints(settings.PLATFORM_FINGERPRINTS or str(FINGERPRINTS_FILE))
+
+
+def identify(page: HomepageResponse) -> PlatformType:
+    # Seul le début de la page est lu : les marqueurs sont dans <head> et les premières balises.
+    # Coupé en octets (UTF-8), un caractère coupé en deux est ignoré.
+    limit = settings.PLATFORM_BODY_BYTES
+    body = page.text[:limit].encode("utf-8")[:limit].decode("utf-8", errors="ignore")
+    matches = _engine().match(page.headers, body)
+    return matches[0].rule.platform if matches else PlatformType.CUSTOM
+
+
+async def detect_platform_async(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None)-> PlatformType :
     try :
-        url=f"https://{domain}"
-        headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        reponse = requests.get(url, headers=headers, timeout=10)
-        if 'shopify' in reponse.text.lower():
-            return PlatformType.SHOPIFY
-        if 'wix' in reponse.text.lower():
-            return PlatformType.WIX
-        if 'wp-content' in reponse.text.lower():
-            return PlatformType.WORDPRESS
-        return PlatformType.CUSTOM
+        # page d'accueil partagée par le scan, sinon on la récupère nous-même
+        page = await (homepage or HomepageFetch(domain, verified_only=True, deadline=deadline)).get_async()
+        if page is None:
+            return PlatformType.UNKNOWN
+        return identify(page)
     except Exception as e:
         return PlatformType.UNKNOWN
 
+
+def detect_platform(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None)-> PlatformType :
+    return aio.run(detect_platform_async(domain, homepage, deadline))
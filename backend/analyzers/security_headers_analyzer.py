@@ -1,36 +1,20 @@
-
-import requests
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from typing import Optional
 from api.models import ModuleResult, SeverityLevel
+from core import aio
+from core.deadline import Deadline, timeout_result
+from core.http_fetch import HomepageFetch
 
 
-def analyze_security_headers(domain: str) -> ModuleResult:
+async def analyze_security_headers_async(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None) -> ModuleResult:
     #Analyse les en-têtes HTTP de sécurité (OWASP / ANSSI)
     try:
         score = 0
         details = {}
         recommendations = []
 
-        # Requête HTTP(S) — 3 tentatives : HTTPS, HTTPS sans vérif cert, HTTP
-        headers = None
-        for url, verify in [
-            (f"https://{domain}", True),
-            (f"https://{domain}", False),
-            (f"http://{domain}", True),
-        ]:
-            try:
-                response = requests.get(
-                    url,
-                    timeout=10,
-                    headers={"User-Agent": "Mozilla/5.0"},
-                    allow_redirects=True,
-                    verify=verify,
-                )
-                headers = response.headers
-                break
-            except Exception:
-                continue
+        # Page d'accueil partagée par le scan (sinon 3 tentatives : HTTPS, HTTPS sans vérif cert, HTTP)
+        page = await (homepage or HomepageFetch(domain, deadline=deadline)).get_async()
+        headers = page.headers if page is not None else None
 
         if headers is None:
             raise ConnectionError("Impossible de joindre le domaine en HTTP ni HTTPS")
@@ -119,6 +103,8 @@ def analyze_security_headers(domain: str) -> ModuleResult:
         )
 
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            return timeout_result("Security Headers")
         return ModuleResult(
             module_name="Security Headers",
             status="error",
@@ -129,3 +115,7 @@ def analyze_security_headers(domain: str) -> ModuleResult:
                 "Impossible d'analyser les en-têtes HTTP du domaine"
             ]
         )
+
+
+def analyze_security_headers(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_security_headers_async(domain, homepage, deadline))
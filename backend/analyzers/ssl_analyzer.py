@@ -1,43 +1,31 @@
-import ssl
-import socket
+import asyncio
 import datetime
-import requests
-from cryptography import x509
+from typing import Optional
 from api.models import ModuleResult, SeverityLevel
+from core import aio, tls_probe
+from core.cert_cache import cache as cert_cache
+from core.deadline import Deadline, timeout_result
+from core.http_fetch import HomepageFetch
 
 
-def _fetch_expiry_ignore_validation(domain: str) -> datetime.datetime:
-    #Récupère la date d'expiration d'un certificat rejeté (connexion sans validation du certificat)
-    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    with socket.create_connection((domain, 443), timeout=10) as sock:
-        with ctx.wrap_socket(sock, server_hostname=domain) as ssock:
-            der_cert = ssock.getpeercert(binary_form=True)
-    return x509.load_der_x509_certificate(der_cert).not_valid_after_utc
-
-
-def _invalid_cert_result(domain: str, error: ssl.SSLCertVerificationError) -> ModuleResult:
-    #Le handshake a rejeté le certificat : on essaie de dire pourquoi (expiré, auto-signé...)
-    # verify_message contient la raison ("certificate has expired", "self-signed certificate"...)
-    reason = getattr(error, "verify_message", "")
-    if not reason:
-        reason = str(error)
+def _invalid_cert_result(probe: tls_probe.TlsProbe) -> ModuleResult:
+    #La validation a rejeté le certificat : on dit pourquoi (expiré, auto-signé...)
+    # verify_error reprend les termes d'OpenSSL ("certificate has expired", "self-signed certificate"...)
+    reason = probe.verify_error
     is_expired = "expired" in reason.lower()
 
     details = {
         "certificate": "EXPIRÉ" if is_expired else "INVALIDE",
         "verification_error": reason,
     }
-    try:
-        expiry = _fetch_expiry_ignore_validation(domain)
+    if probe.cert is not None:
+        # la chaîne vient du même handshake : pas de seconde connexion pour lire la date
+        expiry = probe.cert.not_after
         details["expiration_date"] = expiry.strftime("%Y-%m-%d")
         days_expired = (datetime.datetime.now(datetime.timezone.utc) - expiry).days
         if days_expired >= 0:
             is_expired = True
             details["certificate"] = f"EXPIRÉ depuis {days_expired} jour(s)"
-    except Exception:
-        pass  # tant pis, on garde juste le message du handshake
 
     if is_expired:
         recommendation = (
@@ -63,44 +51,63 @@ def _invalid_cert_result(domain: str, error: ssl.SSLCertVerificationError) -> Mo
     )
 
 
-def analyze_ssl(domain: str) -> ModuleResult:
+async def analyze_ssl_async(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None) -> ModuleResult:
     #Analyse la configuration SSL/TLS d'un domaine
     try:
         score = 0
         details = {}
         recommendations = []
 
-        # 1. Récupérer le certificat SSL et vérifier TLS
-        # Un certificat expiré ou invalide fait échouer le handshake, on le traite
-        # à part pour donner un vrai diagnostic au lieu d'une erreur générique
-        context = ssl.create_default_context()
-        try:
-            with socket.create_connection((domain, 443), timeout=10) as sock:
-                with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                    cert = ssock.getpeercert()
-
-                    # 4. Vérifier la version TLS (doit être ici, dans le with)
-                    tls_version = ssock.version()
-                    details['tls_version'] = tls_version
-                    if tls_version in ['TLSv1.2', 'TLSv1.3']:
-                        score += 30
-                        details['tls_status'] = 'Sécurisé'
-                    else:
-                        details['tls_status'] = 'Version obsolète'
-                        recommendations.append(
-                            f"Votre site utilise un protocole de chiffrement dépassé ({tls_version}) "
-                            "qui peut être contourné par des pirates. Les données échangées avec vos visiteurs "
-                            "ne sont pas correctement protégées. "
-                            "Contactez votre hébergeur ou prestataire technique pour mettre à jour la configuration TLS (version 1.2 minimum requise)."
-                        )
-        except ssl.SSLCertVerificationError as e:
-            return _invalid_cert_result(domain, e)
+        # 1. Un seul handshake, sans validation, donne le certificat, la chaîne et les paramètres
+        # négociés ; la validation est faite ensuite en local. Les versions du protocole acceptées
+        # sont testées en même temps, une connexion par version.
+        # Un certificat expiré ou invalide est traité à part pour donner un vrai diagnostic
+        probe, versions = await asyncio.gather(
+            tls_probe.probe_async(domain, deadline),
+            tls_probe.enumerate_versions(domain, deadline),
+        )
+        if probe.verify_error:
+            return _invalid_cert_result(probe)
+        tls_version = probe.version
+
+        # 4. Vérifier la version TLS
+        details['tls_version'] = tls_version
+        if tls_version in ['TLSv1.2', 'TLSv1.3']:
+            score += 30
+            details['tls_status'] = 'Sécurisé'
+        else:
+            details['tls_status'] = 'Version obsolète'
+            recommendations.append(
+                f"Votre site utilise un protocole de chiffrement dépassé ({tls_version}) "
+                "qui peut être contourné par des pirates. Les données échangées avec vos visiteurs "
+                "ne sont pas correctement protégées. "
+                "Contactez votre hébergeur ou prestataire technique pour mettre à jour la configuration TLS (version 1.2 minimum requise)."
+            )
+
+        if probe.verify_inconclusive:
+            # validation locale en échec et second avis injoignable : ni pénalisé ni déclaré valide
+            details['verification_chaine'] = f"non concluante ({probe.verify_inconclusive}), revérifiée au prochain scan"
+        details['cipher'] = f"{probe.cipher} ({probe.bits} bits)"
+        details['chaine'] = probe.cert.chain
+        # Même certificat présenté par d'autres domaines déjà scannés (CDN, hébergement mutualisé) :
+        # leur nombre seulement, ces domaines sont les cibles d'autres clients (liste : vue admin)
+        shared = [d for d in cert_cache.domains(probe.cert.fingerprint) if d != domain.lower().rstrip(".")]
+        if shared:
+            details['certificat_partage'] = len(shared)
+        details['protocoles'] = {
+            version: {True: "accepté", False: "refusé", None: "non testé"}[accepted]
+            for version, accepted in versions.items()
+        }
+        legacy = [v for v in tls_probe.LEGACY_PROTOCOLS if versions.get(v)]
+        if legacy and tls_version in ['TLSv1.2', 'TLSv1.3']:
+            recommendations.append(
+                f"Votre serveur accepte encore des versions obsolètes du protocole ({', '.join(legacy)}) "
+                "en plus des versions récentes. Un attaquant pourrait forcer leur utilisation. "
+                "Demandez à votre hébergeur de les désactiver (TLS 1.2 minimum)."
+            )
 
         # 2. Vérifier la date d'expiration
-        expiry_date_str = cert['notAfter']
-        expiry_date = datetime.datetime.strptime(
-            expiry_date_str, '%b %d %H:%M:%S %Y %Z'
-        ).replace(tzinfo=datetime.timezone.utc)
+        expiry_date = probe.cert.not_after
         days_remaining = (expiry_date - datetime.datetime.now(datetime.timezone.utc)).days
 
         if days_remaining > 30:
@@ -123,17 +130,18 @@ def analyze_ssl(domain: str) -> ModuleResult:
             )
 
         # 3. Vérifier HSTS
+        # Page d'accueil partagée par le scan ; HSTS n'a de sens que sur un HTTPS au certificat valide
         hsts_unverifiable = False
-        try:
-            response = requests.get(f"https://{domain}", timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-            if 'Strict-Transport-Security' in response.headers:
+        page = await (homepage or HomepageFetch(domain, verified_only=True, deadline=deadline)).get_async()
+        if page is not None and page.verified:
+            if 'Strict-Transport-Security' in page.headers:
                 score += 30
-                hsts_value = response.headers['Strict-Transport-Security']
+                hsts_value = page.headers['Strict-Transport-Security']
                 details['hsts'] = f'Activé ({hsts_value})'
             else:
                 details['hsts'] = 'Désactivé'
                 # Recommandation gérée par Security Headers pour éviter la duplication dans le rapport
-        except Exception:
+        else:
             hsts_unverifiable = True
             details['hsts'] = 'non évalué (site injoignable en HTTPS depuis le scanner)'
 
@@ -172,6 +180,8 @@ def analyze_ssl(domain: str) -> ModuleResult:
         )
 
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            return timeout_result("SSL/TLS Security")
         return ModuleResult(
             module_name="SSL/TLS Security",
             status="error",
@@ -180,3 +190,7 @@ def analyze_ssl(domain: str) -> ModuleResult:
             details={"error": str(e)},
             recommendations=["Vérifier que le site utilise HTTPS"]
         )
+
+
+def analyze_ssl(domain: str, homepage: Optional[HomepageFetch] = None, deadline: Optional[Deadline] = None) -> ModuleResult:
+    return aio.run(analyze_ssl_async(domain, homepage, deadline))
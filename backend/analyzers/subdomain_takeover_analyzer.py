@@ -1,87 +1,87 @@
-import dns.resolver
-import requests
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+from config import settings
 from api.models import ModuleResult, SeverityLevel
+from core import aio, ct_index, dns_cache
+from core.deadline import Deadline, budget
+from core.matching import PatternAutomaton, SuffixTrie
 
-# Signatures de services vulnérables au subdomain takeover
+# Base de signatures des services vulnérables au subdomain takeover, versionnée dans data/
 # Source : https://github.com/EdOverflow/can-i-take-over-xyz
-VULNERABLE_SIGNATURES = {
-    "github": {
-        "cname_contains": ["github.io"],
-        "body_contains": ["There isn't a GitHub Pages site here"],
-        "service": "GitHub Pages",
-    },
-    "heroku": {
-        "cname_contains": ["herokuapp.com", "herokudns.com"],
-        "body_contains": ["No such app", "herokucdn.com/error-pages/no-such-app"],
-        "service": "Heroku",
-    },
-    "shopify": {
-        "cname_contains": ["myshopify.com", "shopify.com"],
-        "body_contains": ["Sorry, this shop is currently unavailable"],
-        "service": "Shopify",
-    },
-    "fastly": {
-        "cname_contains": ["fastly.net"],
-        "body_contains": ["Fastly error: unknown domain"],
-        "service": "Fastly",
-    },
-    "pantheon": {
-        "cname_contains": ["pantheonsite.io"],
-        "body_contains": ["The gods are wise", "404 error unknown site"],
-        "service": "Pantheon",
-    },
-    "wordpress": {
-        "cname_contains": ["wordpress.com"],
-        "body_contains": ["Do you want to register"],
-        "service": "WordPress.com",
-    },
-    "ghost": {
-        "cname_contains": ["ghost.io"],
-        "body_contains": ["The thing you were looking for is no longer here"],
-        "service": "Ghost",
-    },
-    "surge": {
-        "cname_contains": ["surge.sh"],
-        "body_contains": ["project not found"],
-        "service": "Surge.sh",
-    },
-    "azure": {
-        "cname_contains": [
-            "azurewebsites.net",
-            "cloudapp.net",
-            "trafficmanager.net",
-            "blob.core.windows.net",
-        ],
-        "body_contains": ["404 Web Site not found"],
-        "service": "Microsoft Azure",
-    },
-    "aws_s3": {
-        "cname_contains": ["s3.amazonaws.com", "s3-website"],
-        "body_contains": ["NoSuchBucket", "The specified bucket does not exist"],
-        "service": "Amazon S3",
-    },
-    "unbounce": {
-        "cname_contains": ["unbouncepages.com"],
-        "body_contains": ["The requested URL was not found on this server"],
-        "service": "Unbounce",
-    },
-    "sendgrid": {
-        "cname_contains": ["sendgrid.net"],
-        "body_contains": [],
-        "service": "SendGrid",
-    },
-    "hubspot": {
-        "cname_contains": ["hubspot.net", "hs-sites.com"],
-        "body_contains": ["does not exist in our system"],
-        "service": "HubSpot",
-    },
-    "zendesk": {
-        "cname_contains": ["zendesk.com"],
-        "body_contains": ["Help Center Closed"],
-        "service": "Zendesk",
-    },
-}
+SIGNATURES_FILE = Path(__file__).parent.parent / "data" / "takeover_signatures.json"
+
+
+@dataclass(frozen=True)
+class Signature:
+    service: str
+    cname: tuple[str, ...]  # suffixes DNS des CNAME du service
+    fingerprints: tuple[str, ...]  # textes de la page d'erreur d'un service orphelin
+
+
+class SignatureDatabase:
+    #Signatures compilées : un trie de suffixes pour les CNAME et un automate multi-motifs
+    #pour les pages, le coût par sous-domaine ne grandit pas avec le nombre de services
+
+    def __init__(self, signatures: Iterable[Signature], version: str = "inconnue"):
+        self.version = version
+        self.signatures = tuple(signatures)
+        self._cnames: SuffixTrie[Signature] = SuffixTrie()
+        for signature in self.signatures:
+            for suffix in signature.cname:
+                self._cnames.add(suffix, signature)
+        self._bodies: PatternAutomaton[Signature] = PatternAutomaton(
+            (fingerprint, signature) for signature in self.signatures for fingerprint in signature.fingerprints
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SignatureDatabase":
+        #Format du projet ({"version", "services": [...]}) ou fingerprints.json de can-i-take-over-xyz
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return cls((_upstream_signature(entry) for entry in data if entry.get("vulnerable")), "can-i-take-over-xyz")
+        return cls(
+            (
+                Signature(entry["service"], tuple(entry["cname"]), tuple(entry.get("fingerprints", ())))
+                for entry in data["services"]
+            ),
+            str(data.get("version", "inconnue")),
+        )
+
+    def match_cname(self, cname: str) -> Optional[Signature]:
+        return self._cnames.match(cname)
+
+    def body_matches(self, body: str, signature: Signature) -> bool:
+        return signature in self._bodies.search(body)
+
+    def body_matcher(self, signature: Signature) -> Callable[[str], bool]:
+        #Fonction à appeler sur chaque morceau de page reçu : True dès que l'empreinte du service est vue
+        search = self._bodies.stream()
+        return lambda chunk: signature in search.feed(chunk)
+
+
+def _upstream_signature(entry: dict) -> Signature:
+    # Les services détectés par NXDOMAIN n'ont pas d'empreinte de page exploitable ici
+    fingerprint = entry.get("fingerprint") or ""
+    fingerprints = () if entry.get("nxdomain") or fingerprint == "NXDOMAIN" else (fingerprint,)
+    return Signature(entry["service"], tuple(entry.get("cname", ())), fingerprints)
+
+
+@lru_cache(maxsize=4)
+def load_signatures(path: str) -> SignatureDatabase:
+    return SignatureDatabase.load(path)
+
+
+def _signatures() -> SignatureDatabase:
+    # Base configurée (TAKEOVER_SIGNATURES), sinon celle livrée avec le projet
+    return load_signatures(settings.TAKEOVER_SIGNATURES or str(SIGNATURES_FILE))
+
 
 # Sous-domaines communs à énumérer (ANSSI recommande une surface minimale exposée)
 COMMON_SUBDOMAINS = [
@@ -91,45 +91,156 @@ COMMON_SUBDOMAINS = [
     "status", "help", "connect", "git", "ci", "assets", "static", "media",
 ]
 
+# Délai max de l'énumération (borné en plus par l'échéance du scan)
+TAKEOVER_TIMEOUT = 45
+# Délai max d'une requête CNAME (borné en plus par l'échéance du scan)
+DNS_TIMEOUT = 5
+# Labels aléatoires résolus avant l'énumération pour détecter un joker DNS (*.domaine)
+WILDCARD_PROBES = 3
+
+
+@lru_cache(maxsize=8)
+def load_wordlist(path: str) -> tuple[str, ...]:
+    #Liste de sous-domaines à tester : un label par ligne, lignes vides et commentaires (#) ignorés,
+    #doublons retirés en gardant l'ordre (les labels les plus courants en tête de fichier)
+    with open(path, encoding="utf-8") as f:
+        labels = (line.strip().lower().rstrip(".") for line in f)
+        return tuple(dict.fromkeys(label for label in labels if label and not label.startswith("#")))
 
-def _resolve_cname(subdomain: str) -> str | None:
+
+def _default_wordlist() -> tuple[str, ...]:
+    # Fichier configuré (TAKEOVER_WORDLIST), sinon la liste intégrée
+    if settings.TAKEOVER_WORDLIST:
+        return load_wordlist(settings.TAKEOVER_WORDLIST)
+    return tuple(COMMON_SUBDOMAINS)
+
+
+def _candidate_labels(domain: str, wordlist: Optional[Iterable[str]] = None) -> tuple[tuple[str, ...], int]:
+    #Labels à tester : d'abord les sous-domaines vus dans les certificats (index CT hors ligne, s'il
+    #est configuré), puis la liste de mots. Renvoie aussi le nombre de labels venus de l'index.
+    labels = tuple(wordlist) if wordlist is not None else _default_wordlist()
+    index = ct_index.open_index(settings.CT_INDEX_PATH)
+    if index is None:
+        return labels, 0
+    seen = index.subdomains(domain, limit=settings.CT_INDEX_MAX_NAMES)
+    return tuple(dict.fromkeys((*seen, *labels))), len(seen)
+
+
+async def _resolve_cname(subdomain: str, deadline: Optional[Deadline] = None) -> str | None:
+    # CNAME du sous-domaine, None s'il n'en a pas ; TimeoutError si l'échéance du scan est atteinte.
+    # Cache des balayages : les milliers de labels candidats n'évincent pas le cache DNS partagé.
+    lifetime = budget(deadline, DNS_TIMEOUT)
     try:
-        answers = dns.resolver.resolve(subdomain, "CNAME")
+        answers = await dns_cache.resolve_sweep_async(subdomain, "CNAME", lifetime=lifetime)
         return str(answers[0].target).rstrip(".")
     except Exception:
         return None
 
 
-def _check_http_body(subdomain: str, signatures: list[str]) -> bool:
-    if not signatures:
+async def _check_http_body(subdomain: str, signature: Signature, timeout: float = 5) -> bool:
+    if not signature.fingerprints:
         return False
     for scheme in ["https", "http"]:
+        # page lue en flux et passée à l'automate au fil de l'eau : on coupe dès que l'empreinte
+        # est trouvée, et jamais plus de PROBE_MAX_BYTES octets
+        matched = _signatures().body_matcher(signature)
         try:
-            response = requests.get(
+            await aio.get_text(
                 f"{scheme}://{subdomain}",
-                timeout=5,
+                settings.PROBE_MAX_BYTES,
+                until=matched,
+                timeout=timeout,
                 headers={"User-Agent": "Mozilla/5.0"},
-                allow_redirects=True,
+                follow_redirects=True,
             )
-            body = response.text.lower()
-            if any(sig.lower() in body for sig in signatures):
+            if matched(""):
                 return True
         except Exception:
             continue
     return False
 
 
-def _find_vulnerable_signature(cname: str):
+def _find_vulnerable_signature(cname: str) -> Optional[Signature]:
     # Retourne la signature du service vulnérable correspondant au CNAME, ou None
-    cname_lower = cname.lower()
-    for sig in VULNERABLE_SIGNATURES.values():
-        for pattern in sig["cname_contains"]:
-            if pattern in cname_lower:
-                return sig
-    return None
+    return _signatures().match_cname(cname)
+
 
+def _random_label() -> str:
+    return f"eon-{uuid.uuid4().hex[:12]}"
 
-def _run_takeover_check(domain: str) -> ModuleResult:
+
+async def _detect_wildcard(domain: str, deadline: Optional[Deadline] = None) -> frozenset[str]:
+    #Cibles CNAME du joker DNS du domaine (vide s'il n'y en a pas) : des labels aléatoires, qui ne
+    #peuvent pas exister, ne résolvent tous que si la zone a un enregistrement *.domaine
+    cnames = await asyncio.gather(*(_resolve_cname(f"{_random_label()}.{domain}", deadline) for _ in range(WILDCARD_PROBES)))
+    if any(cname is None for cname in cnames):
+        return frozenset()
+    return frozenset(cname.lower() for cname in cnames)
+
+
+# Sous-domaine dont le CNAME est celui du joker : regroupé dans une seule entrée *.domaine
+WILDCARD = "wildcard"
+
+
+async def _probe_subdomain(fqdn: str, deadline: Optional[Deadline] = None, wildcard: frozenset[str] = frozenset()):
+    # (cname, signature, orphelin) pour un sous-domaine, None s'il n'a pas de CNAME externe
+    cname = await _resolve_cname(fqdn, deadline)
+    if cname is None:
+        return None
+    if cname.lower() in wildcard:
+        return WILDCARD  # même réponse que le joker : pas de sonde HTTP en double
+    signature = _find_vulnerable_signature(cname)
+    if signature is None:
+        return cname, None, False
+    # CNAME vers un service connu vulnérable, on vérifie si le service est orphelin
+    is_orphan = await _check_http_body(fqdn, signature, timeout=budget(deadline, 5))
+    return cname, signature, is_orphan
+
+
+@dataclass
+class Sweep:
+    # Résultat d'une énumération
+    found: list[tuple[str, tuple]]  # sous-domaines avec CNAME externe, dans l'ordre de la liste
+    tested: int
+    complete: bool
+    wildcard_matches: int = 0  # sous-domaines qui ne font que refléter le joker DNS
+
+
+async def _enumerate(domain: str, labels: Iterable[str], timeout: float, deadline: Optional[Deadline] = None,
+                     concurrency: int = 200, wildcard: frozenset[str] = frozenset()) -> Sweep:
+    #Sonde les sous-domaines avec au plus `concurrency` sondes en vol (un pool de workers qui
+    #tirent dans la liste : la mémoire ne dépend pas de sa taille). S'arrête à `timeout`.
+    labels = iter(enumerate(labels))
+    found: list[tuple[int, str, tuple]] = []
+    tested = 0
+    wildcard_matches = 0
+
+    async def worker():
+        nonlocal tested, wildcard_matches
+        for index, label in labels:  # itérateur partagé : chaque label n'est pris qu'une fois
+            fqdn = f"{label}.{domain}"
+            try:
+                probe = await _probe_subdomain(fqdn, deadline, wildcard)
+            except TimeoutError:
+                return  # plus de temps pour la sonde HTTP : on s'arrête là
+            tested += 1
+            if probe == WILDCARD:
+                wildcard_matches += 1
+            elif probe is not None:
+                found.append((index, fqdn, probe))
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    _, pending = await asyncio.wait(workers, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    complete = not pending and next(labels, None) is None
+    ordered = [(fqdn, probe) for _, fqdn, probe in sorted(found, key=lambda f: f[0])]
+    return Sweep(ordered, tested, complete, wildcard_matches)
+
+
+async def _run_takeover_check(domain: str, wordlist: Optional[Iterable[str]] = None,
+                              deadline: Optional[Deadline] = None) -> ModuleResult:
     try:
         score = 100  # on part de 100, on déduit selon les risques trouvés
         details = {}
@@ -138,22 +249,47 @@ def _run_takeover_check(domain: str) -> ModuleResult:
         dangling_subdomains = []
         checked = 0
 
-        for sub in COMMON_SUBDOMAINS:
-            fqdn = f"{sub}.{domain}"
-            cname = _resolve_cname(fqdn)
+        labels, from_ct = _candidate_labels(domain, wordlist)
+        try:
+            timeout = budget(deadline, TAKEOVER_TIMEOUT)
+        except TimeoutError:
+            return _interrupted_result(0, len(labels), "échéance du scan déjà atteinte")
+        started = time.monotonic()
+
+        # Joker DNS : évalué une seule fois (entrée *.domaine), les sous-domaines qui ne font que
+        # le refléter sont ensuite écartés sans sonde HTTP
+        try:
+            wildcard = await _detect_wildcard(domain, deadline)
+        except TimeoutError:
+            wildcard = frozenset()  # échéance atteinte : l'énumération qui suit s'arrêtera aussi
+        probes = []
+        if wildcard:
+            details["wildcard_dns"] = sorted(wildcard)
+            try:
+                wildcard_probe = await _probe_subdomain(f"{_random_label()}.{domain}", deadline)
+            except TimeoutError:
+                wildcard_probe = None
+            if wildcard_probe is not None:
+                probes.append((f"*.{domain}", wildcard_probe))
 
-            if cname is None:
-                continue  # sous-domaine sans CNAME externe, pas de risque
+        remaining = max(0.0, timeout - (time.monotonic() - started))
+        sweep = await _enumerate(domain, labels, remaining, deadline, settings.TAKEOVER_CONCURRENCY, wildcard)
+        probes += sweep.found
+        tested, complete = sweep.tested, sweep.complete
+        stop_reason = _stop_reason(timeout)
+        if not complete and not probes:
+            return _interrupted_result(tested, len(labels), stop_reason)
+        if wildcard:
+            details["regroupes_joker"] = sweep.wildcard_matches
 
+        for fqdn, probe in probes:
             checked += 1  # sous-domaine avec CNAME vers un service tiers
-            signature = _find_vulnerable_signature(cname)
+            cname, signature, is_orphan = probe
 
             if signature is None:
                 continue
 
-            # CNAME vers un service connu vulnérable, on vérifie si le service est orphelin
-            service_name = signature["service"]
-            is_orphan = _check_http_body(fqdn, signature["body_contains"])
+            service_name = signature.service
 
             entry = {
                 "subdomain": fqdn,
@@ -182,10 +318,18 @@ def _run_takeover_check(domain: str) -> ModuleResult:
                 )
 
         score = max(0, score)
-        details["subdomains_testes"] = len(COMMON_SUBDOMAINS)
+        details["subdomains_testes"] = tested
+        details["subdomains_prevus"] = len(labels)
+        if from_ct:
+            details["sous_domaines_ct"] = from_ct
+        details["signatures_version"] = _signatures().version
+        details["duree_enumeration"] = round(time.monotonic() - started, 1)
         details["avec_cname_externe"] = checked
         details["vulnerable"] = vulnerable_subdomains
         details["at_risk"] = dangling_subdomains
+        if not complete:
+            # délai atteint, mais des risques ont déjà été trouvés : on les rapporte
+            details["enumeration"] = f"partielle ({tested}/{len(labels)} sous-domaines testés, {stop_reason})"
 
         # Recommandation générale ANSSI
         if not recommendations:
@@ -233,18 +377,35 @@ def _run_takeover_check(domain: str) -> ModuleResult:
         )
 
 
-def detect_subdomain_takeover(domain: str) -> ModuleResult:
-    executor = ThreadPoolExecutor(max_workers=1)
-    future = executor.submit(_run_takeover_check, domain)
-    try:
-        return future.result(timeout=45)
-    except FuturesTimeoutError:
-        executor.shutdown(wait=False)
-        return ModuleResult(
-            module_name="Subdomain Takeover",
-            status="warning",
-            severity=SeverityLevel.MEDIUM,
-            score=50,
-            details={"warning": "analyse interrompue (timeout 45s)"},
-            recommendations=["L'analyse des sous-domaines n'a pas pu aboutir dans le délai imparti."],
-        )
\ No newline at end of file
+def _stop_reason(timeout: float) -> str:
+    # Ce qui a arrêté l'énumération : son propre délai, ou l'échéance du scan quand elle tombait avant
+    if timeout < TAKEOVER_TIMEOUT:
+        return f"échéance du scan, {timeout:.0f}s disponibles"
+    return f"timeout {TAKEOVER_TIMEOUT}s"
+
+
+def _interrupted_result(tested: int, planned: int, reason: str) -> ModuleResult:
+    # Délai atteint avant la fin de l'énumération, sans risque trouvé sur la partie testée
+    return ModuleResult(
+        module_name="Subdomain Takeover",
+        status="warning",
+        severity=SeverityLevel.MEDIUM,
+        score=50,
+        details={
+            "warning": f"analyse interrompue ({reason})",
+            "subdomains_testes": tested,
+            "subdomains_prevus": planned,
+        },
+        recommendations=["L'analyse des sous-domaines n'a pas pu aboutir dans le délai imparti."],
+    )
+
+
+async def detect_subdomain_takeover_async(domain: str, deadline: Optional[Deadline] = None,
+                                          wordlist: Optional[Iterable[str]] = None) -> ModuleResult:
+    # L'énumération s'arrête d'elle-même au délai et annule les sondes encore en vol
+    return await _run_takeover_check(domain, wordlist, deadline)
+
+
+def detect_subdomain_takeover(domain: str, deadline: Optional[Deadline] = None,
+                              wordlist: Optional[Iterable[str]] = None) -> ModuleResult:
+    return aio.run(detect_subdomain_takeover_async(domain, deadline, wordlist))
@@ -4,6 +4,7 @@ from datetime import datetime
 from enum import Enum
 import re
 import dns.resolver
+from core import dns_cache
 
 
 class PlatformType(str, Enum):
@@ -11,6 +12,43 @@ class PlatformType(str, Enum):
     WIX = "wix"
     WORDPRESS = "wordpress"
     SQUARESPACE = "squarespace"
+    JOOMLA = "joomla"
+    DRUPAL = "drupal"
+    PRESTASHOP = "prestashop"
+    MAGENTO = "magento"
+    WOOCOMMERCE = "woocommerce"
+    WEBFLOW = "webflow"
+    GHOST = "ghost"
+    TYPO3 = "typo3"
+    SPIP = "spip"
+    HUBSPOT = "hubspot"
+    WEEBLY = "weebly"
+    JIMDO = "jimdo"
+    GODADDY = "godaddy"
+    BIGCOMMERCE = "bigcommerce"
+    WIZISHOP = "wizishop"
+    SHOPWARE = "shopware"
+    OPENCART = "opencart"
+    CONCRETE = "concrete"
+    CRAFT = "craft"
+    ODOO = "odoo"
+    DUDA = "duda"
+    SITE123 = "site123"
+    EMONSITE = "emonsite"
+    SITECORE = "sitecore"
+    AEM = "aem"
+    SALESFORCE = "salesforce"
+    NEXTJS = "nextjs"
+    NUXT = "nuxt"
+    GATSBY = "gatsby"
+    HUGO = "hugo"
+    JEKYLL = "jekyll"
+    LARAVEL = "laravel"
+    NETLIFY = "netlify"
+    VERCEL = "vercel"
+    GITHUB_PAGES = "github-pages"
+    HEROKU = "heroku"
+    CLOUDFLARE_PAGES = "cloudflare-pages"
     CUSTOM = "custom"
     UNKNOWN = "unknown"
 
@@ -23,6 +61,33 @@ class SeverityLevel(str, Enum):
     INFO = "info"
 
 
+def normalize_domain(v: str) -> str:
+    #Nettoie la saisie (schéma, www., slash final) et vérifie le format du domaine
+    v = v.lower().strip()
+    v = v.replace('https://', '').replace('http://', '').replace('www.', '')
+    v = v.rstrip('/')
+
+    pattern = r'^([a-z0-9]([a-z0-9\-]{0,61}[a-z0-9])?\.)+[a-z]{2,}$'
+    if not re.match(pattern, v):
+        raise ValueError("Format de domaine invalide (ex: example.com)")
+    return v
+
+
+def ensure_domain_resolves(v: str) -> None:
+    #Vérifie que le domaine résout en DNS (A, ou à défaut MX)
+    try:
+        dns_cache.resolve(v, 'A')
+    except dns.resolver.NXDOMAIN:
+        raise ValueError(f"Le domaine '{v}' n'existe pas")
+    except dns.resolver.NoAnswer:
+        try:
+            dns_cache.resolve(v, 'MX')
+        except Exception:
+            raise ValueError(f"Le domaine '{v}' ne résout pas")
+    except Exception:
+        raise ValueError(f"Impossible de résoudre le domaine '{v}'")
+
+
 class ScanRequest(BaseModel):
     domain: str = Field(..., description="Domaine à scanner (ex: example.com)")
     include_subdomains: bool = Field(default=True, description="Inclure scan des sous-domaines")
@@ -30,28 +95,8 @@ class ScanRequest(BaseModel):
     @field_validator('domain')
     @classmethod
     def validate_domain(cls, v):
-        v = v.lower().strip()
-        v = v.replace('https://', '').replace('http://', '').replace('www.', '')
-        v = v.rstrip('/')
-
-        # Vérifier le format
-        pattern = r'^([a-z0-9]([a-z0-9\-]{0,61}[a-z0-9])?\.)+[a-z]{2,}$'
-        if not re.match(pattern, v):
-            raise ValueError("Format de domaine invalide (ex: example.com)")
-
-        # Vérifier que le domaine résout en DNS
-        try:
-            dns.resolver.resolve(v, 'A')
-        except dns.resolver.NXDOMAIN:
-            raise ValueError(f"Le domaine '{v}' n'existe pas")
-        except dns.resolver.NoAnswer:
-            try:
-                dns.resolver.resolve(v, 'MX')
-            except Exception:
-                raise ValueError(f"Le domaine '{v}' ne résout pas")
-        except Exception:
-            raise ValueError(f"Impossible de résoudre le domaine '{v}'")
-
+        v = normalize_domain(v)
+        ensure_domain_resolves(v)
         return v
 
 
@@ -91,6 +136,7 @@ class RecommendationItem(BaseModel):
 class ScanResponse(BaseModel):
     success: bool
     scan_id: str
+    status: Optional[str] = None  # "queued", "running", "done", "error"
     result: Optional[ScanResult] = None
     error: Optional[str] = None
 
@@ -105,4 +151,39 @@ class HistoryItem(BaseModel):
 
 class HistoryResponse(BaseModel):
     scans: List[HistoryItem]
-    total: int
\ No newline at end of file
+    total: int
+
+
+class BatchScanRequest(BaseModel):
+    domains: List[str] = Field(..., min_length=1, description="Domaines à scanner (ex: [\"example.com\", \"example.org\"])")
+
+
+class BatchCreatedResponse(BaseModel):
+    batch_id: str
+    total: int
+    rejected: List[str] = []
+
+
+class BatchItem(BaseModel):
+    domain: str
+    status: str  # "queued", "running", "done", "error"
+    scan_id: Optional[str] = None
+    platform: Optional[PlatformType] = None
+    overall_score: Optional[int] = None
+    critical_issues: Optional[int] = None
+    high_issues: Optional[int] = None
+    error: Optional[str] = None
+    finished_at: Optional[datetime] = None
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    created_at: datetime
+    total: int
+    queued: int
+    running: int
+    done: int
+    failed: int
+    offset: int
+    limit: int
+    results: List[BatchItem]
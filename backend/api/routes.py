@@ -1,134 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends  # type: ignore
+from fastapi import APIRouter, HTTPException, Depends, File, Query, UploadFile  # type: ignore
 from fastapi.responses import StreamingResponse  # type: ignore
 from fastapi.concurrency import run_in_threadpool  # type: ignore
 from sqlalchemy.orm import Session  # type: ignore
 from io import BytesIO
-import uuid
 import json
 import socket
-from datetime import datetime
 
 from api.models import (
     ScanRequest,
     ScanResponse,
-    ScanResult,
     PlatformType,
-    ModuleResult,
-    SeverityLevel,
+    BatchScanRequest,
+    BatchCreatedResponse,
+    BatchStatusResponse,
 )
+from config import settings
 from database import get_db
 from pdf_report import generate_pdf
-from db_models import ScanRecord, ModuleRecord
-from analyzers.platform_detector import detect_platform
-from analyzers.dns_analyzer import analyze_dns
-from analyzers.ssl_analyzer import analyze_ssl
-from analyzers.security_headers_analyzer import analyze_security_headers
-from analyzers.email_analyzer import analyze_email
-from analyzers.domain_expiration import analyze_domain_expiration
-from analyzers.subdomain_takeover_analyzer import detect_subdomain_takeover
-from analyzers.osint_breaches import analyze_osint_breaches
+from db_models import ScanRecord, ScanJobRecord, BatchRecord
+from core.scanner import ScanRun, build_scan_result
+from core import jobs
+from core.cert_cache import cache as cert_cache
+from core.storage import result_to_db, db_to_result
+from core.batch import batch_status, create_batch, parse_domains_file, prepare_domains
 
 
 router = APIRouter(tags=["Audit"])
 
 
-def _result_to_db(scan_id: str, result: ScanResult) -> ScanRecord:
-    record = ScanRecord(
-        scan_id=scan_id,
-        domain=result.domain,
-        platform=result.platform.value,
-        timestamp=result.timestamp,
-        overall_score=result.overall_score,
-        summary=result.summary,
-        critical_issues=result.critical_issues,
-        high_issues=result.high_issues,
-        medium_issues=result.medium_issues,
-        low_issues=result.low_issues,
-        modules=[
-            ModuleRecord(
-                scan_id=scan_id,
-                module_name=m.module_name,
-                status=m.status,
-                severity=m.severity.value,
-                score=m.score,
-                details=m.details,
-                recommendations=m.recommendations,
-            )
-            for m in result.modules
-        ],
-    )
-    return record
-
-
-def _db_to_result(record: ScanRecord) -> ScanResult:
-    return ScanResult(
-        scan_id=record.scan_id,
-        domain=record.domain,
-        platform=PlatformType(record.platform),
-        timestamp=record.timestamp,
-        overall_score=record.overall_score,
-        summary=record.summary,
-        critical_issues=record.critical_issues,
-        high_issues=record.high_issues,
-        medium_issues=record.medium_issues,
-        low_issues=record.low_issues,
-        modules=[
-            ModuleResult(
-                module_name=m.module_name,
-                status=m.status,
-                severity=SeverityLevel(m.severity),
-                score=m.score,
-                details=m.details,
-                recommendations=m.recommendations,
-            )
-            for m in record.modules
-        ],
-    )
-
-
-@router.post("/scan", response_model=ScanResponse)
+@router.post("/scan", response_model=ScanResponse, status_code=202)
 def start_scan(request: ScanRequest, db: Session = Depends(get_db)):
-    # pas de async ici : les analyseurs sont synchrones et bloqueraient
-    # le serveur pendant tout le scan (FastAPI met les def dans un threadpool)
-    try:
-        scan_id = str(uuid.uuid4())
-
-        platform = detect_platform(request.domain)
-        dns_result = analyze_dns(request.domain)
-        ssl_result = analyze_ssl(request.domain)
-        security_headers_result = analyze_security_headers(request.domain)
-        email_result = analyze_email(request.domain)
-        takeover_result = detect_subdomain_takeover(request.domain)
-        expiration_result = analyze_domain_expiration(request.domain)
-        osint_result = analyze_osint_breaches(request.domain)
-
-        all_modules = [
-            dns_result, ssl_result, security_headers_result,
-            email_result, takeover_result, expiration_result, osint_result,
-        ]
-        overall_score = sum(m.score for m in all_modules) // len(all_modules)
-
-        result = ScanResult(
-            scan_id=scan_id,
-            domain=request.domain,
-            platform=platform,
-            timestamp=datetime.now(),
-            overall_score=overall_score,
-            modules=all_modules,
-            summary="Scan complété.",
-            critical_issues=sum(1 for m in all_modules if m.severity == SeverityLevel.CRITICAL),
-            high_issues=sum(1 for m in all_modules if m.severity == SeverityLevel.HIGH),
-            medium_issues=sum(1 for m in all_modules if m.severity == SeverityLevel.MEDIUM),
-            low_issues=sum(1 for m in all_modules if m.severity == SeverityLevel.LOW),
-        )
-
-        db.add(_result_to_db(scan_id, result))
-        db.commit()
-
-        return ScanResponse(success=True, scan_id=scan_id, result=result)
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors du scan: {str(e)}")
+    # Le scan part dans la file (table scan_jobs) et tourne en arrière-plan :
+    # on répond tout de suite, le client suit l'avancement via GET /scan/{scan_id}
+    job = jobs.queue.submit(db, request.domain)
+    return ScanResponse(success=True, scan_id=job.scan_id, status=job.state)
 
 
 @router.post("/scan/stream")
@@ -140,45 +45,30 @@ async def start_scan_stream(request: ScanRequest, db: Session = Depends(get_db))
             yield f"data: {json.dumps({'error': f'Domaine introuvable : {request.domain}'})}\n\n"
             return
 
-        scan_id = str(uuid.uuid4())
-        platform = await run_in_threadpool(detect_platform, request.domain)
-
-        steps = [
-            ("DNS Security", analyze_dns),
-            ("SSL/TLS Security", analyze_ssl),
-            ("Security Headers", analyze_security_headers),
-            ("Email Security", analyze_email),
-            ("Subdomain Takeover", detect_subdomain_takeover),
-            ("Domain Expiration", analyze_domain_expiration),
-            ("OSINT Breaches", analyze_osint_breaches),
-        ]
-        total = len(steps)
-        modules = []
-
-        for i, (name, fn) in enumerate(steps):
-            yield f"data: {json.dumps({'step': name, 'progress': i, 'total': total})}\n\n"
-            result = await run_in_threadpool(fn, request.domain)
-            modules.append(result)
-
-        overall_score = sum(m.score for m in modules) // len(modules)
-        scan_result = ScanResult(
-            scan_id=scan_id,
-            domain=request.domain,
-            platform=platform,
-            timestamp=datetime.now(),
-            overall_score=overall_score,
-            modules=modules,
-            summary="Scan complété.",
-            critical_issues=sum(1 for m in modules if m.severity == SeverityLevel.CRITICAL),
-            high_issues=sum(1 for m in modules if m.severity == SeverityLevel.HIGH),
-            medium_issues=sum(1 for m in modules if m.severity == SeverityLevel.MEDIUM),
-            low_issues=sum(1 for m in modules if m.severity == SeverityLevel.LOW),
-        )
-        db.add(_result_to_db(scan_id, scan_result))
+        # Tous les modules démarrent en même temps : chaque résultat part dès que
+        # son module termine, sans attendre les plus lents
+        run = ScanRun(request.domain)
+        total = len(run.futures)
+        results = {}
+
+        try:
+            async for name, result in run.completed():
+                results[name] = result
+                event = {'step': name, 'progress': len(results), 'total': total, 'module': result.model_dump(mode="json")}
+                yield f"data: {json.dumps(event)}\n\n"
+        except BaseException:
+            # client déconnecté : le scan continue et sera quand même enregistré
+            jobs.save_in_background(run)
+            raise
+
+        platform = await run_in_threadpool(run.platform)
+        modules = [results[name] for name in run.futures]
+        scan_result = build_scan_result(run.scan_id, request.domain, platform, modules)
+        db.add(result_to_db(run.scan_id, scan_result))
         db.commit()
 
         result_dict = scan_result.model_dump(mode="json")
-        yield f"data: {json.dumps({'done': True, 'scan_id': scan_id, 'result': result_dict})}\n\n"
+        yield f"data: {json.dumps({'done': True, 'scan_id': run.scan_id, 'result': result_dict})}\n\n"
 
     return StreamingResponse(
         generate(),
@@ -187,12 +77,50 @@ async def start_scan_stream(request: ScanRequest, db: Session = Depends(get_db))
     )
 
 
+def _create_batch(db: Session, raw_domains: list[str]) -> BatchCreatedResponse:
+    domains, rejected = prepare_domains(raw_domains)
+    if not domains:
+        raise HTTPException(status_code=400, detail="Aucun domaine valide dans le lot")
+    if len(domains) > settings.BATCH_MAX_DOMAINS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lot trop volumineux ({len(domains)} domaines, maximum {settings.BATCH_MAX_DOMAINS})",
+        )
+    batch = create_batch(db, domains)
+    return BatchCreatedResponse(batch_id=batch.batch_id, total=batch.total, rejected=rejected)
+
+
+@router.post("/scan/batch", response_model=BatchCreatedResponse)
+def start_batch(request: BatchScanRequest, db: Session = Depends(get_db)):
+    # Répond tout de suite : les scans tournent en arrière-plan, résultats via GET /scan/batch/{id}
+    return _create_batch(db, request.domains)
+
+
+@router.post("/scan/batch/upload", response_model=BatchCreatedResponse)
+def start_batch_upload(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Fichier texte (un domaine par ligne) ou CSV (domaine en première colonne)
+    return _create_batch(db, parse_domains_file(file.file.read()))
+
+
+@router.get("/scan/batch/{batch_id}", response_model=BatchStatusResponse)
+def get_batch(
+    batch_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    batch = db.query(BatchRecord).filter(BatchRecord.batch_id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Lot non trouvé")
+    return batch_status(db, batch, offset, limit)
+
+
 @router.get("/scan/{scan_id}/pdf")
 async def download_pdf(scan_id: str, db: Session = Depends(get_db)):
     record = db.query(ScanRecord).filter(ScanRecord.scan_id == scan_id).first()
     if not record:
         raise HTTPException(status_code=404, detail="Scan non trouvé")
-    result = _db_to_result(record)
+    result = db_to_result(record)
     pdf_bytes = generate_pdf(result)
     filename = f"rapport-eon-{result.domain}-{result.timestamp.strftime('%Y%m%d')}.pdf"
     return StreamingResponse(
@@ -205,18 +133,28 @@ async def download_pdf(scan_id: str, db: Session = Depends(get_db)):
 @router.get("/scan/{scan_id}", response_model=ScanResponse)
 async def get_scan_result(scan_id: str, db: Session = Depends(get_db)):
     record = db.query(ScanRecord).filter(ScanRecord.scan_id == scan_id).first()
-    if not record:
+    if record:
+        return ScanResponse(success=True, scan_id=scan_id, status="done", result=db_to_result(record))
+    # Pas encore de résultat : scan en file, en cours ou en échec
+    job = db.query(ScanJobRecord).filter(ScanJobRecord.scan_id == scan_id).first()
+    if not job:
         raise HTTPException(status_code=404, detail="Scan non trouvé")
-    return ScanResponse(success=True, scan_id=scan_id, result=_db_to_result(record))
+    return ScanResponse(success=job.state != "error", scan_id=scan_id, status=job.state, error=job.error)
 
 
 
 @router.delete("/scan/{scan_id}")
 async def delete_scan(scan_id: str, db: Session = Depends(get_db)):
     record = db.query(ScanRecord).filter(ScanRecord.scan_id == scan_id).first()
-    if not record:
+    job = db.query(ScanJobRecord).filter(ScanJobRecord.scan_id == scan_id).first()
+    if not record and not job:
         raise HTTPException(status_code=404, detail="Scan non trouvé")
-    db.delete(record)
+    if job is not None and job.state == "running":
+        # le worker écrit le résultat à la fin du scan : on ne supprime pas sous ses pieds
+        raise HTTPException(status_code=409, detail="Scan en cours, réessayez une fois terminé")
+    for obj in (record, job):
+        if obj is not None:
+            db.delete(obj)
     db.commit()
     return {"success": True, "message": "Scan supprimé"}
 
@@ -227,3 +165,10 @@ async def get_supported_platforms():
         "platforms": [platform.value for platform in PlatformType],
         "total": len(PlatformType),
     }
+
+
+@router.get("/certificates/expiring")
+async def get_expiring_certificates(days: int = Query(30, ge=0, le=365)):
+    # Certificats vus pendant les scans qui expirent bientôt, avec tous les domaines qui les présentent
+    certificates = cert_cache.expiring(days)
+    return {"certificates": certificates, "total": len(certificates)}
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from pathlib import Path
 from typing import Optional
 
 
@@ -29,6 +30,97 @@ class Settings(BaseSettings):
 
     REQUEST_TIMEOUT: int = 10
 
+    # Orchestration des scans : délai global d'un scan (secondes) et nombre
+    # de threads partagés pour exécuter les modules en parallèle
+    SCAN_TIMEOUT: int = 60
+    SCAN_WORKERS: int = 160
+
+    # File de scans (table scan_jobs) : nombre de scans exécutés en même temps par les workers,
+    # intervalle de scrutation de la file et nombre de tentatives après un redémarrage.
+    # Les modules tournent sur la boucle asynchrone : un scan n'occupe qu'un thread de la file,
+    # plus un thread EXTERNAL_WORKERS le temps de chaque appel bloquant (WHOIS, SMTP, TLS, checkdmarc).
+    JOB_WORKERS: int = 16
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+
+    # Exécuteur partagé pour le travail réseau bloquant des analyseurs (WHOIS, sous-domaines…) :
+    # tâches simultanées max et tâches en attente max avant refus
+    EXTERNAL_WORKERS: int = 64
+    EXTERNAL_MAX_QUEUED: int = 1024
+
+    # Scans en lot : taille max d'un lot
+    BATCH_MAX_DOMAINS: int = 10000
+
+    # Pool de processus checkdmarc : nombre de processus gardés chauds et
+    # nombre d'analyses avant recyclage d'un processus (sans STARTTLS, une analyse prend
+    # quelques secondes : augmenter si les rapports signalent souvent la vérification de secours)
+    CHECKDMARC_PROCESSES: int = 4
+    CHECKDMARC_MAX_TASKS: int = 50
+
+    # Moteur asynchrone : client HTTP partagé par tous les scans, connexions simultanées max
+    # et connexions gardées ouvertes (keep-alive) pour être réutilisées d'une requête à l'autre
+    HTTP_MAX_CONNECTIONS: int = 1000
+    HTTP_MAX_KEEPALIVE: int = 200
+    # Taille max (octets) d'un corps de réponse lu : page d'accueil d'un scan, page d'un sous-domaine sondé
+    HOMEPAGE_MAX_BYTES: int = 2_000_000
+    PROBE_MAX_BYTES: int = 256_000
+
+    # Subdomain Takeover : fichier de sous-domaines à tester (un label par ligne, liste intégrée
+    # par défaut) et nombre max de sondes DNS/HTTP en vol pendant l'énumération
+    TAKEOVER_WORDLIST: Optional[str] = None
+    TAKEOVER_CONCURRENCY: int = 200
+    # Base de signatures des services (data/takeover_signatures.json par défaut ; accepte aussi
+    # le fichier fingerprints.json de can-i-take-over-xyz tel quel)
+    TAKEOVER_SIGNATURES: Optional[str] = None
+    # Détection de plateforme : base d'empreintes (data/platform_fingerprints.json par défaut) et
+    # nombre d'octets lus au début de la page d'accueil
+    PLATFORM_FINGERPRINTS: Optional[str] = None
+    PLATFORM_BODY_BYTES: int = 65536
+    # Index CT hors ligne (python -m core.ct_index) : les sous-domaines vus dans les certificats
+    # sont testés en premier, au plus CT_INDEX_MAX_NAMES par domaine
+    CT_INDEX_PATH: Optional[str] = None
+    CT_INDEX_MAX_NAMES: int = 10000
+
+    # Catalogue public des fuites HIBP : copie sur disque (None = mémoire seule) et durée de validité
+    # (secondes) avant un rafraîchissement conditionnel ; le dossier cache/ est ignoré par git
+    HIBP_CATALOG_PATH: Optional[str] = str(Path(__file__).parent / "cache" / "hibp_breaches.json")
+    HIBP_CATALOG_TTL: int = 86400
+    # Recherches d'emails HIBP (clé API) : requêtes par minute autorisées par l'abonnement
+    HIBP_RATE_LIMIT: int = 10
+
+    # Instantané URLhaus local (None = API en ligne seulement), source téléchargée et intervalle
+    # de rafraîchissement (secondes) ; l'API en ligne reste interrogée en secours et pour le détail
+    URLHAUS_SNAPSHOT_PATH: Optional[str] = None
+    URLHAUS_SNAPSHOT_URL: str = "https://urlhaus.abuse.ch/downloads/hostfile/"
+    URLHAUS_REFRESH_INTERVAL: int = 3600
+    URLHAUS_LIVE_FALLBACK: bool = True
+
+    # WHOIS : requêtes simultanées et requêtes par minute vers un même serveur de registre (une
+    # extension = un serveur), débit propre à certaines extensions ({"fr": 20}), tentatives par domaine
+    WHOIS_CONCURRENCY_PER_SERVER: int = 4
+    WHOIS_RATE_PER_SERVER: int = 60
+    WHOIS_SERVER_RATES: dict[str, int] = {}
+    WHOIS_ATTEMPTS: int = 3
+
+    # Résultats SMTP (bannière, STARTTLS) par serveur MX : durée de validité (secondes), et pour
+    # un serveur injoignable sur tous les ports
+    SMTP_CACHE_TTL: int = 21600
+    SMTP_NEGATIVE_TTL: int = 600
+
+    # DKIM, MTA-STS, TLS-RPT : fichier de sélecteurs DKIM (data/dkim_selectors.txt par défaut),
+    # requêtes DNS en vol pour les chercher, durée max des vérifications (en parallèle de SMTP)
+    DKIM_SELECTORS: Optional[str] = None
+    DKIM_CONCURRENCY: int = 50
+    MAIL_POLICY_TIMEOUT: float = 5.0
+
+    # Cache DNS partagé (nombre max d'enregistrements gardés en mémoire), et cache séparé des
+    # balayages (sous-domaines candidats, sélecteurs DKIM) qui ne doivent pas l'évincer
+    DNS_CACHE_SIZE: int = 4096
+    DNS_SWEEP_CACHE_SIZE: int = 8192
+
+    # Cache des certificats déjà vus, par empreinte (nombre max de certificats gardés en mémoire)
+    CERT_CACHE_SIZE: int = 4096
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 
@@ -0,0 +1,196 @@
+import asyncio
+import codecs
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Optional
+
+import httpx
+
+from config import settings
+from core.executor import ExecutorSaturated, external
+
+
+class Engine:
+    #Boucle d'événements du processus, dans un thread dédié : les analyseurs y tournent en
+    #coroutines et partagent un client HTTP keep-alive. Des milliers de sondes réseau peuvent
+    #être en vol sans occuper un thread chacune ; seuls les appels bloquants passent par `external`.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._clients: dict[bool, httpx.AsyncClient] = {}
+        self._in_flight = 0
+        self.completed = 0
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        # Démarrée au premier usage (et redémarrée après shutdown, utile aux tests)
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="aio", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def on_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        #Planifie la coroutine sur la boucle ; annuler le Future annule vraiment la coroutine
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop())
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def run(self, coro: Coroutine) -> Any:
+        #Version bloquante, pour le code synchrone (wrappers des analyseurs, tests)
+        if self.on_loop():
+            coro.close()
+            raise RuntimeError("appel bloquant depuis la boucle du moteur : utiliser await")
+        return self.submit(coro).result()
+
+    def client(self, verify: bool = True) -> httpx.AsyncClient:
+        # Un client par mode de vérification TLS (httpx le fixe à la création) ; à appeler depuis la boucle
+        client = self._clients.get(verify)
+        if client is None:
+            client = httpx.AsyncClient(
+                verify=verify,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                ),
+            )
+            self._clients[verify] = client
+        return client
+
+    async def _close_clients(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def shutdown(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_clients(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._loop is not None,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "http_max_connections": settings.HTTP_MAX_CONNECTIONS,
+            }
+
+
+engine = Engine()
+
+
+def submit(coro: Coroutine) -> Future:
+    return engine.submit(coro)
+
+
+def run(coro: Coroutine) -> Any:
+    return engine.run(coro)
+
+
+async def get(url: str, verify: bool = True, **kwargs) -> httpx.Response:
+    #GET via le client partagé (mêmes arguments que httpx.AsyncClient.get)
+    return await engine.client(verify).get(url, **kwargs)
+
+
+async def post(url: str, verify: bool = True, **kwargs) -> httpx.Response:
+    return await engine.client(verify).post(url, **kwargs)
+
+
+async def download(url: str, path: str, verify: bool = True, **kwargs) -> int:
+    #GET en flux écrit dans `path` au fil de l'eau (listes volumineuses) : la mémoire ne dépend pas
+    #de la taille du corps. Erreur HTTP levée (raise_for_status) ; renvoie le nombre d'octets écrits.
+    async with engine.client(verify).stream("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        written = 0
+        with open(path, "wb") as f:
+            async for data in response.aiter_bytes():
+                f.write(data)
+                written += len(data)
+        return written
+
+
+@dataclass
+class TextResponse:
+    # Réponse dont le corps a été lu en flux, au plus `max_bytes` octets
+    url: str
+    status_code: int
+    headers: httpx.Headers
+    text: str
+    truncated: bool  # corps plus long que la limite, ou lecture arrêtée par `until`
+    history: list = field(default_factory=list)
+
+
+async def get_text(url: str, max_bytes: int, verify: bool = True,
+                   until: Optional[Callable[[str], bool]] = None, **kwargs) -> TextResponse:
+    #GET en flux : le corps est décodé au fil de l'eau et la lecture s'arrête à `max_bytes` octets,
+    #ou dès que `until(morceau)` renvoie True. Mémoire et transfert par requête sont ainsi bornés.
+    async with engine.client(verify).stream("GET", url, **kwargs) as response:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        chunks: list[str] = []
+        read = 0
+        truncated = False
+        async for data in response.aiter_bytes():
+            if read + len(data) > max_bytes:
+                data, truncated = data[: max_bytes - read], True
+            read += len(data)
+            chunk = decoder.decode(data)
+            chunks.append(chunk)
+            if truncated or (until is not None and until(chunk)):
+                truncated = True
+                break  # la connexion est fermée sans lire le reste
+        chunks.append(decoder.decode(b"", final=True))
+        return TextResponse(
+            url=str(response.url),
+            status_code=response.status_code,
+            headers=response.headers,
+            text="".join(chunks),
+            truncated=truncated,
+            history=list(response.history),
+        )
+
+
+async def blocking(fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    #Appel bloquant (WHOIS, smtplib, handshake TLS, checkdmarc) exécuté dans l'exécuteur `external`
+    #sans bloquer la boucle ; TimeoutError si `timeout` est dépassé (le thread est alors abandonné),
+    #ExecutorSaturated si la file de l'exécuteur est pleine
+    future = external.submit(fn, *args, **kwargs)
+    wrapped = asyncio.wrap_future(future)
+    try:
+        return await asyncio.wait_for(wrapped, timeout)
+    except asyncio.TimeoutError:
+        if wrapped.done() and not wrapped.cancelled():
+            raise  # TimeoutError levée par fn elle-même : son message est gardé
+        external.abandon(future)
+        raise TimeoutError(f"tâche interrompue après {timeout}s")
+
+
+def stats() -> dict:
+    return engine.stats()
+
+
+def shutdown():
+    engine.shutdown()
@@ -0,0 +1,99 @@
+import csv
+import io
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db_models import BatchRecord, ScanJobRecord
+from api.models import BatchItem, BatchStatusResponse, normalize_domain
+from core import jobs
+
+FINISHED_STATES = ("done", "error")
+
+
+def parse_domains_file(content: bytes) -> list[str]:
+    #Lit un fichier de domaines : un par ligne, ou CSV (première colonne). Lignes vides et # ignorées.
+    text = content.decode("utf-8-sig", errors="ignore")
+    domains = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or not row[0].strip() or row[0].strip().startswith("#"):
+            continue
+        domains.append(row[0].strip())
+    return domains
+
+
+def prepare_domains(raw_domains: list[str]) -> tuple[list[str], list[str]]:
+    #Normalise et dédoublonne les domaines ; renvoie (acceptés, rejetés pour format invalide)
+    accepted, rejected, seen = [], [], set()
+    for raw in raw_domains:
+        try:
+            domain = normalize_domain(raw)
+        except ValueError:
+            rejected.append(raw)
+            continue
+        if domain not in seen:
+            seen.add(domain)
+            accepted.append(domain)
+    return accepted, rejected
+
+
+def create_batch(db: Session, domains: list[str]) -> BatchRecord:
+    #Enregistre le lot : chaque domaine devient un job de la file de scans, en priorité
+    #basse pour ne pas retarder les scans unitaires
+    batch_id = str(uuid.uuid4())
+    batch = BatchRecord(
+        batch_id=batch_id,
+        created_at=datetime.now(),
+        total=len(domains),
+        jobs=[jobs.new_job(d, priority=jobs.PRIORITY_BATCH, batch_id=batch_id) for d in domains],
+    )
+    db.add(batch)
+    db.commit()
+    jobs.queue.notify()
+    return batch
+
+
+def batch_status(db: Session, batch: BatchRecord, offset: int, limit: int) -> BatchStatusResponse:
+    #Avancement du lot + une page de résultats, dans l'ordre où les scans se sont terminés
+    counts = dict(
+        db.query(ScanJobRecord.state, func.count())
+        .filter(ScanJobRecord.batch_id == batch.batch_id)
+        .group_by(ScanJobRecord.state)
+        .all()
+    )
+    finished = (
+        db.query(ScanJobRecord)
+        .filter(ScanJobRecord.batch_id == batch.batch_id, ScanJobRecord.state.in_(FINISHED_STATES))
+        .order_by(ScanJobRecord.finished_at, ScanJobRecord.scan_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    results = []
+    for job in finished:
+        scan = job.scan
+        results.append(BatchItem(
+            domain=job.domain,
+            status=job.state,
+            scan_id=job.scan_id,
+            platform=scan.platform if scan else None,
+            overall_score=scan.overall_score if scan else None,
+            critical_issues=scan.critical_issues if scan else None,
+            high_issues=scan.high_issues if scan else None,
+            error=job.error,
+            finished_at=job.finished_at,
+        ))
+    return BatchStatusResponse(
+        batch_id=batch.batch_id,
+        created_at=batch.created_at,
+        total=batch.total,
+        queued=counts.get("queued", 0),
+        running=counts.get("running", 0),
+        done=counts.get("done", 0),
+        failed=counts.get("error", 0),
+        offset=offset,
+        limit=limit,
+        results=results,
+    )
@@ -0,0 +1,171 @@
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.x509.oid import NameOID
+
+from config import settings
+
+# Durée de vie d'un résultat de validation (chaîne de confiance + nom de domaine) : une autorité
+# peut être retirée ou un certificat révoqué, la validation est refaite de temps en temps
+VERIFY_TTL = 3600
+
+
+def _name(name: x509.Name) -> str:
+    common = name.get_attributes_for_oid(NameOID.COMMON_NAME)
+    return common[0].value if common else name.rfc4514_string()
+
+
+@dataclass
+class CertFacts:
+    # Ce que le scan retient d'un certificat, lu une seule fois quel que soit le nombre de domaines
+    fingerprint: str  # SHA-256 du certificat du site
+    subject: str
+    issuer: str
+    not_before: datetime.datetime
+    not_after: datetime.datetime
+    sans: list[str] = field(default_factory=list)
+    chain: list[str] = field(default_factory=list)  # noms de la chaîne, certificat du site en premier
+
+    @classmethod
+    def from_chain(cls, chain: list[x509.Certificate]) -> "CertFacts":
+        leaf = chain[0]
+        try:
+            sans = leaf.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
+        except x509.ExtensionNotFound:
+            sans = []
+        return cls(
+            fingerprint=leaf.fingerprint(hashes.SHA256()).hex(),
+            subject=_name(leaf.subject),
+            issuer=_name(leaf.issuer),
+            not_before=leaf.not_valid_before_utc,
+            not_after=leaf.not_valid_after_utc,
+            sans=sans,
+            chain=[_name(cert.subject) for cert in chain],
+        )
+
+
+class _Entry:
+    def __init__(self, facts: CertFacts, chain: list[x509.Certificate], chain_key: str):
+        self.facts = facts
+        self.chain = chain
+        self.chain_key = chain_key  # intermédiaires présentés avec le certificat à sa lecture
+        self.domains: dict[str, float] = {}  # domaine → dernier scan où il a présenté ce certificat
+        self.verified: dict[tuple[str, str], tuple[float, Optional[str]]] = {}  # (chaîne, domaine) → (échéance, erreur)
+
+
+class CertCache:
+    #Certificats déjà vus, indexés par empreinte : un certificat partagé (CDN, hébergement mutualisé)
+    #n'est analysé qu'une fois pour tout un lot, et on sait quels domaines l'ont présenté.
+    #LRU en mémoire, partagé par tous les scans du processus.
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def inspect(self, ders: list[bytes], domain: str,
+                verify: Callable[[list[x509.Certificate]], Optional[str]]) -> tuple[Optional[CertFacts], Optional[str]]:
+        #Faits du certificat présenté (chaîne DER, site en premier) et résultat de verify(chaîne),
+        #None si valide. Le certificat n'est lu qu'à sa première apparition ; verify n'est rappelé
+        #que pour un nouveau domaine, une autre chaîne ou un résultat trop ancien. Une exception de
+        #verify (validation non tranchée) est propagée sans rien mettre en cache.
+        if not ders:
+            return None, verify([])
+        fingerprint = hashlib.sha256(ders[0]).hexdigest()
+        chain_key = hashlib.sha256(b"".join(ders[1:])).hexdigest()
+        domain = domain.lower().rstrip(".")
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            chain = [x509.load_der_x509_certificate(der) for der in ders]
+            entry = self._store(fingerprint, _Entry(CertFacts.from_chain(chain), chain, chain_key))
+        with self._lock:
+            entry.domains[domain] = time.time()
+            cached = entry.verified.get((chain_key, domain))
+        if cached is not None and cached[0] > now:
+            return entry.facts, cached[1]
+
+        chain = entry.chain
+        if chain_key != entry.chain_key:
+            # même certificat, autres intermédiaires : c'est la chaîne présentée qui est validée
+            chain = chain[:1] + [x509.load_der_x509_certificate(der) for der in ders[1:]]
+        error = verify(chain)
+        with self._lock:
+            entry.verified[(chain_key, domain)] = (now + VERIFY_TTL, error)
+        return entry.facts, error
+
+    def facts(self, der: bytes) -> Optional[CertFacts]:
+        # Faits d'un certificat déjà inspecté (même si sa validation n'a pas pu aboutir)
+        with self._lock:
+            entry = self._entries.get(hashlib.sha256(der).hexdigest())
+        return entry.facts if entry is not None else None
+
+    def _store(self, fingerprint: str, entry: _Entry) -> _Entry:
+        with self._lock:
+            # un autre scan a pu le lire en même temps : on garde le premier
+            entry = self._entries.setdefault(fingerprint, entry)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def domains(self, fingerprint: str) -> list[str]:
+        # Domaines ayant présenté ce certificat, du plus récent au plus ancien
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return []
+            return sorted(entry.domains, key=entry.domains.__getitem__, reverse=True)
+
+    def expiring(self, days: int = 30) -> list[dict]:
+        #Certificats qui expirent dans moins de `days` jours (ou déjà expirés), avec tous les
+        #domaines touchés : une seule alerte par certificat partagé
+        limit = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
+        with self._lock:
+            entries = [e for e in self._entries.values() if e.facts.not_after <= limit]
+            result = [
+                {
+                    "fingerprint": e.facts.fingerprint,
+                    "subject": e.facts.subject,
+                    "issuer": e.facts.issuer,
+                    "expiration_date": e.facts.not_after.strftime("%Y-%m-%d"),
+                    "domains": sorted(e.domains),
+                }
+                for e in entries
+            ]
+        return sorted(result, key=lambda item: item["expiration_date"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "shared": sum(1 for e in self._entries.values() if len(e.domains) > 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+cache = CertCache(max_entries=settings.CERT_CACHE_SIZE)
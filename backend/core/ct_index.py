@@ -0,0 +1,188 @@
+import argparse
+import gzip
+import heapq
+import json
+import mmap
+import os
+import tempfile
+import threading
+from typing import Iterable, Iterator, Optional
+
+# Noms gardés en mémoire avant d'écrire un segment trié sur disque pendant la construction
+RUN_SIZE = 1_000_000
+
+
+def _reverse(name: str) -> str:
+    # www.example.com → com.example.www : tous les noms d'un domaine deviennent un préfixe commun
+    return ".".join(reversed(name.split(".")))
+
+
+def _normalize(name: str) -> Optional[str]:
+    name = name.strip().lower().rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]  # certificat joker : on garde le domaine couvert
+    if not name or "." not in name or any(c in name for c in " \t/:@*"):
+        return None
+    return name
+
+
+def _names_in_line(line: str) -> Iterable[str]:
+    # Une ligne de dump : un nom seul, ou un objet JSON (format certstream ou équivalent)
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return ()
+    if not line.startswith("{"):
+        return (line,)
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return ()
+    leaf = entry.get("data", {}).get("leaf_cert", {}) if isinstance(entry.get("data"), dict) else {}
+    for key in ("all_domains", "dns_names", "names"):
+        names = entry.get(key) or leaf.get(key)
+        if names:
+            return names
+    return ()
+
+
+def _read_dump(path: str) -> Iterator[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            for name in _names_in_line(line):
+                name = _normalize(name)
+                if name is not None:
+                    yield _reverse(name)
+
+
+def _write_run(names: set[str], directory: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.writelines(f"{name}\n" for name in sorted(names))
+    return path
+
+
+def build_index(dump_paths: Iterable[str], output_path: str, run_size: int = RUN_SIZE) -> int:
+    #Construit l'index à partir de dumps de logs CT (texte ou .gz, un nom ou un objet JSON par ligne) :
+    #noms inversés, triés et dédoublonnés, un par ligne. Tri externe par segments, la mémoire ne
+    #dépend pas de la taille des dumps. Renvoie le nombre de noms indexés.
+    directory = os.path.dirname(os.path.abspath(output_path))
+    runs: list[str] = []
+    try:
+        names: set[str] = set()
+        for path in dump_paths:
+            for name in _read_dump(path):
+                names.add(name)
+                if len(names) >= run_size:
+                    runs.append(_write_run(names, directory))
+                    names = set()
+        if names or not runs:
+            runs.append(_write_run(names, directory))
+
+        files = [open(run, encoding="utf-8") for run in runs]
+        count = 0
+        tmp_output = f"{output_path}.tmp"
+        try:
+            with open(tmp_output, "w", encoding="utf-8") as out:
+                previous = None
+                for line in heapq.merge(*files):
+                    if line != previous:
+                        out.write(line)
+                        count += 1
+                        previous = line
+        finally:
+            for f in files:
+                f.close()
+        os.replace(tmp_output, output_path)  # l'index en service n'est jamais vu à moitié écrit
+        return count
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+class CtIndex:
+    #Index des noms vus dans les certificats (Certificate Transparency), projeté en mémoire (mmap) :
+    #recherche dichotomique sur les lignes triées, sans rien charger ni interroger de service en ligne
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def _first_at_or_after(self, key: bytes) -> int:
+        # Début de la première ligne >= key (les bornes sont toujours des débuts de ligne)
+        mm = self._mm
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b"\n", 0, mid) + 1
+            end = mm.find(b"\n", start)
+            if end == -1:
+                end = len(mm)
+            if mm[start:end] < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def subdomains(self, domain: str, limit: Optional[int] = None) -> list[str]:
+        #Sous-domaines de `domain` vus dans des certificats, relatifs au domaine ("www", "api.v2"…)
+        domain = domain.lower().rstrip(".")
+        prefix = f"{_reverse(domain)}.".encode()
+        mm = self._mm
+        pos = self._first_at_or_after(prefix)
+        labels: list[str] = []
+        while pos < len(mm) and (limit is None or len(labels) < limit):
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = len(mm)
+            line = mm[pos:end]
+            if not line.startswith(prefix):
+                break
+            labels.append(_reverse(line[len(prefix):].decode()))
+            pos = end + 1
+        return labels
+
+
+# Index ouvert courant : (chemin, date de modification, index)
+_current: Optional[tuple[str, float, CtIndex]] = None
+_current_lock = threading.Lock()
+
+
+def open_index(path: Optional[str]) -> Optional[CtIndex]:
+    #Index ouvert une fois puis partagé ; rouvert automatiquement s'il a été reconstruit, l'ancien
+    #étant alors fermé (mmap et descripteur). None sans index.
+    global _current
+    if not path or not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    with _current_lock:
+        if _current is not None and _current[:2] == (path, mtime):
+            return _current[2]
+        previous, _current = _current, (path, mtime, CtIndex(path))
+        if previous is not None:
+            previous[2].close()
+        return _current[2]
+
+
+def close_index():
+    #Ferme l'index courant (arrêt de l'application)
+    global _current
+    with _current_lock:
+        if _current is not None:
+            _current[2].close()
+            _current = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit l'index CT des sous-domaines")
+    parser.add_argument("output", help="fichier d'index à produire")
+    parser.add_argument("dumps", nargs="+", help="dumps de logs CT (texte ou .gz)")
+    args = parser.parse_args()
+    print(f"{build_index(args.dumps, args.output)} noms indexés dans {args.output}")
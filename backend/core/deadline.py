@@ -0,0 +1,58 @@
+import time
+from typing import Optional
+
+from api.models import ModuleResult, SeverityLevel
+
+# En dessous, inutile de lancer une requête réseau : elle n'aurait pas le temps d'aboutir
+MIN_TIMEOUT = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    #Échéance d'un scan, partagée par tous ses modules : chaque appel réseau dimensionne
+    #son timeout sur le temps restant au lieu d'une valeur fixe
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() < MIN_TIMEOUT
+
+    def timeout(self, cap: float) -> float:
+        #Timeout d'un appel réseau : `cap` au plus, jamais au-delà de l'échéance
+        remaining = self.remaining()
+        if remaining < MIN_TIMEOUT:
+            raise DeadlineExceeded("délai du scan écoulé")
+        return min(cap, remaining)
+
+    def shortened(self, margin: float) -> "Deadline":
+        #Échéance `margin` secondes plus tôt (pour rendre la main avant l'échéance globale)
+        child = Deadline(0)
+        child.expires_at = self.expires_at - margin
+        return child
+
+
+def budget(deadline: Optional[Deadline], cap: float) -> float:
+    #Timeout à utiliser pour un appel : `cap` hors scan, borné par l'échéance sinon
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap)
+
+
+def timeout_result(module_name: str) -> ModuleResult:
+    # Module qui n'a pas pu aboutir avant l'échéance du scan : même barème que le timeout takeover
+    return ModuleResult(
+        module_name=module_name,
+        status="warning",
+        severity=SeverityLevel.MEDIUM,
+        score=50,
+        details={"warning": "non évalué (analyse interrompue, délai du scan dépassé)"},
+        recommendations=["Ce module n'a pas pu aboutir dans le délai imparti au scan."],
+    )
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import dns.asyncresolver
+import dns.rdatatype
+import dns.resolver
+
+from config import settings
+
+# Durée max d'une réponse négative (NXDOMAIN / pas de réponse) si la zone ne donne pas de SOA
+NEGATIVE_TTL_DEFAULT = 60
+NEGATIVE_TTL_MAX = 300
+
+
+def _answer_ttl(answer) -> Optional[int]:
+    # TTL de l'enregistrement ; None si la réponse n'en a pas (rien à mettre en cache)
+    try:
+        return int(answer.rrset.ttl)
+    except Exception:
+        return None
+
+
+def _negative_ttl(error: Exception) -> int:
+    # RFC 2308 : une réponse négative vit min(TTL, MINIMUM) du SOA de la zone
+    responses = []
+    kwargs = getattr(error, "kwargs", None) or {}
+    if kwargs.get("response") is not None:
+        responses.append(kwargs["response"])
+    responses.extend((kwargs.get("responses") or {}).values())
+    for response in responses:
+        for rrset in getattr(response, "authority", []):
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, rrset[0].minimum, NEGATIVE_TTL_MAX)
+    return NEGATIVE_TTL_DEFAULT
+
+
+class DnsCache:
+    #Résolveur DNS avec cache LRU en mémoire, partagé par tous les analyseurs et tous les scans.
+    #Les réponses positives vivent le TTL de l'enregistrement, les négatives celui du SOA.
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: tuple[str, str]):
+        # Réponse (ou exception négative) encore valide pour cette question, sinon None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cached = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                cached = None
+        if isinstance(cached, Exception):
+            raise cached.with_traceback(None)
+        return cached
+
+    def resolve(self, qname: str, rdtype: str = "A", lifetime: Optional[float] = None):
+        key = (qname.lower().rstrip("."), rdtype.upper())
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        try:
+            answer = dns.resolver.resolve(qname, rdtype, lifetime=lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+            self._store(key, e, _negative_ttl(e))
+            raise
+        return self._store_answer(key, answer)
+
+    async def resolve_async(self, qname: str, rdtype: str = "A", lifetime: Optional[float] = None):
+        #Même cache que resolve(), mais la requête part sur la boucle d'événements (dns.asyncresolver)
+        key = (qname.lower().rstrip("."), rdtype.upper())
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        try:
+            answer = await dns.asyncresolver.resolve(qname, rdtype, lifetime=lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+            self._store(key, e, _negative_ttl(e))
+            raise
+        return self._store_answer(key, answer)
+
+    def _store_answer(self, key: tuple[str, str], answer):
+        ttl = _answer_ttl(answer)
+        if ttl:
+            self._store(key, answer, ttl)
+        return answer
+
+    def _store(self, key: tuple[str, str], value, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = DnsCache(max_entries=settings.DNS_CACHE_SIZE)
+# Balayages (sous-domaines candidats, sélecteurs DKIM) : des milliers de noms interrogés une seule fois,
+# gardés dans leur propre cache pour ne pas évincer les MX, A et NS du cache partagé
+_sweep_cache = DnsCache(max_entries=settings.DNS_SWEEP_CACHE_SIZE)
+
+
+def resolve(qname: str, rdtype: str = "A", lifetime: Optional[float] = None):
+    #Même contrat que dns.resolver.resolve (mêmes exceptions), avec le cache partagé devant
+    return _cache.resolve(qname, rdtype, lifetime)
+
+
+async def resolve_async(qname: str, rdtype: str = "A", lifetime: Optional[float] = None):
+    return await _cache.resolve_async(qname, rdtype, lifetime)
+
+
+async def resolve_sweep_async(qname: str, rdtype: str = "A", lifetime: Optional[float] = None):
+    #Pour les balayages de noms : même contrat que resolve_async, dans le cache séparé
+    return await _sweep_cache.resolve_async(qname, rdtype, lifetime)
+
+
+def stats() -> dict:
+    return {**_cache.stats(), "sweep": _sweep_cache.stats()}
+
+
+def clear():
+    _cache.clear()
+    _sweep_cache.clear()
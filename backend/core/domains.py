@@ -0,0 +1,11 @@
+from publicsuffixlist import PublicSuffixList  # type: ignore[import-untyped]
+
+# Liste des suffixes publics (publicsuffix.org, la même que checkdmarc) : suffixes des registres
+# (co.uk, asso.fr, me.uk…) et des professions ou services qui délèguent des noms (avocat.fr…)
+_PSL = PublicSuffixList()
+
+
+def registered_domain(name: str) -> str:
+    # forum.example.co.uk → example.co.uk ; monclub.asso.fr → monclub.asso.fr ; www.example.com → example.com
+    name = name.lower().strip().strip(".")
+    return _PSL.privatesuffix(name) or name
@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Optional
+
+from config import settings
+
+
+class ExecutorSaturated(RuntimeError):
+    #Trop de tâches en attente : la tâche est refusée plutôt que d'attendre sans fin. Distincte de
+    #TimeoutError : c'est le serveur d'audit qui est surchargé, pas la cible qui ne répond pas
+    pass
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    #Annulation coopérative : la tâche consulte `cancelled` entre deux opérations réseau
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def timeout(self, cap: float) -> float:
+        #Timeout d'un appel réseau fait par la tâche : `cap` au plus, borné par l'échéance
+        if self.deadline is None:
+            return cap
+        return max(0.1, min(cap, self.deadline - time.monotonic()))
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+class _Slot:
+    # État d'une tâche soumise, pour tenir les compteurs à jour
+    __slots__ = ("started", "abandoned")
+
+    def __init__(self):
+        self.started = False
+        self.abandoned = False
+
+
+class BoundedExecutor:
+    #Pool de threads partagé et borné : au plus `max_workers` tâches en cours et `max_queued`
+    #en attente. Expose les tâches actives, en file et abandonnées (délai dépassé mais thread
+    #encore bloqué sur le réseau) au lieu de créer un ThreadPoolExecutor par appel.
+
+    def __init__(self, name: str, max_workers: int, max_queued: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._slots: dict[Future, _Slot] = {}
+        self._queued = 0
+        self._active = 0
+        self._abandoned = 0
+        self.abandoned_total = 0
+        self.rejected = 0
+        _registry.append(self)
+
+    def submit(self, fn: Callable, *args, token: Optional[CancelToken] = None, **kwargs) -> Future:
+        with self._lock:
+            if self._queued >= self.max_queued:
+                self.rejected += 1
+                raise ExecutorSaturated(f"exécuteur {self.name} saturé ({self._queued} tâches en attente)")
+            self._queued += 1
+        slot = _Slot()
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                slot.started = True
+            try:
+                if token is not None:
+                    token.raise_if_cancelled()  # annulée pendant qu'elle attendait son tour
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    if slot.abandoned:
+                        self._abandoned -= 1
+
+        future = self._pool.submit(call)
+        with self._lock:
+            self._slots[future] = slot
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future: Future):
+        with self._lock:
+            slot = self._slots.pop(future, None)
+            if slot is not None and future.cancelled() and not slot.started:
+                self._queued -= 1  # annulée avant d'avoir démarré
+
+    def abandon(self, future: Future):
+        #L'appelant renonce au résultat : retirée de la file si possible, sinon comptée comme abandonnée
+        if future.cancel():
+            return
+        with self._lock:
+            slot = self._slots.get(future)
+            if slot is not None and not future.done() and not slot.abandoned:
+                slot.abandoned = True
+                self._abandoned += 1
+                self.abandoned_total += 1
+
+    def run(self, fn: Callable, *args, timeout: float, cancellable: bool = False, **kwargs):
+        #Exécute fn avec un délai ; TimeoutError si dépassé. Avec cancellable=True, fn reçoit
+        #un argument `cancel` (CancelToken) signalé à l'échéance pour qu'elle s'arrête d'elle-même.
+        #Une tâche qui a vu son jeton expirer a pu rendre un résultat partiel : TimeoutError aussi.
+        token = CancelToken(time.monotonic() + timeout)
+        if cancellable:
+            kwargs["cancel"] = token
+        future = self.submit(fn, *args, token=token, **kwargs)
+        try:
+            result = future.result(timeout=timeout)
+        except (FuturesTimeoutError, TaskCancelled):
+            token.cancel()
+            self.abandon(future)
+            raise TimeoutError(f"tâche interrompue après {timeout}s")
+        if cancellable and token.cancelled:
+            raise TimeoutError(f"tâche interrompue après {timeout}s")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "abandoned": self._abandoned,
+                "abandoned_total": self.abandoned_total,
+                "rejected": self.rejected,
+            }
+
+
+_registry: list[BoundedExecutor] = []
+
+
+def all_stats() -> dict:
+    return {executor.name: executor.stats() for executor in _registry}
+
+
+# Travail réseau bloquant des analyseurs (WHOIS, énumération des sous-domaines…)
+external = BoundedExecutor("external", settings.EXTERNAL_WORKERS, settings.EXTERNAL_MAX_QUEUED)
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from config import settings
+from core import aio
+from core.deadline import Deadline, budget
+from core.domains import registered_domain
+from core.ratelimit import TokenBucket, WaitTooLong
+
+HIBP_BASE_URL = "https://haveibeenpwned.com/api/v3"
+HIBP_HEADERS = {"user-agent": "EON-Security-Audit/1.0"}
+
+# Tentatives après un 429
+MAX_ATTEMPTS = 3
+# Attente avant un nouveau téléchargement du catalogue quand le précédent a échoué
+CATALOG_RETRY_DELAY = 300
+
+
+class BreachCatalog:
+    #Catalogue public des fuites HIBP (/breaches), gardé en mémoire et sur disque, rafraîchi au plus
+    #une fois par TTL par requête conditionnelle (ETag / Last-Modified). Indexé par domaine
+    #enregistré : la recherche d'un scan est un accès au dictionnaire, sans appel réseau.
+
+    def __init__(self, path: Optional[str] = None, ttl: int = 86400):
+        self.path = path
+        self.ttl = ttl
+        self._breaches: list[dict] = []
+        self._by_registered: dict[str, list[dict]] = {}
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._fetched_at = 0.0
+        self._failed_at = 0.0
+        self._loaded = False
+        self._loading: Optional[asyncio.Future] = None
+        self._refreshing: Optional[asyncio.Future] = None
+        self.refreshes = 0
+        self.not_modified = 0
+        self.stale_served = 0
+        self.failures = 0
+
+    def _index(self, breaches: list[dict]):
+        by_registered: dict[str, list[dict]] = {}
+        for breach in breaches:
+            domain = (breach.get("Domain") or "").lower().strip()
+            if domain:
+                by_registered.setdefault(registered_domain(domain), []).append(breach)
+        self._breaches = breaches
+        self._by_registered = by_registered
+
+    def _read_disk(self) -> Optional[dict]:
+        # Lecture bloquante (exécutée hors de la boucle asynchrone)
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # cache illisible : on retélécharge
+
+    async def _load_disk(self):
+        cached = await aio.blocking(self._read_disk)
+        self._loaded = True
+        try:
+            if cached is not None:
+                self._index(cached["breaches"])
+                self._etag = cached.get("etag")
+                self._last_modified = cached.get("last_modified")
+                self._fetched_at = cached.get("fetched_at", 0.0)
+        except (KeyError, TypeError):
+            pass
+
+    def _write_disk(self, data: dict):
+        # Écriture bloquante et atomique (exécutée hors de la boucle asynchrone)
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # le cache mémoire suffit jusqu'au prochain rafraîchissement
+
+    async def _save_disk(self):
+        if not self.path:
+            return
+        try:
+            await aio.blocking(self._write_disk, {
+                "fetched_at": self._fetched_at,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+                "breaches": self._breaches,
+            })
+        except Exception:
+            pass  # exécuteur saturé : la copie disque attendra le prochain rafraîchissement
+
+    @property
+    def fresh(self) -> bool:
+        return self._fetched_at + self.ttl > time.time()
+
+    @property
+    def backing_off(self) -> bool:
+        return self._failed_at + CATALOG_RETRY_DELAY > time.time()
+
+    async def _refresh_once(self):
+        # Un seul téléchargement à la fois, hors de l'échéance d'un scan ; un échec est daté pour ne
+        # pas retenter avant CATALOG_RETRY_DELAY
+        try:
+            await self._refresh()
+        except Exception:
+            self._failed_at = time.time()
+            self.failures += 1
+            raise
+        self._failed_at = 0.0
+
+    async def _refresh(self, deadline: Optional[Deadline] = None):
+        headers = dict(HIBP_HEADERS)
+        if self._breaches and self._etag:
+            headers["if-none-match"] = self._etag
+        if self._breaches and self._last_modified:
+            headers["if-modified-since"] = self._last_modified
+        response = await aio.get(
+            f"{HIBP_BASE_URL}/breaches",
+            headers=headers,
+            timeout=budget(deadline, settings.REQUEST_TIMEOUT),
+        )
+        if response.status_code == 304:
+            self.not_modified += 1
+        else:
+            response.raise_for_status()
+            self._index(response.json())
+            self._etag = response.headers.get("etag")
+            self._last_modified = response.headers.get("last-modified")
+            self.refreshes += 1
+        self._fetched_at = time.time()
+        await self._save_disk()
+
+    async def lookup(self, domain: str, deadline: Optional[Deadline] = None) -> tuple[list[dict], int]:
+        #Fuites dont le domaine appartient au même domaine enregistré que `domain` (domaine exact en
+        #tête) et taille du catalogue. Catalogue périmé : servi tout de suite pendant qu'un seul
+        #rafraîchissement tourne en tâche de fond. Pas de catalogue du tout : on attend le
+        #téléchargement, au plus jusqu'à l'échéance du scan.
+        if not self._loaded:
+            if self._loading is None or self._loading.done():
+                self._loading = asyncio.ensure_future(self._load_disk())
+            await asyncio.wait_for(asyncio.shield(self._loading), budget(deadline, settings.REQUEST_TIMEOUT))
+        if not self.fresh:
+            if (self._refreshing is None or self._refreshing.done()) and not self.backing_off:
+                self._refreshing = asyncio.ensure_future(self._refresh_once())
+                # échec déjà compté dans _refresh_once : rien à remonter pour les scans qui n'attendent pas
+                self._refreshing.add_done_callback(lambda task: task.cancelled() or task.exception())
+            if self._breaches:
+                self.stale_served += 1
+            elif self._refreshing is not None and not self._refreshing.done():
+                await asyncio.wait_for(
+                    asyncio.shield(self._refreshing), budget(deadline, settings.REQUEST_TIMEOUT)
+                )
+            else:
+                raise ConnectionError("catalogue HIBP indisponible (nouvel essai plus tard)")
+        domain = domain.lower().strip(".")
+        matched = self._by_registered.get(registered_domain(domain), [])
+        matched = sorted(matched, key=lambda b: b.get("Domain", "").lower() != domain)
+        return matched, len(self._breaches)
+
+    def stats(self) -> dict:
+        return {
+            "breaches": len(self._breaches),
+            "age": round(time.time() - self._fetched_at) if self._fetched_at else None,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "stale_served": self.stale_served,
+            "failures": self.failures,
+        }
+
+
+class HibpBusy(ConnectionError):
+    #Le tour de la requête dans la file HIBP viendrait après l'échéance du scan
+
+    def __init__(self, wait: float):
+        super().__init__(f"File d'attente HIBP saturée (attente estimée {wait:.0f} s)")
+        self.wait = wait
+
+
+def _retry_after(response, default: float) -> float:
+    try:
+        return float(response.headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
+
+class DomainSearch:
+    #Recherches /breacheddomain (clé API) : cadencées par le seau à jetons, et une seule requête
+    #en vol par domaine, partagée par tous les scans qui le demandent en même temps
+
+    def __init__(self, limiter: TokenBucket):
+        self.limiter = limiter
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+        self.throttled = 0
+
+    async def _search(self, domain: str, api_key: str, deadline: Optional[Deadline]) -> dict:
+        headers = {**HIBP_HEADERS, "hibp-api-key": api_key}
+        for _ in range(MAX_ATTEMPTS):
+            try:
+                await self.limiter.acquire(deadline)
+            except WaitTooLong as e:
+                raise HibpBusy(e.wait)
+            response = await aio.get(
+                f"{HIBP_BASE_URL}/breacheddomain/{domain}",
+                headers=headers,
+                timeout=budget(deadline, settings.REQUEST_TIMEOUT),
+            )
+            if response.status_code == 429:
+                # quota partagé avec d'autres clients de la clé : on recule et on reprend la file
+                self.throttled += 1
+                self.limiter.pause(_retry_after(response, 1 / self.limiter.refill))
+                continue
+            if response.status_code == 404:
+                return {}
+            if response.status_code == 401:
+                raise PermissionError("Clé API HIBP invalide ou expirée")
+            response.raise_for_status()
+            return response.json()
+        raise ConnectionError(f"Limite de requêtes HIBP atteinte ({settings.HIBP_RATE_LIMIT} req/min)")
+
+    async def search(self, domain: str, api_key: str, deadline: Optional[Deadline] = None) -> dict:
+        #Adresses @domaine trouvées dans des fuites ; HibpBusy si le tour viendrait trop tard
+        domain = domain.lower().strip(".")
+        task = self._inflight.get(domain)
+        if task is None:
+            task = asyncio.ensure_future(self._search(domain, api_key, deadline))
+            self._inflight[domain] = task
+            task.add_done_callback(lambda _: self._inflight.pop(domain, None))
+        else:
+            self.coalesced += 1
+        # shield : un scan annulé ne doit pas annuler la requête attendue par les autres
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            **self.limiter.stats(),
+            "in_flight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+        }
+
+
+catalog = BreachCatalog(settings.HIBP_CATALOG_PATH, settings.HIBP_CATALOG_TTL)
+domain_search = DomainSearch(TokenBucket(settings.HIBP_RATE_LIMIT))
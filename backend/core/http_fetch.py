@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+
+from config import settings
+from core import aio
+from core.deadline import Deadline, budget
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+
+@dataclass
+class HomepageResponse:
+    # Ce que les analyseurs lisent de la page d'accueil, après redirections
+    url: str
+    final_url: str
+    status_code: int
+    headers: Mapping[str, str]  # insensible à la casse (httpx.Headers)
+    text: str
+    verified: bool  # HTTPS avec certificat validé
+    redirects: list[str] = field(default_factory=list)
+    truncated: bool = False  # corps coupé à HOMEPAGE_MAX_BYTES
+
+
+def _attempts(domain: str, verified_only: bool) -> list[tuple[str, bool]]:
+    # HTTPS, puis HTTPS sans vérif cert, puis HTTP (ordre historique de Security Headers)
+    attempts = [(f"https://{domain}", True)]
+    if not verified_only:
+        attempts += [(f"https://{domain}", False), (f"http://{domain}", True)]
+    return attempts
+
+
+async def fetch_homepage_async(domain: str, verified_only: bool = False, deadline: Optional[Deadline] = None) -> Optional[HomepageResponse]:
+    #Récupère la page d'accueil du domaine, None si injoignable en HTTP comme en HTTPS (ou plus de temps)
+    for url, verify in _attempts(domain, verified_only):
+        try:
+            response = await aio.get_text(
+                url,
+                settings.HOMEPAGE_MAX_BYTES,
+                verify=verify,
+                timeout=budget(deadline, settings.REQUEST_TIMEOUT),
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+            )
+            return HomepageResponse(
+                url=url,
+                final_url=str(response.url),
+                status_code=response.status_code,
+                headers=response.headers,
+                text=response.text,
+                verified=url.startswith("https://") and verify,
+                redirects=[str(r.url) for r in getattr(response, "history", None) or []],
+                truncated=response.truncated is True,
+            )
+        except Exception:
+            continue
+    return None
+
+
+def fetch_homepage(domain: str, verified_only: bool = False, deadline: Optional[Deadline] = None) -> Optional[HomepageResponse]:
+    return aio.run(fetch_homepage_async(domain, verified_only, deadline))
+
+
+class HomepageFetch:
+    #Page d'accueil d'un scan : téléchargée une seule fois, au premier analyseur qui la demande,
+    #puis partagée (headers, body, URL finale) avec tous les autres
+
+    def __init__(self, domain: str, verified_only: bool = False, deadline: Optional[Deadline] = None):
+        self.domain = domain
+        self.verified_only = verified_only
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+
+    def _start(self) -> Future:
+        # Les analyseurs qui arrivent pendant le téléchargement attendent le même résultat
+        with self._lock:
+            if self._future is None:
+                self._future = aio.submit(fetch_homepage_async(self.domain, self.verified_only, self.deadline))
+            return self._future
+
+    def get(self) -> Optional[HomepageResponse]:
+        return self._start().result()
+
+    async def get_async(self) -> Optional[HomepageResponse]:
+        # shield : un analyseur annulé ne doit pas annuler le téléchargement attendu par les autres
+        return await asyncio.shield(asyncio.wrap_future(self._start()))
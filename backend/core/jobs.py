@@ -0,0 +1,185 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from db_models import ScanJobRecord
+from api.models import ensure_domain_resolves
+from core.scanner import ScanRun, run_scan
+from core.storage import result_to_db
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+
+def new_job(domain: str, priority: int = PRIORITY_INTERACTIVE, batch_id: Optional[str] = None) -> ScanJobRecord:
+    # Le scan_id est attribué dès la soumission : c'est lui que le client interroge ensuite
+    return ScanJobRecord(
+        scan_id=str(uuid.uuid4()),
+        domain=domain,
+        state="queued",
+        priority=priority,
+        batch_id=batch_id,
+        created_at=datetime.now(),
+        attempts=0,
+    )
+
+
+class JobQueue:
+    #File de scans persistée en base (table scan_jobs) et consommée par un pool de threads.
+    #Un scan survit à la déconnexion du client et, resté "running" au moment d'un arrêt,
+    #repart au redémarrage (au plus JOB_MAX_ATTEMPTS fois).
+
+    def __init__(self, session_factory: Callable[[], Session], workers: int):
+        self.session_factory = session_factory
+        self.workers = workers
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def submit(self, db: Session, domain: str) -> ScanJobRecord:
+        job = new_job(domain)
+        db.add(job)
+        db.commit()
+        self.notify()
+        return job
+
+    def notify(self):
+        # Réveille les workers en attente (nouveaux jobs en base)
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def start(self):
+        self._stop.clear()
+        self._recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scan-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        # Les scans en cours ne sont pas attendus : ils repartiront au prochain démarrage
+        self._stop.set()
+        self.notify()
+        self._threads = []
+
+    def _recover(self):
+        # Jobs "running" laissés par un arrêt brutal : on les remet dans la file
+        db = self.session_factory()
+        try:
+            for job in db.query(ScanJobRecord).filter(ScanJobRecord.state == "running"):
+                if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                    job.state = "error"
+                    job.error = "scan interrompu trop de fois (redémarrages)"
+                    job.finished_at = datetime.now()
+                else:
+                    job.state = "queued"
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[str]:
+        # Prend le plus ancien job de la meilleure priorité ; l'UPDATE conditionnel
+        # garantit qu'un seul worker l'obtient
+        db = self.session_factory()
+        try:
+            while True:
+                candidate = (
+                    db.query(ScanJobRecord.scan_id)
+                    .filter(ScanJobRecord.state == "queued")
+                    .order_by(ScanJobRecord.priority, ScanJobRecord.created_at)
+                    .first()
+                )
+                if candidate is None:
+                    return None
+                claimed = (
+                    db.query(ScanJobRecord)
+                    .filter(ScanJobRecord.scan_id == candidate.scan_id, ScanJobRecord.state == "queued")
+                    .update(
+                        {
+                            ScanJobRecord.state: "running",
+                            ScanJobRecord.started_at: datetime.now(),
+                            ScanJobRecord.attempts: ScanJobRecord.attempts + 1,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    return candidate.scan_id
+        finally:
+            db.close()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                scan_id = self._claim()
+            except Exception:
+                scan_id = None  # base momentanément verrouillée : on réessaie au prochain tour
+            if scan_id is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=settings.JOB_POLL_INTERVAL)
+                continue
+            # Un job qui échoue (base verrouillée, job supprimé en cours...) ne doit pas arrêter le worker
+            try:
+                self._run(scan_id)
+            except Exception as e:
+                self._fail(scan_id, f"scan interrompu : {e}")
+
+    def _fail(self, scan_id: str, error: str):
+        # Marque le job en erreur s'il existe encore, pour qu'il ne reste pas "running"
+        db = self.session_factory()
+        try:
+            db.query(ScanJobRecord).filter(ScanJobRecord.scan_id == scan_id).update(
+                {ScanJobRecord.state: "error", ScanJobRecord.error: error, ScanJobRecord.finished_at: datetime.now()},
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception:
+            db.rollback()  # base indisponible : _recover() le reprendra au prochain démarrage
+        finally:
+            db.close()
+
+    def _run(self, scan_id: str):
+        db = self.session_factory()
+        try:
+            job = db.get(ScanJobRecord, scan_id)
+            if job is None:
+                return  # supprimé entre la prise en charge et l'exécution
+            try:
+                ensure_domain_resolves(job.domain)
+                result = run_scan(job.domain, scan_id=job.scan_id)
+                db.add(result_to_db(result.scan_id, result))
+                job.state = "done"
+            except Exception as e:
+                job.state = "error"
+                job.error = str(e)
+            job.finished_at = datetime.now()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+queue = JobQueue(SessionLocal, settings.JOB_WORKERS)
+
+
+def _save_run(run: ScanRun):
+    db = SessionLocal()
+    try:
+        result = run.result()
+        db.add(result_to_db(result.scan_id, result))
+        db.commit()
+    finally:
+        db.close()
+
+
+def save_in_background(run: ScanRun):
+    #Termine et enregistre un scan lancé hors file (flux SSE) dont le client s'est déconnecté
+    threading.Thread(target=_save_run, args=(run,), name=f"scan-save-{run.scan_id}", daemon=True).start()
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import dns.resolver
+
+from config import settings
+from core import aio, dns_cache
+from core.deadline import Deadline, budget
+
+# Sélecteurs DKIM testés (un par ligne), versionnés dans data/ ; DKIM_SELECTORS pour les remplacer
+SELECTORS_FILE = Path(__file__).parent.parent / "data" / "dkim_selectors.txt"
+
+# Taille max du fichier de politique MTA-STS lu (RFC 8461 : quelques lignes)
+POLICY_MAX_BYTES = 64_000
+
+
+@lru_cache(maxsize=8)
+def load_selectors(path: str) -> tuple[str, ...]:
+    #Sélecteurs DKIM : un par ligne, lignes vides et commentaires (#) ignorés, doublons retirés
+    with open(path, encoding="utf-8") as f:
+        selectors = (line.strip().lower() for line in f)
+        return tuple(dict.fromkeys(s for s in selectors if s and not s.startswith("#")))
+
+
+def _default_selectors() -> tuple[str, ...]:
+    return load_selectors(settings.DKIM_SELECTORS or str(SELECTORS_FILE))
+
+
+async def _txt(qname: str, deadline: Optional[Deadline], sweep: bool = False) -> list[str]:
+    # Enregistrements TXT de qname (cache DNS partagé, ou celui des balayages avec sweep=True) ;
+    # NXDOMAIN et absence de réponse → []
+    resolve = dns_cache.resolve_sweep_async if sweep else dns_cache.resolve_async
+    try:
+        answer = await resolve(qname, "TXT", lifetime=budget(deadline, 5))
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return []
+    records = []
+    for rdata in answer:
+        try:
+            records.append(b"".join(rdata.strings).decode("utf-8", errors="ignore"))
+        except Exception:
+            continue
+    return records
+
+
+@dataclass
+class DkimDiscovery:
+    selectors: list[str] = field(default_factory=list)  # sélecteurs publiés trouvés
+    tested: int = 0
+    complete: bool = True  # False : échéance atteinte avant la fin de la liste
+
+
+async def discover_dkim(domain: str, selectors: Optional[tuple[str, ...]] = None,
+                        deadline: Optional[Deadline] = None, concurrency: Optional[int] = None,
+                        timeout: Optional[float] = None) -> DkimDiscovery:
+    #Cherche les clés DKIM publiées sous les sélecteurs courants, au plus `concurrency` requêtes DNS
+    #en vol, et s'arrête à `timeout` avec ce qui a été trouvé. Si _domainkey.<domaine> n'existe pas
+    #(NXDOMAIN), aucun sélecteur ne peut exister en dessous (RFC 8020) : une seule requête suffit.
+    #Les réponses vont dans le cache des balayages, pas dans le cache DNS partagé.
+    selectors = selectors if selectors is not None else _default_selectors()
+    concurrency = concurrency or settings.DKIM_CONCURRENCY
+    result = DkimDiscovery()
+    started = time.monotonic()
+    try:
+        await dns_cache.resolve_sweep_async(f"_domainkey.{domain}", "TXT", lifetime=budget(deadline, 5))
+    except dns.resolver.NXDOMAIN:
+        return result
+    except Exception:
+        pass  # nœud vide (NoAnswer) ou serveur muet : on teste les sélecteurs
+
+    pending = iter(enumerate(selectors))
+    found: list[tuple[int, str]] = []
+
+    async def worker():
+        for index, selector in pending:  # itérateur partagé : chaque sélecteur n'est pris qu'une fois
+            try:
+                records = await _txt(f"{selector}._domainkey.{domain}", deadline, sweep=True)
+            except TimeoutError:
+                return  # échéance du scan atteinte
+            except Exception:
+                records = []
+            result.tested += 1
+            if any("p=" in record for record in records):
+                found.append((index, selector))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(selectors)))]
+    if workers:
+        remaining = max(0.0, timeout - (time.monotonic() - started)) if timeout is not None else None
+        _, unfinished = await asyncio.wait(workers, timeout=remaining)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        result.complete = not unfinished and next(pending, None) is None
+    result.selectors = [selector for _, selector in sorted(found)]
+    return result
+
+
+def _parse_policy(text: str) -> dict:
+    # Politique MTA-STS : lignes "clé: valeur", "mx" peut se répéter
+    policy: dict = {"mx": []}
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key, value = key.strip().lower(), value.strip()
+        if key == "mx":
+            policy["mx"].append(value.lower().rstrip("."))
+        else:
+            policy[key] = value
+    return policy
+
+
+def _mx_covered(host: str, patterns: list[str]) -> bool:
+    # "*.example.net" couvre exactement un niveau de plus (mx1.example.net, pas a.b.example.net)
+    host = host.lower().rstrip(".")
+    for pattern in patterns:
+        if pattern.startswith("*."):
+            if host.partition(".")[2] == pattern[2:]:
+                return True
+        elif host == pattern:
+            return True
+    return False
+
+
+async def check_mta_sts(domain: str, mx_hosts: list[str], deadline: Optional[Deadline] = None) -> Optional[dict]:
+    #Enregistrement _mta-sts et fichier de politique (RFC 8461) ; None si pas d'enregistrement
+    records = [r for r in await _txt(f"_mta-sts.{domain}", deadline) if r.lower().startswith("v=stsv1")]
+    if not records:
+        return None
+    result: dict = {"record": records[0]}
+    try:
+        response = await aio.get_text(
+            f"https://mta-sts.{domain}/.well-known/mta-sts.txt",
+            POLICY_MAX_BYTES,
+            timeout=budget(deadline, settings.MAIL_POLICY_TIMEOUT),
+        )
+    except Exception as e:
+        result["error"] = f"politique injoignable ({type(e).__name__})"
+        return result
+    if response.status_code != 200:
+        result["error"] = f"politique injoignable (HTTP {response.status_code})"
+        return result
+    policy = _parse_policy(response.text)
+    if policy.get("version") != "STSv1" or policy.get("mode") not in ("enforce", "testing", "none"):
+        result["error"] = "politique invalide"
+        return result
+    result["mode"] = policy["mode"]
+    result["mx_non_couverts"] = [host for host in mx_hosts if not _mx_covered(host, policy["mx"])]
+    return result
+
+
+async def check_tls_rpt(domain: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+    # Destinataires des rapports TLS-RPT (RFC 8460), None si pas d'enregistrement
+    for record in await _txt(f"_smtp._tls.{domain}", deadline):
+        if record.lower().startswith("v=tlsrptv1"):
+            return record
+    return None
+
+
+@dataclass
+class MailPolicies:
+    dkim: Optional[DkimDiscovery] = None
+    mta_sts: Optional[dict] = None
+    tls_rpt: Optional[str] = None
+    evaluated: bool = True  # False : échéance atteinte avant les réponses
+
+
+async def check(domain: str, mx_hosts: list[str], deadline: Optional[Deadline] = None) -> MailPolicies:
+    #DKIM, MTA-STS et TLS-RPT en même temps, en parallèle de la sonde SMTP de l'analyseur : la durée
+    #totale est bornée par MAIL_POLICY_TIMEOUT (et l'échéance du scan), pas par leur somme
+    try:
+        timeout = budget(deadline, settings.MAIL_POLICY_TIMEOUT)
+    except TimeoutError:
+        return MailPolicies(evaluated=False)
+    dkim, mta_sts, tls_rpt = (
+        asyncio.ensure_future(discover_dkim(domain, deadline=deadline, timeout=timeout)),
+        asyncio.ensure_future(check_mta_sts(domain, mx_hosts, deadline)),
+        asyncio.ensure_future(check_tls_rpt(domain, deadline)),
+    )
+    # petite marge : la recherche DKIM s'arrête d'elle-même à `timeout` et rend ce qu'elle a trouvé
+    await asyncio.wait((dkim, mta_sts, tls_rpt), timeout=timeout + 0.5)
+    result = MailPolicies()
+    for name, task in (("dkim", dkim), ("mta_sts", mta_sts), ("tls_rpt", tls_rpt)):
+        if task.done() and not task.cancelled() and task.exception() is None:
+            setattr(result, name, task.result())
+        else:
+            task.cancel()
+            result.evaluated = False
+    return result
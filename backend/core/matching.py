@@ -0,0 +1,102 @@
+from collections import deque
+from typing import Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SuffixTrie(Generic[T]):
+    #Trie des noms de domaine inversés (labels de droite à gauche) : trouve le suffixe enregistré
+    #le plus long d'un nom en un parcours de ses labels, quel que soit le nombre de suffixes.
+    #"github.io" reconnaît "x.github.io" et "github.io", pas "notgithub.io".
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, suffix: str, value: T):
+        node = self._root
+        for label in reversed(suffix.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node[None] = value  # clé None : un suffixe se termine ici
+
+    def match(self, name: str) -> Optional[T]:
+        node = self._root
+        found = None
+        for label in reversed(name.lower().strip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+class PatternAutomaton(Generic[T]):
+    #Automate d'Aho-Corasick : cherche tous les motifs d'un coup, en un seul passage sur le texte.
+    #Le coût dépend de la taille du texte, pas du nombre de motifs. Insensible à la casse.
+
+    def __init__(self, patterns: Iterable[tuple[str, T]] = ()):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[T]] = [[]]
+        for pattern, value in patterns:
+            self._add(pattern.lower(), value)
+        self._build()
+
+    def _add(self, pattern: str, value: T):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = nxt
+            state = nxt
+        self._out[state].append(value)
+
+    def _build(self):
+        # Liens d'échec en largeur : plus long suffixe du chemin courant qui est aussi un préfixe
+        # (les états de profondeur 1 échouent vers la racine, déjà initialisé à 0)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _run(self, state: int, text: str, found: set[T]) -> int:
+        goto, fail, out = self._goto, self._fail, self._out
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return state
+
+    def search(self, text: str) -> set[T]:
+        #Valeurs de tous les motifs présents dans le texte
+        found: set[T] = set()
+        self._run(0, text, found)
+        return found
+
+    def stream(self) -> "StreamSearch[T]":
+        return StreamSearch(self)
+
+
+class StreamSearch(Generic[T]):
+    #Recherche sur un texte reçu morceau par morceau : l'état de l'automate est conservé
+    #d'un morceau à l'autre, un motif à cheval sur deux morceaux est donc trouvé
+
+    def __init__(self, automaton: PatternAutomaton[T]):
+        self._automaton = automaton
+        self._state = 0
+        self.found: set[T] = set()
+
+    def feed(self, text: str) -> set[T]:
+        self._state = self._automaton._run(self._state, text, self.found)
+        return self.found
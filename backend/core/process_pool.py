@@ -0,0 +1,155 @@
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing.reduction import ForkingPickler
+from typing import Callable, Optional
+
+
+def _worker_main(conn, preload: list[str]):
+    # Boucle d'un processus worker : exécute les tâches reçues dans son thread principal
+    # (les bibliothèques qui utilisent des signaux Unix pour leurs timeouts y fonctionnent)
+    for module in preload:
+        importlib.import_module(module)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args, kwargs = task
+        try:
+            conn.send((True, fn(*args, **kwargs)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # exception non sérialisable : on ne renvoie que son message
+                conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    def __init__(self, ctx, preload: list[str]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+    def retire(self):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ProcessPool:
+    #Pool borné de processus gardés chauds (modules préchargés). Une tâche qui dépasse son délai
+    #est tuée avec son processus : CPU et sockets sont vraiment libérés, puis le worker est remplacé.
+    #Chaque worker est recyclé après `max_tasks` tâches.
+
+    def __init__(self, size: int, max_tasks: int = 100, preload: Optional[list[str]] = None):
+        self.size = size
+        self.max_tasks = max_tasks
+        self.preload = preload or []
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self.killed = 0
+
+    def start(self):
+        # Démarre tous les workers d'avance pour ne pas payer l'import au premier scan
+        with self._lock:
+            while self._spawned < self.size:
+                self._idle.put(_Worker(self._ctx, self.preload))
+                self._spawned += 1
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.retire()
+            with self._lock:
+                self._spawned -= 1
+
+    def _acquire(self, deadline: float) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._spawned < self.size:
+                self._spawned += 1
+                spawn = True
+            else:
+                spawn = False
+        if spawn:
+            try:
+                return _Worker(self._ctx, self.preload)
+            except Exception:
+                with self._lock:
+                    self._spawned -= 1
+                raise
+        try:
+            return self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise TimeoutError("aucun processus disponible avant l'échéance")
+
+    def _discard(self, worker: _Worker, kill: bool):
+        worker.kill() if kill else worker.retire()
+        with self._lock:
+            self._spawned -= 1
+
+    def run(self, fn: Callable, *args, timeout: float, **kwargs):
+        #Exécute fn(*args, **kwargs) dans un worker ; TimeoutError (worker tué) si le délai est dépassé.
+        #fn et ses arguments doivent être sérialisables (fonction définie au niveau d'un module).
+        deadline = time.monotonic() + timeout
+        # sérialisée avant de prendre un worker : une tâche non sérialisable n'en immobilise aucun
+        payload = ForkingPickler.dumps((fn, args, kwargs))
+        worker = self._acquire(deadline)
+        try:
+            worker.conn.send_bytes(payload)
+            finished = worker.conn.poll(max(0.0, deadline - time.monotonic()))
+            if finished:
+                ok, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            # le processus est mort en cours de route (crash, OOM…)
+            self._discard(worker, kill=True)
+            raise RuntimeError(f"processus worker perdu : {e}")
+        except BaseException:
+            # réponse illisible, interruption… : état du worker inconnu, il est remplacé
+            self._discard(worker, kill=True)
+            raise
+        if not finished:
+            with self._lock:
+                self.killed += 1
+            self._discard(worker, kill=True)
+            raise TimeoutError(f"tâche interrompue après {timeout}s")
+
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks:
+            self._discard(worker, kill=False)
+        else:
+            self._idle.put(worker)
+
+        if not ok:
+            raise value
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "processes": self._spawned, "idle": self._idle.qsize(), "killed": self.killed}
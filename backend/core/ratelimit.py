@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from core.deadline import Deadline
+
+# Temps laissé à la requête elle-même après l'attente de son tour
+MIN_REQUEST_TIME = 2.0
+
+
+class WaitTooLong(TimeoutError):
+    #Le tour de la requête viendrait après l'échéance du scan
+
+    def __init__(self, wait: float):
+        super().__init__(f"attente estimée {wait:.0f} s au-delà de l'échéance")
+        self.wait = wait
+
+
+class TokenBucket:
+    #Seau à jetons partagé par tout le processus : `rate` requêtes par `period` secondes au plus.
+    #Chaque appel réserve son créneau à l'avance, l'attente prévue pour le suivant est donc connue.
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.capacity = float(rate)
+        self.refill = rate / period  # jetons par seconde
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.reserved = 0
+
+    def _update(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill)
+        self._updated = now
+
+    def _wait(self) -> float:
+        return max(0.0, (1 - self._tokens) / self.refill)
+
+    def expected_wait(self) -> float:
+        #Attente d'une requête qui arriverait maintenant (0 s si un jeton est libre)
+        with self._lock:
+            self._update()
+            return self._wait()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        #Réserve un créneau et renvoie l'attente avant de l'utiliser ; None (rien réservé) si elle dépasse max_wait
+        with self._lock:
+            self._update()
+            wait = self._wait()
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            self.reserved += 1
+            return wait
+
+    def pause(self, seconds: float):
+        # Le serveur demande d'attendre (429, quota dépassé) : aucun créneau n'est libre avant `seconds`
+        with self._lock:
+            self._update()
+            self._tokens = min(self._tokens, 1 - seconds * self.refill)
+
+    async def acquire(self, deadline: Optional[Deadline] = None):
+        #Attend le créneau réservé ; WaitTooLong (sans rien réserver) s'il tomberait trop près de l'échéance
+        max_wait = deadline.remaining() - MIN_REQUEST_TIME if deadline is not None else None
+        wait = self.reserve(max_wait)
+        if wait is None:
+            raise WaitTooLong(self.expected_wait())
+        if wait:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.waiting -= 1
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": round(self.refill * 60, 1),
+            "expected_wait": round(self.expected_wait(), 1),
+            "waiting": self.waiting,
+            "reserved": self.reserved,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+import uuid
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, Callable, Optional
+
+from config import settings
+from api.models import ModuleResult, PlatformType, ScanResult, SeverityLevel
+from core import aio
+from core.deadline import Deadline, timeout_result
+from core.executor import BoundedExecutor
+from core.http_fetch import HomepageFetch
+from analyzers.platform_detector import detect_platform_async
+from analyzers.dns_analyzer import analyze_dns_async
+from analyzers.ssl_analyzer import analyze_ssl_async
+from analyzers.security_headers_analyzer import analyze_security_headers_async
+from analyzers.email_analyzer import analyze_email_async
+from analyzers.subdomain_takeover_analyzer import detect_subdomain_takeover_async
+from analyzers.domain_expiration import analyze_domain_expiration_async
+from analyzers.osint_breaches import analyze_osint_breaches_async
+
+# Les analyseurs sont des coroutines exécutées sur la boucle du moteur (core/aio.py).
+# Ces threads ne servent qu'aux modules encore synchrones, lancés tous en même temps.
+_executor = BoundedExecutor("scan", settings.SCAN_WORKERS, max_queued=8 * settings.SCAN_WORKERS)
+
+# Les modules visent une échéance un peu plus tôt que celle du scan, pour rendre
+# leur propre résultat "non évalué" avant que le scan ne les abandonne
+MODULE_MARGIN = 1.0
+
+
+def scan_modules(homepage: Optional[HomepageFetch] = None) -> list[tuple[str, Callable[..., ModuleResult]]]:
+    # Ordre du rapport (et du flux SSE). Résolu à l'appel pour rester patchable dans les tests.
+    # Les modules qui lisent la page d'accueil reçoivent celle du scan, téléchargée une seule fois.
+    return [
+        ("DNS Security", analyze_dns_async),
+        ("SSL/TLS Security", partial(analyze_ssl_async, homepage=homepage)),
+        ("Security Headers", partial(analyze_security_headers_async, homepage=homepage)),
+        ("Email Security", analyze_email_async),
+        ("Subdomain Takeover", detect_subdomain_takeover_async),
+        ("Domain Expiration", analyze_domain_expiration_async),
+        ("OSINT Breaches", analyze_osint_breaches_async),
+    ]
+
+
+def _submit(fn: Callable, *args, **kwargs) -> Future:
+    # Coroutine → boucle du moteur ; fonction synchrone → threads du scan
+    if inspect.iscoroutinefunction(fn):
+        return aio.submit(fn(*args, **kwargs))
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def _abandon(future: Future):
+    # Une coroutine est vraiment annulée ; un thread est retiré de la file ou compté comme abandonné
+    if not future.cancel():
+        _executor.abandon(future)
+
+
+def _error_result(module_name: str, error: Exception) -> ModuleResult:
+    # Les analyseurs attrapent déjà leurs exceptions, ceci ne sert qu'en dernier recours
+    return ModuleResult(
+        module_name=module_name,
+        status="error",
+        severity=SeverityLevel.HIGH,
+        score=0,
+        details={"error": str(error)},
+        recommendations=["Ce module a rencontré une erreur inattendue."],
+    )
+
+
+def build_scan_result(scan_id: str, domain: str, platform: PlatformType, modules: list[ModuleResult]) -> ScanResult:
+    overall_score = sum(m.score for m in modules) // len(modules)
+    return ScanResult(
+        scan_id=scan_id,
+        domain=domain,
+        platform=platform,
+        timestamp=datetime.now(),
+        overall_score=overall_score,
+        modules=modules,
+        summary="Scan complété.",
+        critical_issues=sum(1 for m in modules if m.severity == SeverityLevel.CRITICAL),
+        high_issues=sum(1 for m in modules if m.severity == SeverityLevel.HIGH),
+        medium_issues=sum(1 for m in modules if m.severity == SeverityLevel.MEDIUM),
+        low_issues=sum(1 for m in modules if m.severity == SeverityLevel.LOW),
+    )
+
+
+class ScanRun:
+    #Un scan en cours : tous les modules tournent en parallèle sous un délai global commun,
+    #transmis à chaque analyseur pour que ses appels réseau ne le dépassent pas
+
+    def __init__(self, domain: str, timeout: float | None = None, scan_id: Optional[str] = None):
+        self.domain = domain
+        self.scan_id = scan_id or str(uuid.uuid4())
+        self.deadline = Deadline(timeout if timeout is not None else settings.SCAN_TIMEOUT)
+        module_deadline = self.deadline.shortened(MODULE_MARGIN)
+        self.homepage = HomepageFetch(domain, deadline=module_deadline)
+        self.platform_future: Future = _submit(
+            detect_platform_async, domain, homepage=self.homepage, deadline=module_deadline
+        )
+        self.futures: dict[str, Future] = {
+            name: _submit(fn, domain, deadline=module_deadline) for name, fn in scan_modules(self.homepage)
+        }
+
+    def remaining(self) -> float:
+        return self.deadline.remaining()
+
+    def platform(self) -> PlatformType:
+        try:
+            return self.platform_future.result(timeout=self.remaining())
+        except FuturesTimeoutError:
+            _abandon(self.platform_future)
+            return PlatformType.UNKNOWN
+        except Exception:
+            return PlatformType.UNKNOWN
+
+    def module_result(self, name: str) -> ModuleResult:
+        # Attend le module jusqu'à la fin du délai global, sans jamais bloquer au-delà
+        future = self.futures[name]
+        try:
+            return future.result(timeout=self.remaining())
+        except FuturesTimeoutError:
+            _abandon(future)
+            return timeout_result(name)
+        except Exception as e:
+            return _error_result(name, e)
+
+    async def completed(self) -> AsyncIterator[tuple[str, ModuleResult]]:
+        # Rend chaque module dès qu'il termine (ordre de fin, pas ordre du rapport),
+        # puis les modules encore en cours au délai global, notés "non évalué"
+        pending = {asyncio.wrap_future(future): name for name, future in self.futures.items()}
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=self.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                name = pending.pop(task)
+                yield name, self.module_result(name)
+        for name in pending.values():
+            yield name, self.module_result(name)
+
+    def result(self) -> ScanResult:
+        modules = [self.module_result(name) for name in self.futures]
+        return build_scan_result(self.scan_id, self.domain, self.platform(), modules)
+
+
+def run_scan(domain: str, timeout: float | None = None, scan_id: Optional[str] = None) -> ScanResult:
+    #Lance un scan complet et attend son résultat (au plus `timeout` secondes)
+    return ScanRun(domain, timeout, scan_id).result()
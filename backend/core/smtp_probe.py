@@ -0,0 +1,167 @@
+import asyncio
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+from core import aio
+from core.deadline import Deadline, DeadlineExceeded, budget
+
+# Ports essayés sur chaque serveur MX (en même temps) ; à réponses égales, le premier l'emporte
+PORTS = (25, 587)
+
+# Délai de connexion d'un essai : fixe, l'essai est partagé par tous les scans qui l'attendent
+CONNECT_TIMEOUT = 10
+
+
+@dataclass
+class SmtpResult:
+    host: str
+    port: int
+    banner: str
+    starttls: bool
+
+
+def _probe(host: str, port: int, timeout: float) -> SmtpResult:
+    #Connexion SMTP (bloquante) : bannière du serveur et support de STARTTLS
+    smtp = smtplib.SMTP(host, port, timeout=timeout)
+    # La bannière est dans la réponse initiale du serveur
+    banner = smtp.getwelcome()
+    if isinstance(banner, bytes):
+        banner = banner.decode('utf-8', errors='ignore')
+    banner = str(banner).strip()
+    smtp.ehlo()
+    starttls = smtp.has_extn('STARTTLS')
+    smtp.quit()
+    return SmtpResult(host=host, port=port, banner=banner, starttls=starttls)
+
+
+def _reach(host: str, port: int, timeout: float) -> Optional[SmtpResult]:
+    #Issue réseau d'un essai : résultat, ou None si le port est fermé, filtré ou muet. Une exception
+    #qui sort de aio.blocking vient donc du serveur d'audit (exécuteur saturé, tâche abandonnée)
+    try:
+        return _probe(host, port, timeout)
+    except Exception:
+        return None
+
+
+class SmtpProbeCache:
+    #Résultats SMTP par serveur MX : des milliers de domaines clients partagent les mêmes serveurs
+    #de messagerie hébergés, qui ne sont contactés qu'une fois par durée de validité. Un serveur
+    #injoignable sur tous les ports est retenu moins longtemps. Un seul essai en vol par serveur,
+    #partagé par tous les scans qui le demandent en même temps.
+
+    def __init__(self, ttl: int, negative_ttl: int, max_entries: int = 4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Optional[SmtpResult]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, host: str) -> tuple[bool, Optional[SmtpResult]]:
+        # (trouvé, résultat) ; résultat None : serveur injoignable lors du dernier essai
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(host)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[host]
+            self.misses += 1
+            return False, None
+
+    def _store(self, host: str, result: Optional[SmtpResult]):
+        ttl = self.ttl if result is not None else self.negative_ttl
+        with self._lock:
+            self._entries[host] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _probe_host(self, host: str) -> Optional[SmtpResult]:
+        # Tous les ports en même temps, résultat du premier port de PORTS qui répond : la bannière
+        # retenue ne dépend pas de l'ordre d'arrivée. Seule une issue réseau complète est gardée en
+        # cache ; un essai perdu côté audit n'est pas noté « injoignable » pour tous les domaines du MX
+        outcomes = await asyncio.gather(
+            *(aio.blocking(_reach, host, port, CONNECT_TIMEOUT, timeout=CONNECT_TIMEOUT + 5) for port in PORTS),
+            return_exceptions=True,
+        )
+        result = next((o for o in outcomes if isinstance(o, SmtpResult)), None)
+        failures = [o for o in outcomes if isinstance(o, BaseException)]
+        if not failures:
+            self._store(host, result)
+        elif result is None:
+            raise failures[0]
+        return result
+
+    def _host_task(self, host: str) -> asyncio.Future:
+        task = self._inflight.get(host)
+        if task is None:
+            task = asyncio.ensure_future(self._probe_host(host))
+            self._inflight[host] = task
+            task.add_done_callback(lambda _: self._inflight.pop(host, None))
+        else:
+            self.coalesced += 1
+        return task
+
+    async def probe(self, hosts: list[str], deadline: Optional[Deadline] = None) -> Optional[SmtpResult]:
+        #Premier serveur MX qui répond (tous interrogés en même temps, résultats en cache d'abord) ;
+        #None si tous sont injoignables. DeadlineExceeded si l'échéance tombe avant une réponse,
+        #ExecutorSaturated si le serveur d'audit n'a pas pu faire les essais : ce ne sont pas des ports filtrés
+        pending = []
+        for host in dict.fromkeys(h.lower().rstrip('.') for h in hosts):
+            found, result = self._lookup(host)
+            if found and result is not None:
+                return result
+            if not found:
+                pending.append(host)
+        if not pending:
+            return None
+
+        # les essais sont partagés : un scan qui s'arrête (échéance, premier résultat) ne les annule pas
+        waiting = {asyncio.shield(self._host_task(host)) for host in pending}
+        timeout = budget(deadline, CONNECT_TIMEOUT + 5)
+        started = time.monotonic()
+        failure: Optional[BaseException] = None
+        try:
+            while waiting:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise DeadlineExceeded("sonde SMTP interrompue par l'échéance du scan")
+                done, waiting = await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        failure = failure or task.exception()
+                    elif task.result() is not None:
+                        return task.result()
+            if failure is not None:
+                raise failure
+            return None
+        finally:
+            for task in waiting:
+                task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+cache = SmtpProbeCache(settings.SMTP_CACHE_TTL, settings.SMTP_NEGATIVE_TTL)
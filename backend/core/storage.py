@@ -0,0 +1,56 @@
+from api.models import ModuleResult, PlatformType, ScanResult, SeverityLevel
+from db_models import ModuleRecord, ScanRecord
+
+
+def result_to_db(scan_id: str, result: ScanResult) -> ScanRecord:
+    record = ScanRecord(
+        scan_id=scan_id,
+        domain=result.domain,
+        platform=result.platform.value,
+        timestamp=result.timestamp,
+        overall_score=result.overall_score,
+        summary=result.summary,
+        critical_issues=result.critical_issues,
+        high_issues=result.high_issues,
+        medium_issues=result.medium_issues,
+        low_issues=result.low_issues,
+        modules=[
+            ModuleRecord(
+                scan_id=scan_id,
+                module_name=m.module_name,
+                status=m.status,
+                severity=m.severity.value,
+                score=m.score,
+                details=m.details,
+                recommendations=m.recommendations,
+            )
+            for m in result.modules
+        ],
+    )
+    return record
+
+
+def db_to_result(record: ScanRecord) -> ScanResult:
+    return ScanResult(
+        scan_id=record.scan_id,
+        domain=record.domain,
+        platform=PlatformType(record.platform),
+        timestamp=record.timestamp,
+        overall_score=record.overall_score,
+        summary=record.summary,
+        critical_issues=record.critical_issues,
+        high_issues=record.high_issues,
+        medium_issues=record.medium_issues,
+        low_issues=record.low_issues,
+        modules=[
+            ModuleResult(
+                module_name=m.module_name,
+                status=m.status,
+                severity=SeverityLevel(m.severity),
+                score=m.score,
+                details=m.details,
+                recommendations=m.recommendations,
+            )
+            for m in record.modules
+        ],
+    )
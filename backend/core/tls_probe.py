@@ -0,0 +1,292 @@
+import asyncio
+import datetime
+import socket
+import ssl
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import certifi
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.utils import CryptographyDeprecationWarning
+from cryptography.x509 import DNSName
+from cryptography.x509.oid import AuthorityInformationAccessOID
+from cryptography.x509.verification import PolicyBuilder, Store, VerificationError
+
+from core import aio
+from core.cert_cache import CertFacts, cache as cert_cache
+from core.deadline import Deadline, budget
+
+# Versions testées une à une (handshakes simultanés), de la plus ancienne à la plus récente
+PROTOCOLS = {
+    "TLSv1": ssl.TLSVersion.TLSv1,
+    "TLSv1.1": ssl.TLSVersion.TLSv1_1,
+    "TLSv1.2": ssl.TLSVersion.TLSv1_2,
+    "TLSv1.3": ssl.TLSVersion.TLSv1_3,
+}
+LEGACY_PROTOCOLS = ("TLSv1", "TLSv1.1")
+# Erreurs de validation qui n'ont pas besoin d'un second avis
+LOCAL_VERDICTS = (None, "no certificate presented", "certificate has expired", "certificate is not yet valid", "self-signed certificate")
+
+# Intermédiaires absents de la chaîne lue (Python < 3.13 ne donne que le certificat du site) :
+# téléchargés depuis l'adresse AIA « CA Issuers » du certificat, gardés par adresse
+AIA_TIMEOUT = 5
+AIA_MAX_DEPTH = 3
+AIA_CACHE_SIZE = 256
+_aia_cache: "OrderedDict[str, tuple[x509.Certificate, ...]]" = OrderedDict()
+_aia_lock = threading.Lock()
+
+
+class VerificationInconclusive(Exception):
+    # Validation locale en échec et second avis d'OpenSSL impossible : ni valide ni invalide
+    pass
+
+
+@dataclass
+class TlsProbe:
+    # Ce qu'un seul handshake (sans validation) révèle du serveur, plus la validation faite ensuite en local
+    version: str
+    cipher: str
+    bits: int
+    cert: Optional[CertFacts] = None  # None : aucun certificat présenté
+    verify_error: Optional[str] = None  # None : chaîne de confiance et nom de domaine valides
+    verify_inconclusive: Optional[str] = None  # validation non tranchée (second avis injoignable)
+
+
+def _unverified_context(version: Optional[ssl.TLSVersion] = None) -> ssl.SSLContext:
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    if version is not None:
+        # versions anciennes : autorisées côté client le temps de savoir si le serveur les accepte
+        ctx.set_ciphers("ALL:@SECLEVEL=0")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            ctx.minimum_version = ctx.maximum_version = version
+    return ctx
+
+
+def _peer_chain(ssock: ssl.SSLSocket) -> list[bytes]:
+    # Chaîne envoyée par le serveur, en DER (API publique depuis Python 3.13), sinon le certificat
+    # seul : les intermédiaires manquants sont alors téléchargés par AIA (complete_chain)
+    get_chain = getattr(ssock, "get_unverified_chain", None)
+    if get_chain is not None:
+        ders = get_chain() or []
+    else:
+        ders = [ssock.getpeercert(binary_form=True)]
+    return [der for der in ders if der]
+
+
+@lru_cache(maxsize=1)
+def _trust_anchors() -> tuple[x509.Certificate, ...]:
+    # Autorités de certifi lues une à une : un certificat que cryptography refuse ou signale
+    # (numéro de série négatif…) est écarté sans empêcher de charger les autres
+    with open(certifi.where(), encoding="ascii") as f:
+        bundle = f.read()
+    marker = "-----BEGIN CERTIFICATE-----"
+    roots = []
+    for block in bundle.split(marker)[1:]:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", CryptographyDeprecationWarning)
+                roots.append(x509.load_pem_x509_certificate((marker + block).encode()))
+        except (ValueError, CryptographyDeprecationWarning):
+            continue
+    return tuple(roots)
+
+
+@lru_cache(maxsize=1)
+def _trust_store() -> Store:
+    return Store(list(_trust_anchors()))
+
+
+@lru_cache(maxsize=1)
+def _root_names() -> frozenset[x509.Name]:
+    return frozenset(root.subject for root in _trust_anchors())
+
+
+def _parse_issuers(data: bytes) -> tuple[x509.Certificate, ...]:
+    # Réponse AIA : certificat DER (le plus courant), PEM ou paquet PKCS#7 (.p7c)
+    for load in (
+        lambda: [x509.load_der_x509_certificate(data)],
+        lambda: x509.load_pem_x509_certificates(data),
+        lambda: pkcs7.load_der_pkcs7_certificates(data),
+    ):
+        try:
+            return tuple(load())
+        except ValueError:
+            continue
+    return ()
+
+
+def _aia_url(cert: x509.Certificate) -> Optional[str]:
+    try:
+        aia = cert.extensions.get_extension_for_class(x509.AuthorityInformationAccess).value
+    except x509.ExtensionNotFound:
+        return None
+    for description in aia:
+        location = description.access_location
+        if (description.access_method == AuthorityInformationAccessOID.CA_ISSUERS
+                and isinstance(location, x509.UniformResourceIdentifier)
+                and location.value.startswith("http")):
+            return location.value
+    return None
+
+
+def _issuers(url: str, timeout: float) -> tuple[x509.Certificate, ...]:
+    # Certificats publiés à l'adresse AIA ; une réponse valide est gardée (même intermédiaire pour
+    # des milliers de sites), un échec ne l'est pas
+    with _aia_lock:
+        cached = _aia_cache.get(url)
+        if cached is not None:
+            _aia_cache.move_to_end(url)
+            return cached
+    response = aio.run(aio.get(url, timeout=timeout, follow_redirects=True))
+    response.raise_for_status()
+    certs = _parse_issuers(response.content)
+    if certs:
+        with _aia_lock:
+            _aia_cache[url] = certs
+            while len(_aia_cache) > AIA_CACHE_SIZE:
+                _aia_cache.popitem(last=False)
+    return certs
+
+
+def complete_chain(chain: list[x509.Certificate], deadline: Optional[Deadline] = None) -> list[x509.Certificate]:
+    #Ajoute les intermédiaires manquants (AIA) jusqu'à une autorité de certifi ; s'arrête sans
+    #erreur si une adresse manque ou ne répond pas (la validation dira alors ce qui manque)
+    completed = list(chain)
+    for _ in range(AIA_MAX_DEPTH):
+        last = completed[-1]
+        if last.issuer == last.subject or last.issuer in _root_names():
+            break
+        if any(cert.subject == last.issuer for cert in completed):
+            break  # émetteur déjà présenté par le serveur
+        url = _aia_url(last)
+        if url is None:
+            break
+        try:
+            candidates = _issuers(url, budget(deadline, AIA_TIMEOUT))
+        except Exception:
+            break
+        issuer = next((cert for cert in candidates if cert.subject == last.issuer), None)
+        if issuer is None:
+            break
+        completed.append(issuer)
+    return completed
+
+
+def validate(chain: list[x509.Certificate], domain: str) -> Optional[str]:
+    #Valide la chaîne en local (autorités de certifi, nom de domaine, dates) ; None si valide,
+    #sinon la raison, dans les termes d'OpenSSL ("certificate has expired"…)
+    if not chain:
+        return "no certificate presented"
+    leaf = chain[0]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if leaf.not_valid_after_utc < now:
+        return "certificate has expired"
+    if leaf.not_valid_before_utc > now:
+        return "certificate is not yet valid"
+    verifier = (
+        PolicyBuilder()
+        .store(_trust_store())
+        .time(now)
+        .build_server_verifier(DNSName(domain.encode("idna").decode()))
+    )
+    try:
+        verifier.verify(leaf, chain[1:])
+    except VerificationError as e:
+        if len(chain) == 1 and leaf.issuer == leaf.subject:
+            return "self-signed certificate"
+        return str(e)
+    return None
+
+
+def _openssl_accepts(domain: str, port: int, deadline: Optional[Deadline]) -> Optional[bool]:
+    # Second avis d'OpenSSL, seulement quand la validation locale refuse pour une raison inhabituelle
+    # (son profil RFC 5280 est plus strict que celui des navigateurs sur certains détails). None si
+    # le handshake n'aboutit pas pour une autre raison que le certificat (délai, connexion coupée…)
+    context = ssl.create_default_context()
+    try:
+        with socket.create_connection((domain, port), timeout=budget(deadline, 10)) as sock:
+            with context.wrap_socket(sock, server_hostname=domain):
+                return True
+    except ssl.SSLCertVerificationError:
+        return False
+    except OSError:  # ssl.SSLError et TimeoutError compris
+        return None
+
+
+def verify_chain(chain: list[x509.Certificate], domain: str, port: int = 443,
+                 deadline: Optional[Deadline] = None) -> Optional[str]:
+    #Validation locale, après avoir complété la chaîne par AIA ; un refus inhabituel est soumis à
+    #OpenSSL. VerificationInconclusive si ce second avis n'a pas pu être obtenu.
+    error = validate(chain, domain)
+    if error in LOCAL_VERDICTS:
+        return error
+    completed = complete_chain(chain, deadline)
+    if len(completed) > len(chain):
+        error = validate(completed, domain)
+        if error in LOCAL_VERDICTS:
+            return error
+    accepted = _openssl_accepts(domain, port, deadline)
+    if accepted is None:
+        raise VerificationInconclusive(error)
+    return None if accepted else error
+
+
+def probe(domain: str, deadline: Optional[Deadline] = None, port: int = 443) -> TlsProbe:
+    #Handshake unique sans validation (bloquant) : version, suite de chiffrement et chaîne complète,
+    #même quand le certificat serait rejeté ; la validation est ensuite faite en local. Un certificat
+    #déjà vu (CDN, hébergement mutualisé) n'est ni relu ni revalidé pour le même domaine.
+    with socket.create_connection((domain, port), timeout=budget(deadline, 10)) as sock:
+        with _unverified_context().wrap_socket(sock, server_hostname=domain) as ssock:
+            cipher, _, bits = ssock.cipher()
+            result = TlsProbe(version=ssock.version(), cipher=cipher, bits=bits or 0)
+            ders = _peer_chain(ssock)
+
+    try:
+        result.cert, result.verify_error = cert_cache.inspect(
+            ders, domain, lambda chain: verify_chain(chain, domain, port, deadline)
+        )
+    except VerificationInconclusive as e:
+        # rien n'est mis en cache : le prochain scan refera la validation
+        result.cert = cert_cache.facts(ders[0])
+        result.verify_inconclusive = str(e)
+    return result
+
+
+def accepts(domain: str, version: str, deadline: Optional[Deadline] = None, port: int = 443) -> Optional[bool]:
+    #Le serveur accepte-t-il cette version du protocole ? None si elle n'est pas testable d'ici
+    #(version désactivée dans l'OpenSSL local) ou si le serveur n'a pas répondu
+    try:
+        context = _unverified_context(PROTOCOLS[version])
+    except (ValueError, ssl.SSLError):
+        return None
+    try:
+        with socket.create_connection((domain, port), timeout=budget(deadline, 5)) as sock:
+            with context.wrap_socket(sock, server_hostname=domain) as ssock:
+                return ssock.version() == version
+    except ssl.SSLError:
+        return False
+    except OSError:
+        return None
+
+
+async def probe_async(domain: str, deadline: Optional[Deadline] = None, port: int = 443) -> TlsProbe:
+    return await aio.blocking(probe, domain, deadline, port)
+
+
+async def enumerate_versions(domain: str, deadline: Optional[Deadline] = None, port: int = 443) -> dict[str, Optional[bool]]:
+    #Versions acceptées par le serveur : un handshake par version, tous en même temps
+    async def one(version: str) -> Optional[bool]:
+        try:
+            return await aio.blocking(accepts, domain, version, deadline, port)
+        except (TimeoutError, aio.ExecutorSaturated):
+            return None
+    results = await asyncio.gather(*(one(version) for version in PROTOCOLS))
+    return dict(zip(PROTOCOLS, results))
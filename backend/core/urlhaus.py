@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import mmap
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+from config import settings
+from core import aio
+
+# Délai avant un nouvel essai quand le téléchargement de la liste a échoué
+RETRY_DELAY = 300
+# Intervalle entre deux vérifications du fichier par lookup() (instantané reconstruit par un autre processus)
+RELOAD_CHECK = 30
+
+
+def host_hash(host: str) -> int:
+    # Empreinte 64 bits du nom : 8 octets par domaine, collisions négligeables à l'échelle d'URLhaus
+    digest = hashlib.blake2b(host.lower().strip().rstrip(".").encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _host_in_line(line: str) -> Optional[str]:
+    # Formats URLhaus : hostfile ("127.0.0.1<TAB>host"), CSV (colonne url), liste d'URL ou de domaines
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith('"'):
+        fields = next(csv.reader([line]))
+        line = next((f for f in fields if "://" in f), "")
+    else:
+        line = line.split()[-1]
+    if "://" in line:
+        line = urlsplit(line).hostname or ""
+    return line.lower().rstrip(".") or None
+
+
+def _read_hosts(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            host = _host_in_line(line)
+            if host is not None:
+                yield host
+
+
+def build_snapshot(source_paths: Iterable[str], output_path: str) -> int:
+    #Écrit l'instantané : empreintes 64 bits triées et dédoublonnées, à la suite (8 octets chacune).
+    #Remplacement atomique, l'instantané en service n'est jamais vu à moitié écrit.
+    hashes = sorted({host_hash(host) for path in source_paths for host in _read_hosts(path)})
+    tmp = f"{output_path}.tmp"
+    with open(tmp, "wb") as f:
+        array("Q", hashes).tofile(f)
+    os.replace(tmp, output_path)
+    return len(hashes)
+
+
+class HostSnapshot:
+    #Ensemble de domaines listés, projeté en mémoire : recherche dichotomique sur les empreintes
+    #triées, sans rien charger ni appel réseau
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._hashes = memoryview(self._mm).cast("Q") if self._mm is not None else ()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, host: str) -> bool:
+        wanted = host_hash(host)
+        i = bisect_left(self._hashes, wanted)
+        return i < len(self._hashes) and self._hashes[i] == wanted
+
+
+class UrlhausFeed:
+    #Instantané URLhaus local, retéléchargé en tâche de fond toutes les `interval` secondes.
+    #Sans fichier configuré (ou pas encore téléchargé), lookup() renvoie None : l'appelant
+    #se rabat sur l'API en ligne.
+
+    def __init__(self, path: Optional[str], url: str, interval: int):
+        self.path = path
+        self.url = url
+        self.interval = interval
+        self._snapshot: Optional[HostSnapshot] = None
+        self._signature: Optional[tuple[int, int]] = None  # (inode, mtime en ns) du fichier ouvert
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.refreshes = 0
+        self.errors = 0
+
+    def _current(self) -> Optional[HostSnapshot]:
+        # Rouvert si le fichier a changé (rafraîchissement, ou reconstruit par un autre processus) :
+        # os.replace donne un nouvel inode, même quand la date de modification ne bouge pas
+        self._checked = time.monotonic()
+        try:
+            stat = os.stat(self.path) if self.path else None
+        except OSError:
+            stat = None
+        if stat is None:
+            return self._snapshot
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._snapshot = HostSnapshot(self.path)
+                    self._signature = signature
+        return self._snapshot
+
+    def lookup(self, host: str) -> Optional[bool]:
+        # Instantané déjà ouvert : pas d'appel système, sauf une vérification du fichier toutes
+        # les RELOAD_CHECK secondes ; le reste est une recherche en mémoire
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._checked >= RELOAD_CHECK:
+            snapshot = self._current()
+        if snapshot is None:
+            return None
+        return host in snapshot
+
+    def refresh(self):
+        #Télécharge la liste URLhaus (en flux, vers un fichier temporaire) et reconstruit l'instantané,
+        #aussitôt utilisé par lookup() (appelé hors boucle asynchrone)
+        download = f"{self.path}.download"
+        try:
+            aio.run(aio.download(self.url, download, timeout=60, follow_redirects=True))
+            build_snapshot([download], self.path)
+        finally:
+            if os.path.exists(download):
+                os.remove(download)
+        self.refreshes += 1
+        self._current()
+
+    def _age(self) -> Optional[float]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        return time.time() - os.path.getmtime(self.path)
+
+    def _run(self):
+        while not self._stop.is_set():
+            age = self._age()
+            wait = self.interval - age if age is not None else 0
+            if wait <= 0:
+                try:
+                    self.refresh()
+                    wait = self.interval
+                except Exception:
+                    self.errors += 1  # on garde l'instantané précédent, nouvel essai plus tard
+                    wait = min(RETRY_DELAY, self.interval)
+            self._stop.wait(wait)
+
+    def start(self):
+        if not self.path:
+            return
+        self._stop.clear()
+        threading.Thread(target=self._run, name="urlhaus-refresh", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        snapshot = self._current()
+        age = self._age()
+        return {
+            "hosts": len(snapshot) if snapshot is not None else None,
+            "age": round(age) if age is not None else None,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+feed = UrlhausFeed(settings.URLHAUS_SNAPSHOT_PATH, settings.URLHAUS_SNAPSHOT_URL, settings.URLHAUS_REFRESH_INTERVAL)
@@ -0,0 +1,125 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from database import SessionLocal
+from db_models import WhoisCacheRecord
+from core import aio
+
+# Durée de vie d'un résultat WHOIS : un dixième du temps restant avant expiration, entre 6 h et 30 j.
+# Un domaine loin de son échéance n'est pas réinterrogé avant longtemps, un domaine proche l'est
+# vite pour voir son renouvellement. Une réponse sans date n'est gardée qu'une heure.
+MIN_TTL = timedelta(hours=6)
+MAX_TTL = timedelta(days=30)
+NEGATIVE_TTL = timedelta(hours=1)
+
+# Délai max d'une lecture/écriture en base (le cache ne doit jamais ralentir le scan)
+DB_TIMEOUT = 2
+
+
+@dataclass
+class WhoisEntry:
+    expiration_date: Optional[datetime]  # UTC
+    registrar: Optional[str]
+    fetched_at: datetime
+    expires_at: datetime
+
+
+def entry_ttl(expiration_date: Optional[datetime], now: datetime) -> timedelta:
+    if expiration_date is None:
+        return NEGATIVE_TTL
+    return min(MAX_TTL, max(MIN_TTL, (expiration_date - now) / 10))
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite rend des dates naïves : elles ont été écrites en UTC
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None else None
+
+
+class WhoisCache:
+    #Résultats WHOIS par domaine enregistré, en mémoire et en base (table whois_cache) pour survivre
+    #aux redémarrages. Sans session_factory, cache en mémoire seulement.
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        self._session_factory = session_factory
+        self._memory: dict[str, WhoisEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, domain: str) -> Optional[WhoisEntry]:
+        db = self._session_factory()
+        try:
+            record = db.get(WhoisCacheRecord, domain)
+            if record is None:
+                return None
+            return WhoisEntry(_utc(record.expiration_date), record.registrar, _utc(record.fetched_at), _utc(record.expires_at))
+        finally:
+            db.close()
+
+    def _save(self, domain: str, entry: WhoisEntry):
+        db = self._session_factory()
+        try:
+            db.merge(WhoisCacheRecord(
+                domain=domain,
+                expiration_date=_naive(entry.expiration_date),
+                registrar=entry.registrar,
+                fetched_at=_naive(entry.fetched_at),
+                expires_at=_naive(entry.expires_at),
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    async def get(self, domain: str) -> Optional[WhoisEntry]:
+        #Résultat encore valide pour ce domaine enregistré, sinon None
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._memory.get(domain)
+        if entry is None and self._session_factory is not None:
+            try:
+                entry = await aio.blocking(self._load, domain, timeout=DB_TIMEOUT)
+            except Exception:
+                entry = None  # base indisponible : on interroge le WHOIS
+            if entry is not None:
+                with self._lock:
+                    self._memory[domain] = entry
+        if entry is None or entry.expires_at <= now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    async def put(self, domain: str, expiration_date: Optional[datetime], registrar: Optional[str]) -> WhoisEntry:
+        now = datetime.now(timezone.utc)
+        entry = WhoisEntry(expiration_date, str(registrar) if registrar else None, now,
+                           now + entry_ttl(expiration_date, now))
+        with self._lock:
+            self._memory[domain] = entry
+        if self._session_factory is not None:
+            try:
+                await aio.blocking(self._save, domain, entry, timeout=DB_TIMEOUT)
+            except Exception:
+                pass  # le cache mémoire suffit jusqu'au redémarrage
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._memory)
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+cache = WhoisCache(SessionLocal)
@@ -0,0 +1,162 @@
+import asyncio
+import random
+import re
+import time
+from functools import partial
+from typing import Optional
+
+import whois  # type: ignore[import-untyped]
+from whois.exceptions import PywhoisError, WhoisQuotaExceededError  # type: ignore[import-untyped]
+
+from config import settings
+from core import aio
+from core.deadline import Deadline, DeadlineExceeded, budget
+from core.ratelimit import TokenBucket, WaitTooLong
+
+# Réponses par lesquelles les registres signalent un quota dépassé (texte WHOIS, sans code d'erreur)
+THROTTLED = re.compile(
+    r"limit exceeded|too many (requests|queries)|quota exceeded|rate limit|try again later",
+    re.IGNORECASE,
+)
+
+# Attente de base entre deux tentatives (doublée à chaque fois) et pause imposée au registre
+# qui signale un quota dépassé
+BACKOFF = 1.0
+THROTTLE_PAUSE = 30.0
+
+
+class Throttled(ConnectionError):
+    pass
+
+
+class WhoisUnavailable(Exception):
+    #Registre injoignable ou encore en quota dépassé après toutes les tentatives : la date
+    #d'expiration n'est pas disponible, ce n'est pas une erreur du domaine
+    pass
+
+
+def registry_of(domain: str) -> str:
+    # Un serveur WHOIS par extension : example.fr → fr, example.co.uk → uk
+    return domain.lower().strip(".").rsplit(".", 1)[-1]
+
+
+class RegistryServer:
+    #File d'un serveur WHOIS : requêtes simultanées bornées, débit cadencé, latence suivie
+
+    def __init__(self, name: str, concurrency: int, rate_per_minute: int):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute)
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.lookups = 0
+        self.failures = 0
+        self.retries = 0
+        self.throttled = 0
+        self.latency: Optional[float] = None  # moyenne glissante (secondes)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Créé à la première utilisation, sur la boucle qui l'utilise
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def observe(self, seconds: float):
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "lookups": self.lookups,
+            "failures": self.failures,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "expected_wait": round(self.bucket.expected_wait(), 1),
+        }
+
+
+class WhoisDispatcher:
+    #Requêtes WHOIS regroupées par serveur de registre : chaque serveur a sa propre limite de
+    #connexions simultanées et de débit, pour ne pas se faire bloquer quand un lot de .fr ou de
+    #.com les interroge tous en même temps. Erreurs réseau et quotas dépassés sont retentés avec
+    #une attente croissante, tant que l'échéance du scan le permet.
+
+    def __init__(self, concurrency: int, rate_per_minute: int, attempts: int = 3,
+                 server_rates: Optional[dict[str, int]] = None):
+        self.concurrency = concurrency
+        self.rate_per_minute = rate_per_minute
+        self.attempts = attempts
+        self.server_rates = server_rates or {}
+        self._servers: dict[str, RegistryServer] = {}
+
+    def server(self, domain: str) -> RegistryServer:
+        name = registry_of(domain)
+        server = self._servers.get(name)
+        if server is None:
+            rate = self.server_rates.get(name, self.rate_per_minute)
+            server = self._servers.setdefault(name, RegistryServer(name, self.concurrency, rate))
+        return server
+
+    async def _query(self, server: RegistryServer, domain: str, deadline: Optional[Deadline]):
+        async with server.semaphore:
+            await server.bucket.acquire(deadline)
+            timeout = budget(deadline, 15)
+            server.in_flight += 1
+            started = time.monotonic()
+            try:
+                # erreurs réseau levées plutôt qu'une réponse vide, pour pouvoir retenter ; le socket
+                # expire avec le budget, le thread n'est donc pas abandonné bloqué
+                query = partial(whois.whois, ignore_socket_errors=False, timeout=max(1, int(timeout)))
+                result = await aio.blocking(query, domain, timeout=timeout)
+            finally:
+                server.in_flight -= 1
+            server.observe(time.monotonic() - started)
+        text = getattr(result, "text", "")
+        if isinstance(text, str) and THROTTLED.search(text) and not result.get("expiration_date"):
+            raise Throttled(f"quota WHOIS dépassé sur le registre .{server.name}")
+        return result
+
+    async def lookup(self, domain: str, deadline: Optional[Deadline] = None):
+        #Même résultat que whois.whois(domain) ; TimeoutError si l'échéance est atteinte avant une réponse,
+        #WhoisUnavailable si le registre ne répond pas (ou reste en quota) après toutes les tentatives,
+        #ExecutorSaturated (sans nouvelle tentative) si l'exécuteur partagé refuse la requête
+        server = self.server(domain)
+        server.lookups += 1
+        for attempt in range(self.attempts):
+            try:
+                return await self._query(server, domain, deadline)
+            except WhoisQuotaExceededError as e:
+                error: Exception = Throttled(str(e))
+            except (PywhoisError, DeadlineExceeded, WaitTooLong):
+                raise  # réponse du registre (domaine inconnu…) ou plus de temps : inutile de retenter
+            except OSError as e:
+                error = e
+            if isinstance(error, Throttled):
+                server.throttled += 1
+                server.bucket.pause(THROTTLE_PAUSE)
+            if attempt == self.attempts - 1:
+                server.failures += 1
+                if isinstance(error, TimeoutError):
+                    raise error
+                if isinstance(error, Throttled):
+                    raise WhoisUnavailable(f"quota WHOIS dépassé sur le registre .{server.name}") from error
+                raise WhoisUnavailable(f"registre WHOIS .{server.name} injoignable") from error
+            delay = BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            if deadline is not None and delay >= deadline.remaining():
+                server.failures += 1
+                raise TimeoutError(f"WHOIS .{server.name} : plus de temps pour une nouvelle tentative")
+            server.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {name: server.stats() for name, server in sorted(self._servers.items())}
+
+
+dispatcher = WhoisDispatcher(
+    settings.WHOIS_CONCURRENCY_PER_SERVER,
+    settings.WHOIS_RATE_PER_SERVER,
+    settings.WHOIS_ATTEMPTS,
+    settings.WHOIS_SERVER_RATES,
+)
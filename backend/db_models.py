@@ -33,3 +33,45 @@ class ModuleRecord(Base):
     recommendations = Column(JSON, nullable=False, default=list)
 
     scan = relationship("ScanRecord", back_populates="modules")
+
+
+class ScanJobRecord(Base):
+    __tablename__ = "scan_jobs"
+
+    scan_id = Column(String, primary_key=True)
+    domain = Column(String, nullable=False)
+    state = Column(String, nullable=False, default="queued", index=True)  # queued, running, done, error
+    priority = Column(Integer, nullable=False, default=0)  # 0 = scan unitaire, 1 = scan en lot
+    batch_id = Column(String, ForeignKey("batches.batch_id"), nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    batch = relationship("BatchRecord", back_populates="jobs")
+    scan = relationship(
+        "ScanRecord",
+        primaryjoin="foreign(ScanJobRecord.scan_id) == ScanRecord.scan_id",
+        viewonly=True,
+    )
+
+
+class BatchRecord(Base):
+    __tablename__ = "batches"
+
+    batch_id = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    total = Column(Integer, nullable=False)
+
+    jobs = relationship("ScanJobRecord", back_populates="batch")
+
+
+class WhoisCacheRecord(Base):
+    __tablename__ = "whois_cache"
+
+    domain = Column(String, primary_key=True)  # domaine enregistré (example.co.uk)
+    expiration_date = Column(DateTime, nullable=True)  # None : WHOIS sans date (réponse négative)
+    registrar = Column(String, nullable=True)
+    fetched_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -3,6 +3,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
 from database import Base, engine
+from core import aio, cert_cache, ct_index, dns_cache, executor, hibp, jobs, smtp_probe, urlhaus, whois_cache, whois_dispatch
+from analyzers.dns_analyzer import checkdmarc_pool
 import db_models  # noqa: F401 — enregistre les modèles ORM avant create_all
 
 # Import des routes
@@ -13,7 +15,15 @@ from api.chat import router as chat_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    checkdmarc_pool.start()
+    jobs.queue.start()
+    urlhaus.feed.start()
     yield
+    urlhaus.feed.stop()
+    jobs.queue.stop()
+    checkdmarc_pool.shutdown()
+    ct_index.close_index()
+    aio.shutdown()
 
 
 app = FastAPI(
@@ -47,7 +57,20 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "aio": aio.stats(),
+        "dns_cache": dns_cache.stats(),
+        "cert_cache": cert_cache.cache.stats(),
+        "smtp_cache": smtp_probe.cache.stats(),
+        "hibp_catalog": hibp.catalog.stats(),
+        "hibp_search": hibp.domain_search.stats(),
+        "urlhaus": urlhaus.feed.stats(),
+        "whois_cache": whois_cache.cache.stats(),
+        "whois_servers": whois_dispatch.dispatcher.stats(),
+        "executors": executor.all_stats(),
+        "checkdmarc_pool": checkdmarc_pool.stats(),
+    }
 
 
 # Inclusion des routes API
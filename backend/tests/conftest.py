@@ -0,0 +1,19 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+import db_models  # noqa: F401 — enregistre les modèles ORM avant create_all
+
+
+@pytest.fixture
+def session_factory():
+    """Base SQLite temporaire ; une connexion par thread (les workers de la file écrivent depuis leurs threads)."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+    os.remove(path)
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from core import aio
+from core.scanner import run_scan, scan_modules
+from api.models import ModuleResult, PlatformType, SeverityLevel
+
+
+def _fake_async_module(name, delay=0.0):
+    """Faux analyseur asynchrone : attend `delay` secondes sans occuper de thread."""
+    async def analyze(domain, deadline=None):
+        await asyncio.sleep(delay)
+        return ModuleResult(module_name=name, status="success", severity=SeverityLevel.LOW, score=100, details={})
+    return analyze
+
+
+def test_milliers_de_sondes_sans_threads():
+    """2 000 attentes réseau simulées de 0,3 s en vol en même temps → ~0,3 s, sans créer de threads."""
+    async def probe():
+        await asyncio.sleep(0.3)
+        return 1
+
+    threads_before = threading.active_count()
+    start = time.monotonic()
+    futures = [aio.submit(probe()) for _ in range(2000)]
+    total = sum(f.result(timeout=10) for f in futures)
+
+    assert total == 2000
+    assert time.monotonic() - start < 3
+    assert threading.active_count() <= threads_before + 1  # au plus le thread de la boucle
+
+
+def test_appel_bloquant_interrompu():
+    """Appel bloquant trop long → TimeoutError, la boucle reste disponible."""
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError):
+        aio.run(aio.blocking(release.wait, 10, timeout=0.2))
+    release.set()
+
+    assert aio.run(aio.blocking(sum, [1, 2], timeout=5)) == 3
+
+
+@patch('core.scanner.detect_platform_async', return_value=PlatformType.CUSTOM)
+def test_scan_modules_asynchrones(mock_platform):
+    """Les modules coroutines tournent sur la boucle et sont annulés au délai du scan."""
+    modules = [
+        (name, _fake_async_module(name, delay=5 if name == "OSINT Breaches" else 0.1))
+        for name, _ in scan_modules()
+    ]
+    with patch('core.scanner.scan_modules', return_value=modules):
+        start = time.monotonic()
+        result = run_scan("example.com", timeout=1)
+
+    assert time.monotonic() - start < 2
+    osint = next(m for m in result.modules if m.module_name == "OSINT Breaches")
+    assert "non évalué" in osint.details["warning"]
+    assert all(m.score == 100 for m in result.modules if m.module_name != "OSINT Breaches")
+
+
+def _streaming_client(chunks, sent):
+    """Client HTTP factice dont la réponse arrive en morceaux ; `sent` compte les morceaux envoyés."""
+    async def body():
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body())))
+
+
+def test_corps_lu_en_flux_et_plafonne():
+    """Réponse de 10 Mo, limite de 4 Ko → seuls les premiers morceaux sont lus, le texte est tronqué."""
+    sent = []
+    client = _streaming_client([b"x" * 1024] * 10_240, sent)
+
+    with patch.object(aio.engine, 'client', return_value=client):
+        response = aio.run(aio.get_text("https://example.com", max_bytes=4096))
+
+    assert len(response.text) == 4096
+    assert response.truncated is True
+    assert len(sent) <= 5
+
+
+def test_telechargement_ecrit_au_fil_de_l_eau(tmp_path):
+    """Liste de 10 Mo → écrite morceau par morceau dans le fichier, sans passer par un corps en mémoire."""
+    sent = []
+    client = _streaming_client([b"x" * 1024] * 10_240, sent)
+    path = tmp_path / "liste.txt"
+
+    with patch.object(aio.engine, 'client', return_value=client):
+        written = aio.run(aio.download("https://example.com/liste.txt", str(path)))
+
+    assert written == path.stat().st_size == 10 * 1024 * 1024
+    assert len(sent) == 10_240
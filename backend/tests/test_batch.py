@@ -0,0 +1,82 @@
+import time
+from unittest.mock import patch
+from core.batch import create_batch, batch_status, parse_domains_file, prepare_domains
+from core.jobs import JobQueue
+from core.scanner import build_scan_result
+from api.models import ModuleResult, PlatformType, SeverityLevel
+
+
+def _fake_scan(domain, scan_id=None):
+    """Scan instantané : un seul module noté 80."""
+    module = ModuleResult(module_name="DNS Security", status="success", severity=SeverityLevel.LOW, score=80, details={})
+    return build_scan_result(scan_id, domain, PlatformType.CUSTOM, [module])
+
+
+def _wait_finished(db, batch, timeout=5):
+    """Attend que tous les domaines du lot soient terminés."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        status = batch_status(db, batch, 0, 100)
+        if status.done + status.failed == status.total:
+            return status
+        time.sleep(0.05)
+    raise AssertionError("lot non terminé")
+
+
+def test_fichier_texte_et_csv():
+    """Un domaine par ligne ou en première colonne CSV ; lignes vides et commentaires ignorés."""
+    content = b"\xef\xbb\xbfexample.com\n\n# clients 2025\nshop.example.org,Boutique\nhttps://www.example.net/\n"
+
+    assert parse_domains_file(content) == ["example.com", "shop.example.org", "https://www.example.net/"]
+
+
+def test_domaines_normalises_dedoublonnes_et_rejetes():
+    """Les doublons sont fusionnés après normalisation et les formats invalides mis de côté."""
+    accepted, rejected = prepare_domains(["Example.com", "https://www.example.com/", "pas un domaine", "example.org"])
+
+    assert accepted == ["example.com", "example.org"]
+    assert rejected == ["pas un domaine"]
+
+
+@patch('core.jobs.ensure_domain_resolves')
+@patch('core.jobs.run_scan', side_effect=_fake_scan)
+def test_lot_scanne_et_pagine(mock_scan, mock_resolves, session_factory):
+    """Chaque domaine est scanné, enregistré comme un scan classique et paginé dans l'ordre de fin."""
+    factory = session_factory
+    db = factory()
+    queue = JobQueue(factory, workers=2)
+
+    batch = create_batch(db, ["a.example.com", "b.example.com", "c.example.com"])
+    queue.start()
+    try:
+        status = _wait_finished(db, batch)
+        page = batch_status(db, batch, offset=1, limit=1)
+    finally:
+        queue.stop()
+
+    assert status.done == 3
+    assert {r.domain for r in status.results} == {"a.example.com", "b.example.com", "c.example.com"}
+    assert all(r.overall_score == 80 for r in status.results)
+    assert len(page.results) == 1
+    assert page.results[0].domain == status.results[1].domain
+
+
+@patch('core.jobs.ensure_domain_resolves', side_effect=ValueError("Le domaine 'absent.example' n'existe pas"))
+@patch('core.jobs.run_scan', side_effect=_fake_scan)
+def test_domaine_inexistant_en_erreur(mock_scan, mock_resolves, session_factory):
+    """Un domaine qui ne résout pas est marqué en erreur sans bloquer le reste du lot."""
+    factory = session_factory
+    db = factory()
+    queue = JobQueue(factory, workers=1)
+
+    batch = create_batch(db, ["absent.example"])
+    queue.start()
+    try:
+        status = _wait_finished(db, batch)
+    finally:
+        queue.stop()
+
+    assert status.failed == 1
+    assert "n'existe pas" in status.results[0].error
+    mock_scan.assert_not_called()
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import Encoding
+from core.cert_cache import CertCache
+from tests.test_ssl_analyzer import _certificate
+
+
+def _der(days):
+    """Certificat (DER) expirant dans `days` jours."""
+    return _certificate(datetime.now(timezone.utc) + timedelta(days=days), name="cdn.example.net").public_bytes(Encoding.DER)
+
+
+def test_certificat_partage_lu_une_seule_fois():
+    """Même certificat sur deux domaines → lu une fois, validé par domaine, domaines retenus."""
+    cache = CertCache()
+    der = _der(90)
+    verify = MagicMock(return_value=None)
+
+    with patch('core.cert_cache.x509.load_der_x509_certificate', wraps=x509.load_der_x509_certificate) as load:
+        first, _ = cache.inspect([der], "a.example.com", verify)
+        second, error = cache.inspect([der], "B.example.com.", verify)
+        cache.inspect([der], "a.example.com", verify)
+
+    assert first is second and error is None
+    assert load.call_count == 1
+    assert verify.call_count == 2  # un par domaine, le troisième scan reprend le résultat
+    assert set(cache.domains(first.fingerprint)) == {"a.example.com", "b.example.com"}
+    assert cache.stats()["shared"] == 1
+
+
+def test_certificats_expirant_avec_domaines_touches():
+    """Certificat partagé qui expire bientôt → une alerte listant tous ses domaines."""
+    cache = CertCache()
+    soon, later = _der(10), _der(300)
+    for domain in ("a.example.com", "b.example.com"):
+        cache.inspect([soon], domain, lambda chain: None)
+    cache.inspect([later], "c.example.com", lambda chain: None)
+
+    expiring = cache.expiring(days=30)
+
+    assert len(expiring) == 1
+    assert expiring[0]["subject"] == "cdn.example.net"
+    assert expiring[0]["domains"] == ["a.example.com", "b.example.com"]
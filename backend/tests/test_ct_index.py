@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import time
+from unittest.mock import patch
+from analyzers.subdomain_takeover_analyzer import detect_subdomain_takeover
+from core.ct_index import CtIndex, build_index, close_index, open_index
+
+
+def test_index_construit_depuis_les_dumps(tmp_path):
+    """Noms en clair, JSON certstream et .gz : normalisés, dédoublonnés, recherchés par domaine."""
+    (tmp_path / "a.txt").write_text("www.example.com\n*.shop.example.com\nWWW.example.com.\nnotexample.com\n")
+    with gzip.open(tmp_path / "b.gz", "wt") as f:
+        f.write(json.dumps({"data": {"leaf_cert": {"all_domains": ["api.v2.example.com", "example.com"]}}}) + "\n")
+        f.write(json.dumps({"all_domains": ["mail.other.org"]}) + "\n")
+    output = tmp_path / "ct.idx"
+
+    count = build_index([str(tmp_path / "a.txt"), str(tmp_path / "b.gz")], str(output), run_size=2)
+    index = CtIndex(str(output))
+
+    assert count == 6  # tri externe par segments de 2 noms, doublons fusionnés
+    assert sorted(index.subdomains("example.com")) == ["api.v2", "shop", "www"]
+    assert index.subdomains("other.org") == ["mail"]
+    assert index.subdomains("absent.net") == []
+    index.close()
+
+
+def test_recherche_en_quelques_millisecondes(tmp_path):
+    """200 000 noms indexés : les sous-domaines d'un domaine sortent en moins de 10 ms."""
+    dump = tmp_path / "dump.txt"
+    dump.write_text("".join(f"host{i}.site{i % 20000}.com\n" for i in range(200_000)))
+    output = tmp_path / "ct.idx"
+    build_index([str(dump)], str(output))
+    index = CtIndex(str(output))
+
+    start = time.perf_counter()
+    labels = index.subdomains("site1234.com")
+    elapsed = time.perf_counter() - start
+    index.close()
+
+    assert len(labels) == 10
+    assert elapsed < 0.01
+
+
+@patch('analyzers.subdomain_takeover_analyzer._resolve_cname')
+def test_takeover_amorce_par_l_index(mock_cname, tmp_path):
+    """Un sous-domaine absent de la liste de mots mais vu dans les certificats est testé en premier."""
+    dump = tmp_path / "dump.txt"
+    dump.write_text("legacy-portal.example.com\n")
+    build_index([str(dump)], str(tmp_path / "ct.idx"))
+    mock_cname.return_value = None
+
+    with patch('analyzers.subdomain_takeover_analyzer.settings.CT_INDEX_PATH', str(tmp_path / "ct.idx")):
+        result = detect_subdomain_takeover("example.com", wordlist=["www"])
+
+    tested = [call.args[0] for call in mock_cname.call_args_list]
+    assert "legacy-portal.example.com" in tested
+    assert result.details["sous_domaines_ct"] == 1
+    assert result.details["subdomains_prevus"] == 2
+    close_index()
+
+
+def test_index_reconstruit_rouvert_et_ancien_ferme(tmp_path):
+    """Index reconstruit (nouvelle date) → rouvert, l'ancien mmap et son descripteur sont fermés."""
+    dump = tmp_path / "dump.txt"
+    output = str(tmp_path / "ct.idx")
+    dump.write_text("www.example.com\n")
+    build_index([str(dump)], output)
+    first = open_index(output)
+
+    assert open_index(output) is first  # même fichier : index partagé
+    dump.write_text("api.example.com\n")
+    build_index([str(dump)], output)
+    os.utime(output, (time.time() + 10, time.time() + 10))
+    second = open_index(output)
+
+    assert second is not first
+    assert second.subdomains("example.com") == ["api"]
+    assert first._file.closed and first._mm.closed
+    close_index()
+    assert second._file.closed
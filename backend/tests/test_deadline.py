@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import patch
+from core.deadline import Deadline, DeadlineExceeded, budget
+from analyzers.dns_analyzer import analyze_dns
+from analyzers.osint_breaches import analyze_osint_breaches
+from api.models import SeverityLevel
+
+
+def test_timeout_borne_par_le_temps_restant():
+    """Le timeout d'un appel ne dépasse ni son plafond ni le temps restant au scan."""
+    assert budget(None, 10) == 10
+    assert budget(Deadline(60), 10) == 10
+    assert budget(Deadline(2), 10) <= 2
+
+
+def test_echeance_depassee_leve_une_erreur():
+    """Plus de temps → DeadlineExceeded (une TimeoutError) plutôt qu'un appel réseau voué à échouer."""
+    deadline = Deadline(0)
+
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10)
+    with pytest.raises(TimeoutError):
+        budget(deadline, 10)
+
+
+def test_echeance_raccourcie():
+    """L'échéance des modules tombe avant celle du scan."""
+    deadline = Deadline(10)
+
+    assert deadline.shortened(1).remaining() < deadline.remaining()
+
+
+@patch('analyzers.dns_analyzer._run_checkdmarc')
+def test_dns_sans_temps_pour_checkdmarc(mock_checkdmarc):
+    """Échéance trop proche → checkdmarc n'est pas lancé et le module rend "non évalué"."""
+    result = analyze_dns("example.com", deadline=Deadline(0))
+
+    mock_checkdmarc.assert_not_called()
+    assert result.status == "warning"
+    assert result.severity == SeverityLevel.MEDIUM
+    assert "non évalué" in result.details["warning"]
+
+
+@patch('analyzers.osint_breaches.aio.get')
+def test_osint_echeance_depassee(mock_get):
+    """Échéance dépassée → aucune requête HIBP et un résultat "non évalué", pas une erreur."""
+    result = analyze_osint_breaches("example.com", deadline=Deadline(0))
+
+    mock_get.assert_not_called()
+    assert result.status == "warning"
+    assert "non évalué" in result.details["warning"]
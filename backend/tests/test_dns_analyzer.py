@@ -13,7 +13,7 @@ def _resultat_checkdmarc(spf=True, dmarc=True, dmarc_record="v=DMARC1; p=reject"
     }
 
 
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_score_100_quand_tout_est_configure(mock_check):
     """Cas idéal : SPF + DMARC p=reject + DNSSEC + MX → score 100, aucune recommandation."""
     mock_check.return_value = _resultat_checkdmarc()
@@ -23,9 +23,10 @@ def test_score_100_quand_tout_est_configure(mock_check):
     assert result.score == 100
     assert result.severity == SeverityLevel.LOW
     assert result.recommendations == []
+    assert "verification" not in result.details  # checkdmarc a répondu : pas de secours
 
 
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_score_reduit_si_spf_manquant(mock_check):
     """Sans SPF, le score perd 25 points et une recommandation est ajoutée."""
     mock_check.return_value = _resultat_checkdmarc(spf=False)
@@ -36,7 +37,7 @@ def test_score_reduit_si_spf_manquant(mock_check):
     assert any("SPF" in r for r in result.recommendations)
 
 
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_recommendation_dmarc_quarantine(mock_check):
     """DMARC en mode quarantine → score inchangé mais recommandation de passer à p=reject."""
     mock_check.return_value = _resultat_checkdmarc(
@@ -49,7 +50,7 @@ def test_recommendation_dmarc_quarantine(mock_check):
     assert any("p=reject" in r for r in result.recommendations)
 
 
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_dnssec_non_evalue_score_rescale(mock_check):
     """Fallback dnspython (DNSSEC non vérifiable) → 80/80 points vérifiables → score 100."""
     mock_check.return_value = _resultat_checkdmarc(dnssec=None)
@@ -62,7 +63,7 @@ def test_dnssec_non_evalue_score_rescale(mock_check):
 
 
 @patch('analyzers.dns_analyzer._check_dnskey', return_value=True)
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_dnssec_faux_negatif_checkdmarc_rattrape(mock_check, mock_dnskey):
     """checkdmarc rate le test DNSSEC mais les DNSKEY existent → contre-vérification → score 100."""
     mock_check.return_value = _resultat_checkdmarc(dnssec=False)
@@ -75,7 +76,7 @@ def test_dnssec_faux_negatif_checkdmarc_rattrape(mock_check, mock_dnskey):
 
 
 @patch('analyzers.dns_analyzer._check_dnskey', return_value=False)
-@patch('analyzers.dns_analyzer.checkdmarc.check_domains')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
 def test_score_zero_rien_configure(mock_check, mock_dnskey):
     """Sans SPF, DMARC, DNSSEC et MX → score 0, sévérité CRITIQUE."""
     mock_check.return_value = _resultat_checkdmarc(spf=False, dmarc=False, dnssec=False, mx=False)
@@ -85,3 +86,18 @@ def test_score_zero_rien_configure(mock_check, mock_dnskey):
     assert result.score == 0
     assert result.severity == SeverityLevel.CRITICAL
     assert len(result.recommendations) >= 4  # SPF, DMARC, DNSSEC, MX
+
+
+@patch('analyzers.dns_analyzer._fallback_dns_check')
+@patch('analyzers.dns_analyzer._run_checkdmarc')
+def test_secours_signale_dans_le_rapport(mock_check, mock_fallback):
+    """checkdmarc sans processus libre à temps → vérification de secours, signalée dans les détails."""
+    mock_check.side_effect = TimeoutError("aucun processus disponible avant l'échéance")
+    mock_fallback.return_value = _resultat_checkdmarc()
+
+    result = analyze_dns("example.com")
+
+    assert result.score == 100
+    assert result.details["verification"] == (
+        "secours dnspython (checkdmarc indisponible : aucun processus disponible avant l'échéance)"
+    )
@@ -0,0 +1,95 @@
+import asyncio
+import dns.resolver
+import pytest
+from unittest.mock import patch, MagicMock
+from core import dns_cache
+from core.dns_cache import DnsCache
+
+
+def _fake_answer(ttl=300):
+    """Crée une fausse réponse dnspython avec le TTL donné."""
+    answer = MagicMock()
+    answer.rrset.ttl = ttl
+    return answer
+
+
+@patch('core.dns_cache.dns.resolver.resolve')
+def test_reponse_servie_depuis_le_cache(mock_resolve):
+    """Deuxième résolution identique → aucune requête DNS, compteur de hits incrémenté."""
+    mock_resolve.return_value = _fake_answer()
+    cache = DnsCache()
+
+    first = cache.resolve("example.com", "MX")
+    second = cache.resolve("Example.com.", "mx")
+
+    assert first is second
+    assert mock_resolve.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@patch('core.dns_cache.time.monotonic')
+@patch('core.dns_cache.dns.resolver.resolve')
+def test_entree_expiree_apres_ttl(mock_resolve, mock_clock):
+    """Une fois le TTL de l'enregistrement écoulé, on interroge de nouveau le DNS."""
+    mock_resolve.return_value = _fake_answer(ttl=60)
+    mock_clock.return_value = 1000.0
+    cache = DnsCache()
+
+    cache.resolve("example.com", "A")
+    mock_clock.return_value = 1061.0
+    cache.resolve("example.com", "A")
+
+    assert mock_resolve.call_count == 2
+
+
+@patch('core.dns_cache.dns.resolver.resolve')
+def test_cache_negatif_nxdomain(mock_resolve):
+    """NXDOMAIN est mis en cache : l'exception est relevée sans nouvelle requête."""
+    mock_resolve.side_effect = dns.resolver.NXDOMAIN()
+    cache = DnsCache()
+
+    for _ in range(3):
+        with pytest.raises(dns.resolver.NXDOMAIN):
+            cache.resolve("absent.example.com", "CNAME")
+
+    assert mock_resolve.call_count == 1
+    assert cache.stats()["hits"] == 2
+
+
+@patch('core.dns_cache.dns.resolver.resolve')
+def test_eviction_lru(mock_resolve):
+    """Au-delà de la taille max, l'entrée la moins récemment utilisée est évincée."""
+    mock_resolve.side_effect = lambda *a, **kw: _fake_answer()
+    cache = DnsCache(max_entries=2)
+
+    cache.resolve("a.example.com")
+    cache.resolve("b.example.com")
+    cache.resolve("a.example.com")  # a redevient la plus récente
+    cache.resolve("c.example.com")  # évince b
+    cache.resolve("a.example.com")
+    cache.resolve("b.example.com")
+
+    assert cache.stats()["entries"] == 2
+    assert mock_resolve.call_count == 4  # a, b, c, puis b de nouveau
+
+
+@patch('core.dns_cache.dns.asyncresolver.resolve')
+def test_balayage_n_evince_pas_le_cache_partage(mock_resolve):
+    """Cent noms balayés (takeover, DKIM) → l'enregistrement MX du cache partagé reste servi."""
+    mock_resolve.side_effect = lambda *a, **kw: _fake_answer()
+
+    async def scan():
+        await dns_cache.resolve_async("example.com", "MX")
+        for i in range(100):
+            await dns_cache.resolve_sweep_async(f"label{i}.example.com", "CNAME")
+        await dns_cache.resolve_async("example.com", "MX")
+
+    with patch('core.dns_cache._cache', DnsCache(max_entries=10)), \
+         patch('core.dns_cache._sweep_cache', DnsCache(max_entries=10)):
+        asyncio.run(scan())
+        stats = dns_cache.stats()
+
+    assert mock_resolve.call_count == 101  # le MX n'est demandé qu'une fois
+    assert stats["hits"] == 1
+    assert stats["sweep"]["entries"] == 10
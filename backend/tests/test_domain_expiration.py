@@ -1,7 +1,18 @@
+import asyncio
+import pytest
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timezone, timedelta
 from analyzers.domain_expiration import analyze_domain_expiration
 from api.models import SeverityLevel
+from core.executor import ExecutorSaturated
+from core.whois_cache import MAX_TTL, MIN_TTL, NEGATIVE_TTL, WhoisCache, entry_ttl
+
+
+@pytest.fixture(autouse=True)
+def _cache_vide():
+    """Chaque test part d'un cache WHOIS vide, en mémoire seulement."""
+    with patch('core.whois_cache.cache', WhoisCache()):
+        yield
 
 
 def _fake_whois(expiry_date, registrar="OVH"):
@@ -12,7 +23,7 @@ def _fake_whois(expiry_date, registrar="OVH"):
     return w
 
 
-@patch('analyzers.domain_expiration.whois.whois')
+@patch('core.whois_dispatch.whois.whois')
 def test_score_100_domaine_valide_longtemps(mock_whois):
     """Domaine valide 500 jours → score 100, sévérité LOW."""
     expiry = datetime.now(timezone.utc) + timedelta(days=500)
@@ -24,7 +35,7 @@ def test_score_100_domaine_valide_longtemps(mock_whois):
     assert result.severity == SeverityLevel.LOW
 
 
-@patch('analyzers.domain_expiration.whois.whois')
+@patch('core.whois_dispatch.whois.whois')
 def test_score_0_expire_dans_5_jours(mock_whois):
     """Domaine expirant dans 5 jours (< 7j) → score 0, CRITIQUE, message URGENT."""
     expiry = datetime.now(timezone.utc) + timedelta(days=5)
@@ -37,7 +48,7 @@ def test_score_0_expire_dans_5_jours(mock_whois):
     assert any("URGENT" in r for r in result.recommendations)
 
 
-@patch('analyzers.domain_expiration.whois.whois')
+@patch('core.whois_dispatch.whois.whois')
 def test_score_30_expire_dans_15_jours(mock_whois):
     """Domaine expirant dans 15 jours (7j < x < 30j) → score 30, HIGH."""
     expiry = datetime.now(timezone.utc) + timedelta(days=15)
@@ -49,7 +60,7 @@ def test_score_30_expire_dans_15_jours(mock_whois):
     assert result.severity == SeverityLevel.HIGH
 
 
-@patch('analyzers.domain_expiration.whois.whois')
+@patch('core.whois_dispatch.whois.whois')
 def test_date_indisponible_retourne_warning(mock_whois):
     """WHOIS sans date d'expiration → score 50, statut warning."""
     mock_whois.return_value = _fake_whois(None)
@@ -58,3 +69,64 @@ def test_date_indisponible_retourne_warning(mock_whois):
 
     assert result.score == 50
     assert result.status == "warning"
+
+
+@patch('core.aio.external.submit')
+def test_executeur_sature_distinct_du_timeout(mock_submit):
+    """Exécuteur partagé saturé → warning qui l'indique, sans le confondre avec un registre muet."""
+    mock_submit.side_effect = ExecutorSaturated("exécuteur external saturé")
+
+    result = analyze_domain_expiration("example.com")
+
+    assert result.score == 50
+    assert result.details["expiration_date"] == "non disponible (serveur d'audit surchargé)"
+
+
+@patch('core.whois_dispatch.whois.whois')
+def test_scan_repete_sans_whois(mock_whois):
+    """Deuxième scan (même sous un autre sous-domaine) → servi par le cache, WHOIS interrogé une fois."""
+    mock_whois.return_value = _fake_whois(datetime.now(timezone.utc) + timedelta(days=500))
+
+    first = analyze_domain_expiration("example.com")
+    second = analyze_domain_expiration("www.example.com")
+
+    mock_whois.assert_called_once()
+    assert mock_whois.call_args.args == ("example.com",)
+    assert second.score == first.score == 100
+    assert "whois_verifie_le" in second.details
+
+
+def test_duree_de_vie_selon_jours_restants():
+    """Échéance lointaine → 30 j ; proche → 6 h ; sans date → 1 h."""
+    now = datetime.now(timezone.utc)
+
+    assert entry_ttl(now + timedelta(days=900), now) == MAX_TTL
+    assert entry_ttl(now + timedelta(days=100), now) == timedelta(days=10)
+    assert entry_ttl(now + timedelta(days=1), now) == MIN_TTL
+    assert entry_ttl(None, now) == NEGATIVE_TTL
+
+
+def test_cache_persistant_en_base(session_factory):
+    """Résultat relu depuis la base par une nouvelle instance (redémarrage), date en UTC."""
+    factory = session_factory
+    expiry = datetime(2030, 5, 1, tzinfo=timezone.utc)
+
+    asyncio.run(WhoisCache(factory).put("example.fr", expiry, "OVH"))
+    entry = asyncio.run(WhoisCache(factory).get("example.fr"))
+
+    assert entry.expiration_date == expiry
+    assert entry.registrar == "OVH"
+
+
+@patch('core.whois_dispatch.whois.whois')
+def test_whois_sur_le_domaine_du_client_pas_le_suffixe(mock_whois):
+    """Deux associations sous asso.fr → deux requêtes WHOIS, chacune sur son domaine, dates distinctes."""
+    now = datetime.now(timezone.utc)
+    expiries = {"club-a.asso.fr": now + timedelta(days=500), "club-b.asso.fr": now + timedelta(days=15)}
+    mock_whois.side_effect = lambda domain, **kwargs: _fake_whois(expiries[domain])
+
+    first = analyze_domain_expiration("www.club-a.asso.fr")
+    second = analyze_domain_expiration("club-b.asso.fr")
+
+    assert [c.args[0] for c in mock_whois.call_args_list] == ["club-a.asso.fr", "club-b.asso.fr"]
+    assert first.score == 100 and second.score == 30
@@ -0,0 +1,13 @@
+from core.domains import registered_domain
+
+
+def test_domaine_enregistre_selon_la_liste_des_suffixes_publics():
+    """Suffixes de second niveau (asso.fr, avocat.fr, me.uk, co.uk) → le domaine du client, pas le suffixe."""
+    assert registered_domain("monclub.asso.fr") == "monclub.asso.fr"
+    assert registered_domain("www.monclub.asso.fr") == "monclub.asso.fr"
+    assert registered_domain("cabinet.avocat.fr") == "cabinet.avocat.fr"
+    assert registered_domain("shop.example.me.uk") == "example.me.uk"
+    assert registered_domain("forum.example.co.uk") == "example.co.uk"
+    assert registered_domain("Www.Example.com.") == "example.com"
+    # paris.fr n'est pas un suffixe public : c'est le domaine enregistré par la ville
+    assert registered_domain("mairie.paris.fr") == "paris.fr"
@@ -1,6 +1,15 @@
+import pytest
 from unittest.mock import patch, MagicMock
 from analyzers.email_analyzer import analyze_email
 from api.models import SeverityLevel
+from core.smtp_probe import SmtpProbeCache
+
+
+@pytest.fixture(autouse=True)
+def _smtp_cache():
+    """Cache SMTP vide pour chaque test (le cache partagé garderait les serveurs d'un test à l'autre)."""
+    with patch('core.smtp_probe.cache', SmtpProbeCache(ttl=3600, negative_ttl=600)):
+        yield
 
 
 def _make_mx_record(hostname):
@@ -20,8 +29,8 @@ def test_score_100_configuration_parfaite():
     mock_sock = MagicMock()
     mock_sock.recv.return_value = b"220 mail.example.com ESMTP"
 
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', return_value=mx_records), \
-         patch('analyzers.email_analyzer.smtplib.SMTP', return_value=mock_smtp), \
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.smtplib.SMTP', return_value=mock_smtp), \
          patch('analyzers.email_analyzer.socket.create_connection', return_value=mock_sock):
         result = analyze_email("example.com")
 
@@ -34,8 +43,8 @@ def test_m365_mx_pas_de_penalite_redondance():
     mx_records = [_make_mx_record("eon.mail.protection.outlook.com")]
 
     # SMTP et socket inaccessibles (comportement normal sur Exchange)
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', return_value=mx_records), \
-         patch('analyzers.email_analyzer.smtplib.SMTP', side_effect=Exception("Port closed")), \
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.smtplib.SMTP', side_effect=Exception("Port closed")), \
          patch('analyzers.email_analyzer.socket.create_connection', side_effect=Exception("Port closed")):
         result = analyze_email("example.com")
 
@@ -47,8 +56,8 @@ def test_ports_smtp_filtres_score_rescale_sur_verifiable():
     """Ports 25/587 filtrés + MX/redondance parfaits → 45/45 points vérifiables → score 100."""
     mx_records = [_make_mx_record("mail1.example.com"), _make_mx_record("mail2.example.com")]
 
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', return_value=mx_records), \
-         patch('analyzers.email_analyzer.smtplib.SMTP', side_effect=Exception("Port closed")):
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.smtplib.SMTP', side_effect=Exception("Port closed")):
         result = analyze_email("example.com")
 
     assert result.score == 100
@@ -56,12 +65,25 @@ def test_ports_smtp_filtres_score_rescale_sur_verifiable():
     assert result.details["starttls"] == "non évalué (ports 25 et 587 inaccessibles depuis le scanner)"
 
 
+def test_sonde_smtp_sans_reponse_avant_echeance_pas_des_ports_filtres():
+    """Sonde SMTP interrompue par l'échéance du scan → critères exclus du score, sans parler de ports filtrés."""
+    mx_records = [_make_mx_record("mail1.example.com"), _make_mx_record("mail2.example.com")]
+
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.cache.probe', side_effect=TimeoutError("délai du scan écoulé")):
+        result = analyze_email("example.com")
+
+    assert result.score == 100
+    assert result.details["starttls"] == "non évalué (délai du scan dépassé)"
+    assert not any("filtrés" in r for r in result.recommendations)
+
+
 def test_ports_smtp_filtres_mx_unique_score_partiel():
     """Ports 25/587 filtrés + 1 seul MX générique → 25/45 points vérifiables → score 56."""
     mx_records = [_make_mx_record("mail.example.com")]
 
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', return_value=mx_records), \
-         patch('analyzers.email_analyzer.smtplib.SMTP', side_effect=Exception("Port closed")):
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.smtplib.SMTP', side_effect=Exception("Port closed")):
         result = analyze_email("example.com")
 
     assert result.score == 56
@@ -77,8 +99,8 @@ def test_mx_unique_non_m365_recommandation_redondance():
     mock_sock = MagicMock()
     mock_sock.recv.return_value = b"220 mail.example.com ESMTP"
 
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', return_value=mx_records), \
-         patch('analyzers.email_analyzer.smtplib.SMTP', return_value=mock_smtp), \
+    with patch('core.dns_cache.dns.asyncresolver.resolve', return_value=mx_records), \
+         patch('core.smtp_probe.smtplib.SMTP', return_value=mock_smtp), \
          patch('analyzers.email_analyzer.socket.create_connection', return_value=mock_sock):
         result = analyze_email("example.com")
 
@@ -87,7 +109,7 @@ def test_mx_unique_non_m365_recommandation_redondance():
 
 def test_aucun_mx_score_zero():
     """Sans MX, le score est 0, sévérité CRITIQUE."""
-    with patch('analyzers.email_analyzer.dns.resolver.resolve', side_effect=Exception("NXDOMAIN")):
+    with patch('core.dns_cache.dns.asyncresolver.resolve', side_effect=Exception("NXDOMAIN")):
         result = analyze_email("example.com")
 
     assert result.score == 0
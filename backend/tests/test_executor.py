@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+from core.executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_resultat_dans_le_delai():
+    """Tâche rapide → résultat renvoyé, plus rien d'actif ni en file ensuite."""
+    executor = BoundedExecutor("test-ok", max_workers=2, max_queued=10)
+
+    assert executor.run(sum, [1, 2, 3], timeout=5) == 6
+    assert executor.stats()["active"] == 0
+    assert executor.stats()["queued"] == 0
+
+
+def test_timeout_compte_la_tache_abandonnee():
+    """Délai dépassé → TimeoutError, la tâche encore bloquée est comptée comme abandonnée."""
+    executor = BoundedExecutor("test-timeout", max_workers=1, max_queued=10)
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError):
+        executor.run(release.wait, 10, timeout=0.2)
+
+    assert executor.stats()["abandoned"] == 1
+    release.set()
+    time.sleep(0.1)
+    assert executor.stats()["abandoned"] == 0
+    assert executor.stats()["abandoned_total"] == 1
+
+
+def test_annulation_cooperative():
+    """Avec cancellable=True, la tâche voit son jeton annulé à l'échéance et s'arrête d'elle-même."""
+    executor = BoundedExecutor("test-cancel", max_workers=1, max_queued=10)
+    stopped = threading.Event()
+
+    def boucle(cancel):
+        while not cancel.cancelled:
+            time.sleep(0.01)
+        stopped.set()
+
+    with pytest.raises(TimeoutError):
+        executor.run(boucle, timeout=0.2, cancellable=True)
+
+    assert stopped.wait(1)
+
+
+def test_resultat_partiel_jamais_renvoye():
+    """Tâche qui rend ce qu'elle a une fois son jeton expiré → TimeoutError, pas un résultat partiel."""
+    executor = BoundedExecutor("test-partiel", max_workers=1, max_queued=10)
+
+    def partielle(cancel):
+        while not cancel.cancelled:
+            time.sleep(0.01)
+        return "partiel"
+
+    for _ in range(5):  # l'arrêt de la tâche et l'échéance de l'attente tombent au même instant
+        with pytest.raises(TimeoutError):
+            executor.run(partielle, timeout=0.05, cancellable=True)
+
+
+def test_file_bornee_refuse_au_dela():
+    """File pleine → la tâche est refusée immédiatement au lieu de s'empiler."""
+    executor = BoundedExecutor("test-sature", max_workers=1, max_queued=1)
+    release = threading.Event()
+    executor.submit(release.wait, 5)  # occupe l'unique worker
+    time.sleep(0.05)
+    executor.submit(release.wait, 5)  # remplit la file
+
+    with pytest.raises(ExecutorSaturated) as refused:
+        executor.submit(release.wait, 5)
+
+    assert not isinstance(refused.value, TimeoutError)  # surcharge locale, pas une cible lente
+    assert executor.stats()["rejected"] == 1
+    release.set()
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from core.http_fetch import HomepageFetch
+from analyzers.platform_detector import detect_platform
+from analyzers.security_headers_analyzer import analyze_security_headers
+from analyzers.ssl_analyzer import analyze_ssl
+from api.models import PlatformType
+
+
+def _fake_response(headers=None, text=""):
+    """Crée une fausse réponse HTTP (headers, body, URL finale)."""
+    mock = MagicMock()
+    mock.headers = headers or {}
+    mock.text = text
+    mock.url = "https://www.example.com/"
+    mock.history = []
+    return mock
+
+
+@patch('core.http_fetch.aio.get_text')
+def test_page_accueil_telechargee_une_seule_fois(mock_get):
+    """Plusieurs analyseurs en parallèle sur la même page → une seule requête HTTP."""
+    mock_get.return_value = _fake_response(text="<html>wp-content</html>")
+    homepage = HomepageFetch("example.com")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        pages = list(pool.map(lambda _: homepage.get(), range(8)))
+
+    assert mock_get.call_count == 1
+    assert all(p is pages[0] for p in pages)
+    assert pages[0].verified is True
+    assert pages[0].final_url == "https://www.example.com/"
+
+
+@patch('core.http_fetch.aio.get_text')
+def test_fallback_http_non_verifie(mock_get):
+    """HTTPS injoignable mais HTTP répond → page disponible, mais pas considérée comme vérifiée."""
+    mock_get.side_effect = [Exception("ssl"), Exception("ssl"), _fake_response()]
+
+    page = HomepageFetch("example.com").get()
+
+    assert page is not None
+    assert page.url == "http://example.com"
+    assert page.verified is False
+
+
+@patch('core.tls_probe.socket.create_connection', side_effect=OSError("injoignable"))
+@patch('core.http_fetch.aio.get_text')
+def test_analyseurs_partagent_la_page(mock_get, mock_conn):
+    """Plateforme, Security Headers et HSTS lisent la même réponse : 1 requête au lieu de 3+."""
+    mock_get.return_value = _fake_response(
+        headers={'Strict-Transport-Security': 'max-age=31536000'},
+        text="<html>cdn.shopify.com</html>",
+    )
+    homepage = HomepageFetch("example.com")
+
+    platform = detect_platform("example.com", homepage=homepage)
+    headers_result = analyze_security_headers("example.com", homepage=homepage)
+    analyze_ssl("example.com", homepage=homepage)
+
+    assert platform == PlatformType.SHOPIFY
+    assert headers_result.details["hsts"] == "max-age=31536000"
+    assert mock_get.call_count == 1
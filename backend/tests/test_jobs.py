@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+from core.jobs import JobQueue, new_job, PRIORITY_BATCH
+from db_models import ScanJobRecord, ScanRecord
+from tests.test_batch import _fake_scan
+
+
+def _wait_state(db, scan_id, state, timeout=5):
+    """Attend que le job atteigne l'état donné."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        job = db.get(ScanJobRecord, scan_id)
+        if job.state == state:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job jamais passé à l'état {state}")
+
+
+@patch('core.jobs.ensure_domain_resolves')
+@patch('core.jobs.run_scan', side_effect=_fake_scan)
+def test_scan_soumis_puis_termine(mock_scan, mock_resolves, session_factory):
+    """Soumission immédiate (état queued), puis le worker exécute le scan et l'enregistre."""
+    factory = session_factory
+    db = factory()
+    queue = JobQueue(factory, workers=1)
+
+    job = queue.submit(db, "example.com")
+    assert job.state == "queued"
+
+    queue.start()
+    try:
+        done = _wait_state(db, job.scan_id, "done")
+    finally:
+        queue.stop()
+
+    assert done.attempts == 1
+    assert db.get(ScanRecord, job.scan_id).overall_score == 80
+
+
+@patch('core.jobs.ensure_domain_resolves')
+@patch('core.jobs.run_scan', side_effect=_fake_scan)
+def test_job_en_cours_repris_au_redemarrage(mock_scan, mock_resolves, session_factory):
+    """Un job resté "running" (arrêt brutal du serveur) est remis en file et terminé au redémarrage."""
+    factory = session_factory
+    db = factory()
+    job = new_job("example.com")
+    job.state = "running"
+    job.attempts = 1
+    db.add(job)
+    db.commit()
+
+    queue = JobQueue(factory, workers=1)
+    queue.start()
+    try:
+        done = _wait_state(db, job.scan_id, "done")
+    finally:
+        queue.stop()
+
+    assert done.attempts == 2
+
+
+def test_scans_unitaires_avant_les_lots(session_factory):
+    """Un scan unitaire soumis après un lot passe quand même en premier."""
+    factory = session_factory
+    db = factory()
+    batch_job = new_job("lot.example.com", priority=PRIORITY_BATCH)
+    single_job = new_job("unitaire.example.com")
+    single_job.created_at = datetime.now()
+    db.add_all([batch_job, single_job])
+    db.commit()
+
+    queue = JobQueue(factory, workers=1)
+
+    assert queue._claim() == single_job.scan_id
+    assert queue._claim() == batch_job.scan_id
+    assert queue._claim() is None
+
+
+@patch('core.jobs.ensure_domain_resolves')
+def test_job_supprime_en_cours_worker_continue(mock_resolves, session_factory):
+    """Job supprimé pendant son scan → échec à l'enregistrement, mais le worker traite le job suivant."""
+    factory = session_factory
+    db = factory()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_scan(domain, scan_id=None):
+        if domain == "lent.example.com":
+            started.set()
+            release.wait(5)
+        return _fake_scan(domain, scan_id)
+
+    queue = JobQueue(factory, workers=1)
+    first = queue.submit(db, "lent.example.com")
+    with patch('core.jobs.run_scan', side_effect=slow_scan):
+        queue.start()
+        try:
+            assert started.wait(5)
+            db.delete(db.get(ScanJobRecord, first.scan_id))
+            db.commit()
+            release.set()
+            second = queue.submit(db, "suivant.example.com")
+            done = _wait_state(db, second.scan_id, "done")
+        finally:
+            queue.stop()
+
+    assert done.attempts == 1
+    assert db.get(ScanJobRecord, first.scan_id) is None
@@ -0,0 +1,74 @@
+import dns.resolver
+from unittest.mock import MagicMock, patch
+from core import aio, mail_policies
+from core.aio import TextResponse
+
+
+def _txt_answer(*texts):
+    """Fausse réponse TXT dnspython."""
+    records = []
+    for text in texts:
+        rdata = MagicMock()
+        rdata.strings = [text.encode()]
+        records.append(rdata)
+    return records
+
+
+def _zone(records):
+    """Résolveur factice : TXT publiés dans `records`, NXDOMAIN ailleurs, nœuds intermédiaires vides."""
+    async def resolve(qname, rdtype="A", lifetime=None):
+        if qname in records:
+            return _txt_answer(*records[qname])
+        if any(name.endswith("." + qname) for name in records):
+            raise dns.resolver.NoAnswer()
+        raise dns.resolver.NXDOMAIN()
+    return resolve
+
+
+def test_dkim_sans_domainkey_une_seule_requete():
+    """_domainkey inexistant (NXDOMAIN) → aucun sélecteur testé."""
+    with patch('core.mail_policies.dns_cache.resolve_sweep_async', side_effect=_zone({})) as resolve:
+        result = aio.run(mail_policies.discover_dkim("example.com", ("default", "google", "s1")))
+
+    assert result.selectors == [] and result.complete
+    assert resolve.call_count == 1
+
+
+def test_dkim_selecteurs_trouves_en_parallele():
+    """Sélecteurs publiés → trouvés dans l'ordre de la liste, concurrence bornée."""
+    zone = {
+        "google._domainkey.example.com": ["v=DKIM1; k=rsa; p=MIIB"],
+        "s1._domainkey.example.com": ["k=rsa; p=MIGf"],
+        "old._domainkey.example.com": ["v=DKIM1; k=rsa"],  # pas de clé publique : ignoré
+    }
+    selectors = tuple(f"sel{i}" for i in range(100)) + ("google", "old", "s1")
+
+    with patch('core.mail_policies.dns_cache.resolve_sweep_async', side_effect=_zone(zone)), \
+         patch('core.mail_policies.dns_cache.resolve_async') as shared:
+        result = aio.run(mail_policies.discover_dkim("example.com", selectors, concurrency=10))
+
+    assert result.selectors == ["google", "s1"]
+    assert result.tested == len(selectors) and result.complete
+    shared.assert_not_called()  # balayage hors du cache DNS partagé
+
+
+def test_mta_sts_mx_non_couvert_et_tls_rpt():
+    """Politique MTA-STS lue et comparée aux MX ; TLS-RPT détecté."""
+    zone = {
+        "_mta-sts.example.com": ["v=STSv1; id=20240101"],
+        "_smtp._tls.example.com": ["v=TLSRPTv1; rua=mailto:tls@example.com"],
+    }
+    policy = TextResponse(
+        url="https://mta-sts.example.com/.well-known/mta-sts.txt", status_code=200, headers={},
+        text="version: STSv1\nmode: enforce\nmx: *.mail.example.net\nmax_age: 604800\n", truncated=False,
+    )
+
+    with patch('core.mail_policies.dns_cache.resolve_async', side_effect=_zone(zone)), \
+         patch('core.mail_policies.dns_cache.resolve_sweep_async', side_effect=_zone(zone)), \
+         patch('core.mail_policies.aio.get_text', return_value=policy):
+        result = aio.run(mail_policies.check("example.com", ["mx1.mail.example.net", "backup.example.org"]))
+
+    assert result.evaluated
+    assert result.mta_sts["mode"] == "enforce"
+    assert result.mta_sts["mx_non_couverts"] == ["backup.example.org"]
+    assert result.tls_rpt.startswith("v=TLSRPTv1")
@@ -0,0 +1,21 @@
+from core.matching import PatternAutomaton, SuffixTrie
+
+
+def test_automate_motifs_imbriques():
+    """Motifs qui se chevauchent ou s'incluent : tous trouvés en un seul passage."""
+    automaton = PatternAutomaton((p, p) for p in ["he", "she", "his", "hers"])
+
+    assert automaton.search("uSHErs") == {"he", "she", "hers"}
+    assert automaton.search("ahis") == {"his"}
+    assert automaton.search("rien") == set()
+
+
+def test_trie_suffixe_le_plus_long():
+    """Le suffixe le plus spécifique l'emporte, et seulement sur des labels entiers."""
+    trie = SuffixTrie()
+    trie.add("amazonaws.com", "aws")
+    trie.add("s3.amazonaws.com", "s3")
+
+    assert trie.match("bucket.s3.amazonaws.com.") == "s3"
+    assert trie.match("x.ec2.amazonaws.com") == "aws"
+    assert trie.match("notamazonaws.com") is None
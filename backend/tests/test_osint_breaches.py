@@ -1,11 +1,25 @@
+import asyncio
+import json
+import pytest
 from unittest.mock import patch, MagicMock
 from analyzers.osint_breaches import analyze_osint_breaches
 from api.models import SeverityLevel
+from core.hibp import BreachCatalog, DomainSearch, HibpBusy, TokenBucket
+from core.deadline import Deadline
 
 
-def _mock_hibp(breaches):
+@pytest.fixture(autouse=True)
+def _catalogue_vide():
+    """Chaque test part d'un catalogue HIBP vide, en mémoire seulement."""
+    with patch('core.hibp.catalog', BreachCatalog(path=None)):
+        yield
+
+
+def _mock_hibp(breaches, status_code=200, headers=None):
     """Simule la réponse de l'API HIBP (liste de toutes les fuites publiques)."""
     m = MagicMock()
+    m.status_code = status_code
+    m.headers = headers or {}
     m.json.return_value = breaches
     return m
 
@@ -18,8 +32,8 @@ def _mock_urlhaus(query_status):
 
 
 @patch('analyzers.osint_breaches.settings')
-@patch('analyzers.osint_breaches.requests.post')
-@patch('analyzers.osint_breaches.requests.get')
+@patch('analyzers.osint_breaches.aio.post')
+@patch('analyzers.osint_breaches.aio.get')
 def test_score_100_sans_cle_api_aucune_fuite(mock_get, mock_post, mock_settings):
     """Sans clé API et sans fuite connue → score 100 (LOW), l'invérifiable n'est pas pénalisé."""
     mock_settings.HIBP_API_KEY = None
@@ -35,8 +49,8 @@ def test_score_100_sans_cle_api_aucune_fuite(mock_get, mock_post, mock_settings)
 
 
 @patch('analyzers.osint_breaches.settings')
-@patch('analyzers.osint_breaches.requests.post')
-@patch('analyzers.osint_breaches.requests.get')
+@patch('analyzers.osint_breaches.aio.post')
+@patch('analyzers.osint_breaches.aio.get')
 def test_score_35_si_domaine_source_de_fuite(mock_get, mock_post, mock_settings):
     """Domaine lui-même source d'une fuite HIBP → score 35 (HIGH)."""
     mock_settings.HIBP_API_KEY = None
@@ -58,8 +72,8 @@ def test_score_35_si_domaine_source_de_fuite(mock_get, mock_post, mock_settings)
 
 
 @patch('analyzers.osint_breaches.settings')
-@patch('analyzers.osint_breaches.requests.post')
-@patch('analyzers.osint_breaches.requests.get')
+@patch('analyzers.osint_breaches.aio.post')
+@patch('analyzers.osint_breaches.aio.get')
 def test_score_0_si_malware_et_fuite(mock_get, mock_post, mock_settings):
     """Malware URLhaus + source de fuite HIBP → score 0, CRITIQUE."""
     mock_settings.HIBP_API_KEY = None
@@ -84,3 +98,151 @@ def test_score_0_si_malware_et_fuite(mock_get, mock_post, mock_settings):
 
     assert result.score == 0
     assert result.severity == SeverityLevel.CRITICAL
+
+
+@patch('core.hibp.aio.get')
+def test_catalogue_en_cache_et_indexe_par_domaine(mock_get, tmp_path):
+    """Catalogue téléchargé une fois, relu depuis le disque, puis revalidé par ETag une fois périmé."""
+    mock_get.return_value = _mock_hibp([
+        {"Domain": "forum.example.co.uk", "Name": "Forum"},
+        {"Domain": "example.co.uk", "Name": "Main"},
+        {"Domain": "other.co.uk", "Name": "Other"},
+    ], headers={"etag": '"v1"'})
+    path = str(tmp_path / "hibp.json")
+    catalog = BreachCatalog(path=path)
+
+    matched, total = asyncio.run(catalog.lookup("example.co.uk"))
+    asyncio.run(catalog.lookup("www.example.co.uk"))
+
+    assert [b["Name"] for b in matched] == ["Main", "Forum"]  # domaine exact en tête, pas other.co.uk
+    assert total == 3
+    assert mock_get.call_count == 1
+
+    reloaded = BreachCatalog(path=path, ttl=0)  # nouveau processus, copie disque périmée
+    mock_get.return_value = _mock_hibp(None, status_code=304)
+
+    async def stale_then_revalidated():
+        served = await reloaded.lookup("example.co.uk")
+        await reloaded._refreshing
+        return served
+
+    matched, _ = asyncio.run(stale_then_revalidated())
+
+    assert len(matched) == 2
+    assert mock_get.call_args.kwargs["headers"]["if-none-match"] == '"v1"'
+    assert reloaded.stats()["not_modified"] == 1
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["etag"] == '"v1"'
+
+
+def test_hibp_en_panne_catalogue_perime_servi_sans_attendre(tmp_path):
+    """HIBP en panne : un seul téléchargement en tâche de fond, l'ancien catalogue servi tout de suite, puis pause avant de retenter."""
+    path = str(tmp_path / "hibp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": 0.0, "breaches": [{"Domain": "example.com", "Name": "Old"}]}, f)
+    catalog = BreachCatalog(path=path, ttl=0)
+    calls = []
+
+    async def hibp_down(*args, **kwargs):
+        calls.append(1)
+        await asyncio.sleep(1)
+        raise ConnectionError("HIBP injoignable")
+
+    async def scans():
+        await catalog.lookup("example.com")  # relecture disque
+        start = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*(catalog.lookup("example.com", Deadline(5)) for _ in range(5)))
+        served_in = asyncio.get_running_loop().time() - start
+        with pytest.raises(ConnectionError):
+            await catalog._refreshing
+        await catalog.lookup("example.com")  # dans le délai de pause : pas de nouvel appel
+        return results, served_in
+
+    with patch('core.hibp.aio.get', side_effect=hibp_down):
+        results, served_in = asyncio.run(scans())
+
+    assert served_in < 0.5
+    assert all([b["Name"] for b in matched] == ["Old"] for matched, _ in results)
+    assert len(calls) == 1
+    assert catalog.stats()["failures"] == 1
+    assert catalog.stats()["stale_served"] == 7
+
+
+def test_sans_catalogue_attente_bornee_par_l_echeance():
+    """Aucun catalogue et HIBP qui traîne : le scan abandonne à son échéance au lieu d'attendre le téléchargement."""
+    catalog = BreachCatalog(path=None)
+
+    async def hibp_slow(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    with patch('core.hibp.aio.get', side_effect=hibp_slow):
+        with pytest.raises(TimeoutError):
+            asyncio.run(catalog.lookup("example.com", Deadline(0.2)))
+
+
+def test_seau_a_jetons_attente_prevue():
+    """2 req/s : deux créneaux libres, le 3e attend ~0,5 s, et un appel trop pressé n'est pas mis en file."""
+    bucket = TokenBucket(rate=2, period=1)
+
+    waits = [bucket.reserve() for _ in range(3)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.4 < waits[2] <= 0.5
+    assert 0.9 < bucket.expected_wait() <= 1.0
+    assert bucket.reserve(max_wait=0.1) is None
+
+
+@patch('core.hibp.aio.get')
+def test_recherches_regroupees_et_429_repris(mock_get):
+    """Trois scans du même domaine → une requête ; un 429 est attendu puis rejoué au lieu d'échouer."""
+    mock_get.side_effect = [
+        _mock_hibp(None, status_code=429, headers={"retry-after": "0.05"}),
+        _mock_hibp({"alice@example.com": ["Adobe"]}),
+    ]
+    search = DomainSearch(TokenBucket(rate=10))
+
+    async def three_scans():
+        return await asyncio.gather(*(search.search("example.com", "key") for _ in range(3)))
+
+    results = asyncio.run(three_scans())
+
+    assert results == [{"alice@example.com": ["Adobe"]}] * 3
+    assert mock_get.call_count == 2
+    assert search.coalesced == 2
+    assert search.throttled == 1
+
+
+@patch('analyzers.osint_breaches.settings')
+@patch('analyzers.osint_breaches.aio.post')
+@patch('analyzers.osint_breaches.aio.get')
+def test_file_hibp_saturee_non_penalisant(mock_get, mock_post, mock_settings):
+    """File HIBP pleine jusqu'après l'échéance du scan → emails « non vérifié », module non en erreur."""
+    mock_settings.HIBP_API_KEY = "key"
+    mock_settings.REQUEST_TIMEOUT = 10
+    mock_get.return_value = _mock_hibp([])
+    mock_post.return_value = _mock_urlhaus("no_results")
+    bucket = TokenBucket(rate=1, period=600)
+    bucket.reserve()  # le seul créneau des 10 prochaines minutes est déjà pris
+
+    with patch('core.hibp.domain_search', DomainSearch(bucket)):
+        result = analyze_osint_breaches("example.com", deadline=Deadline(30))
+
+    assert result.score == 100
+    assert result.details["emails_compromis"] == "non vérifié"
+    assert result.details["hibp_attente"] >= 590
+
+
+@patch('core.hibp.aio.get')
+def test_catalogue_suffixe_public_multi_niveaux(mock_get, tmp_path):
+    """Deux associations en .asso.fr ne partagent pas leurs fuites ; dossier du cache créé au besoin."""
+    mock_get.return_value = _mock_hibp([
+        {"Domain": "monclub.asso.fr", "Name": "Club"},
+        {"Domain": "autreclub.asso.fr", "Name": "Autre"},
+    ])
+    path = tmp_path / "cache" / "hibp.json"
+    catalog = BreachCatalog(path=str(path))
+
+    matched, _ = asyncio.run(catalog.lookup("www.monclub.asso.fr"))
+
+    assert [b["Name"] for b in matched] == ["Club"]
+    assert path.exists()
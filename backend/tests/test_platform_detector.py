@@ -0,0 +1,83 @@
+import httpx
+from unittest.mock import patch
+from analyzers.platform_detector import FINGERPRINTS_FILE, identify, load_fingerprints
+from api.models import PlatformType
+from core.http_fetch import HomepageResponse
+
+
+def _page(headers=(), text=""):
+    """Page d'accueil telle que la partage le scan (en-têtes httpx, Set-Cookie répétables)."""
+    return HomepageResponse(
+        url="https://example.com", final_url="https://example.com/", status_code=200,
+        headers=httpx.Headers(list(headers)), text=text, verified=True,
+    )
+
+
+def test_en_tetes_et_cookies_suffisent():
+    """Page vide : en-tête ou cookie propre à la plateforme → reconnue sans lire le HTML."""
+    wix = _page([("X-Wix-Request-Id", "1700000000.123")])
+    presta = _page([("Set-Cookie", "lang=fr; path=/"), ("Set-Cookie", "PrestaShop-a1b2c3=def; path=/")])
+    wordpress = _page([("Link", '<https://example.com/wp-json/>; rel="https://api.w.org/"')])
+    faux_nom = _page([("X-Pingback-Disabled", "1")])
+
+    assert identify(wix) == PlatformType.WIX
+    assert identify(presta) == PlatformType.PRESTASHOP
+    assert identify(wordpress) == PlatformType.WORDPRESS
+    assert identify(faux_nom) == PlatformType.CUSTOM  # nom d'en-tête exact, pas un préfixe
+
+
+def test_cms_prioritaire_sur_hebergeur():
+    """WordPress hébergé chez Netlify → WordPress ; Next.js sur Vercel → Next.js ; rien → custom."""
+    wordpress = _page(
+        [("Server", "Netlify"), ("X-NF-Request-Id", "01H")],
+        '<link href="/wp-content/themes/x.css"><script src="/wp-includes/js/jquery.js"></script>',
+    )
+    nextjs = _page(
+        [("X-Vercel-Id", "cdg1::abc")],
+        '<script id="__NEXT_DATA__"></script><script src="/_next/static/chunks/main.js"></script>',
+    )
+    vercel = _page([("X-Vercel-Id", "cdg1::abc")], "<html>Bonjour</html>")
+
+    assert identify(wordpress) == PlatformType.WORDPRESS
+    assert identify(nextjs) == PlatformType.NEXTJS
+    assert identify(vercel) == PlatformType.VERCEL
+    assert identify(_page(text="<html>Bonjour</html>")) == PlatformType.CUSTOM
+
+
+def test_texte_isole_ne_bat_pas_les_en_tetes():
+    """Un seul texte de CMS dans la page (lien, article) → l'hébergeur reconnu à ses en-têtes l'emporte."""
+    blog = _page([("X-Vercel-Id", "cdg1::abc")], '<a href="https://exemple.fr/wp-content/uploads/guide.pdf">Guide</a>')
+    seul = _page(text='<meta name="generator" content="Hugo 0.120">')
+
+    assert identify(blog) == PlatformType.VERCEL
+    assert identify(seul) == PlatformType.HUGO  # texte isolé, mais aucun autre indice : retenu
+
+
+def test_motifs_generiques_sans_faux_positif():
+    """Cookie de langue, chemins /-/media/, dw.ac et lien vers jimdo.com → aucune plateforme reconnue."""
+    pages = [
+        _page([("Set-Cookie", "frontend_lang=fr_FR; path=/")]),
+        _page([("Set-Cookie", "cart_currency=EUR; path=/")]),
+        _page(text='<img src="/-/media/logo.png">'),
+        _page(text='<script>window.dw.ac = {};</script>'),
+        _page(text='<a href="https://www.jimdo.com/fr/">Comparatif des créateurs de sites</a>'),
+    ]
+
+    assert [identify(page) for page in pages] == [PlatformType.CUSTOM] * len(pages)
+
+
+def test_base_livree_et_debut_de_page_seulement():
+    """Toutes les règles livrées se compilent ; un marqueur au-delà des premiers octets est ignoré."""
+    engine = load_fingerprints(str(FINGERPRINTS_FILE))
+    late = _page(text="x" * 200 + "cdn.shopify.com")
+
+    assert len(engine.rules) >= 30
+    assert all(isinstance(rule.platform, PlatformType) for rule in engine.rules)
+    accents = _page(text="é" * 101 + "cdn.shopify.com")  # 116 caractères, 217 octets
+
+    with patch('analyzers.platform_detector.settings.PLATFORM_BODY_BYTES', 215):
+        assert identify(late) == PlatformType.SHOPIFY
+        assert identify(accents) == PlatformType.CUSTOM  # limite en octets, pas en caractères
+    with patch('analyzers.platform_detector.settings.PLATFORM_BODY_BYTES', 100):
+        assert identify(late) == PlatformType.CUSTOM
+    assert identify(late) == PlatformType.SHOPIFY
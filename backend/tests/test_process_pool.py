@@ -0,0 +1,62 @@
+import os
+import time
+import pytest
+from core.process_pool import ProcessPool
+
+
+def test_resultat_renvoye_par_le_processus():
+    """La tâche s'exécute dans un autre processus et son résultat revient à l'appelant."""
+    pool = ProcessPool(size=1)
+    try:
+        assert pool.run(os.getpid, timeout=10) != os.getpid()
+        assert pool.run(max, 3, 7, timeout=10) == 7
+    finally:
+        pool.shutdown()
+
+
+def test_exception_propagee():
+    """Une exception levée dans le worker est relevée telle quelle chez l'appelant."""
+    pool = ProcessPool(size=1)
+    try:
+        with pytest.raises(ValueError):
+            pool.run(int, "pas un nombre", timeout=10)
+    finally:
+        pool.shutdown()
+
+
+def test_tache_trop_longue_tuee_et_remplacee():
+    """Délai dépassé → TimeoutError sans attendre la fin, processus tué puis remplacé."""
+    pool = ProcessPool(size=1)
+    pool.start()
+    try:
+        first_pid = pool.run(os.getpid, timeout=10)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pool.run(time.sleep, 30, timeout=0.5)
+        assert time.monotonic() - start < 5
+        assert pool.stats()["killed"] == 1
+        assert pool.run(os.getpid, timeout=10) != first_pid
+    finally:
+        pool.shutdown()
+
+
+def test_worker_recycle_apres_max_taches():
+    """Après max_tasks tâches, le worker est remplacé par un processus neuf."""
+    pool = ProcessPool(size=1, max_tasks=2)
+    try:
+        pids = [pool.run(os.getpid, timeout=10) for _ in range(3)]
+        assert pids[0] == pids[1]
+        assert pids[2] != pids[0]
+    finally:
+        pool.shutdown()
+
+
+def test_tache_non_serialisable_ne_bloque_pas_le_worker():
+    """Fonction non sérialisable → erreur immédiate, l'unique worker reste disponible."""
+    pool = ProcessPool(size=1)
+    try:
+        with pytest.raises(Exception):
+            pool.run(lambda: 1, timeout=10)
+        assert pool.run(max, 1, 2, timeout=2) == 2
+    finally:
+        pool.shutdown()
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from unittest.mock import patch
+from core.scanner import ScanRun, run_scan, scan_modules
+from api.models import ModuleResult, PlatformType, SeverityLevel
+
+
+def _fake_module(name, score=100, delay=0.0):
+    """Crée un faux analyseur qui attend `delay` secondes puis renvoie un ModuleResult."""
+    def analyze(domain, deadline=None):
+        time.sleep(delay)
+        return ModuleResult(
+            module_name=name,
+            status="success",
+            severity=SeverityLevel.LOW,
+            score=score,
+            details={},
+        )
+    return analyze
+
+
+def _fake_modules(delay=0.0, slow=None):
+    """Tous les modules du scan remplacés par des faux ; `slow` ne répond jamais à temps."""
+    return [
+        (name, _fake_module(name, delay=2 if name == slow else delay))
+        for name, _ in scan_modules()
+    ]
+
+
+@patch('core.scanner.detect_platform_async', return_value=PlatformType.WORDPRESS)
+def test_modules_executes_en_parallele(mock_platform):
+    """7 modules de 0,3 s chacun → le scan dure ~0,3 s et non ~2,1 s."""
+    with patch('core.scanner.scan_modules', return_value=_fake_modules(delay=0.3)):
+        start = time.monotonic()
+        result = run_scan("example.com")
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert result.overall_score == 100
+    assert result.platform == PlatformType.WORDPRESS
+
+
+@patch('core.scanner.detect_platform_async', return_value=PlatformType.CUSTOM)
+def test_ordre_des_modules_conserve(mock_platform):
+    """Le rapport garde l'ordre historique des modules, quel que soit l'ordre de fin."""
+    with patch('core.scanner.scan_modules', return_value=_fake_modules()):
+        result = run_scan("example.com")
+
+    assert [m.module_name for m in result.modules] == [name for name, _ in scan_modules()]
+
+
+@patch('core.scanner.detect_platform_async', return_value=PlatformType.CUSTOM)
+def test_module_trop_lent_non_evalue(mock_platform):
+    """Un module qui dépasse le délai global → résultat partiel (50, MEDIUM), le scan n'attend pas."""
+    with patch('core.scanner.scan_modules', return_value=_fake_modules(slow="Subdomain Takeover")):
+        start = time.monotonic()
+        result = run_scan("example.com", timeout=0.5)
+        elapsed = time.monotonic() - start
+
+    takeover = next(m for m in result.modules if m.module_name == "Subdomain Takeover")
+    assert elapsed < 2
+    assert takeover.score == 50
+    assert takeover.severity == SeverityLevel.MEDIUM
+    assert "interrompue" in takeover.details["warning"]
+
+
+@patch('core.scanner.detect_platform_async', return_value=PlatformType.CUSTOM)
+def test_flux_dans_l_ordre_de_fin(mock_platform):
+    """Le flux rend chaque module dès qu'il termine : le plus rapide arrive en premier."""
+    modules = [
+        (name, _fake_module(name, delay=0.0 if name == "OSINT Breaches" else 0.3))
+        for name, _ in scan_modules()
+    ]
+
+    async def collect(run):
+        return [name async for name, _ in run.completed()]
+
+    with patch('core.scanner.scan_modules', return_value=modules):
+        order = asyncio.run(collect(ScanRun("example.com")))
+
+    assert order[0] == "OSINT Breaches"
+    assert sorted(order) == sorted(name for name, _ in scan_modules())
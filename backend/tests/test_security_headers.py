@@ -10,7 +10,7 @@ def _fake_response(headers):
     return mock
 
 
-@patch('analyzers.security_headers_analyzer.requests.get')
+@patch('core.http_fetch.aio.get_text')
 def test_score_100_tous_headers_presents(mock_get):
     """Tous les headers de sécurité présents → score 100, aucune recommandation."""
     mock_get.return_value = _fake_response({
@@ -28,7 +28,7 @@ def test_score_100_tous_headers_presents(mock_get):
     assert result.recommendations == []
 
 
-@patch('analyzers.security_headers_analyzer.requests.get')
+@patch('core.http_fetch.aio.get_text')
 def test_score_zero_aucun_header(mock_get):
     """Aucun header de sécurité → score 0, sévérité CRITIQUE."""
     mock_get.return_value = _fake_response({})
@@ -40,7 +40,7 @@ def test_score_zero_aucun_header(mock_get):
     assert len(result.recommendations) == 5  # un par header manquant
 
 
-@patch('analyzers.security_headers_analyzer.requests.get')
+@patch('core.http_fetch.aio.get_text')
 def test_csp_seul_score_25(mock_get):
     """Uniquement CSP présente → score 25 (CSP vaut 25 points)."""
     mock_get.return_value = _fake_response({
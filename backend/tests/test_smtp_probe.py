@@ -0,0 +1,88 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from core import aio
+from core.deadline import Deadline
+from core.smtp_probe import SmtpProbeCache
+
+
+def _smtp(host, port, timeout):
+    """Serveur SMTP factice : seul mx2 répond, sur le port 587 uniquement."""
+    if host != "mx2.hebergeur.net" or port != 587:
+        raise ConnectionRefusedError(f"{host}:{port}")
+    smtp = MagicMock()
+    smtp.getwelcome.return_value = b"220 mx2.hebergeur.net ESMTP"
+    smtp.has_extn.return_value = True
+    return smtp
+
+
+def test_premier_mx_qui_repond_retenu():
+    """MX principal filtré → le secondaire (port 587) répond, le résultat est retenu pour ce serveur."""
+    cache = SmtpProbeCache(ttl=3600, negative_ttl=600)
+
+    with patch('core.smtp_probe.smtplib.SMTP', side_effect=_smtp) as mock_smtp:
+        result = aio.run(cache.probe(["mx1.hebergeur.net", "MX2.hebergeur.net."]))
+
+    assert (result.host, result.port, result.starttls) == ("mx2.hebergeur.net", 587, True)
+    assert mock_smtp.call_count == 4  # deux serveurs × deux ports, en même temps
+
+
+def test_mx_partage_contacte_une_seule_fois():
+    """Deux domaines sur le même MX hébergé → une seule connexion SMTP ; MX injoignable aussi retenu."""
+    cache = SmtpProbeCache(ttl=3600, negative_ttl=600)
+
+    with patch('core.smtp_probe.smtplib.SMTP', side_effect=_smtp) as mock_smtp:
+        first = aio.run(cache.probe(["mx2.hebergeur.net"]))
+        second = aio.run(cache.probe(["mx2.hebergeur.net"]))
+        assert aio.run(cache.probe(["mx1.hebergeur.net"])) is None
+        assert aio.run(cache.probe(["mx1.hebergeur.net"])) is None
+
+    assert first is second
+    assert mock_smtp.call_count == 4  # mx2 : 25 et 587, mx1 : 25 et 587, puis plus rien
+    assert cache.stats()["hits"] == 2
+
+
+def test_port_25_prefere_meme_s_il_repond_apres_587():
+    """Les deux ports répondent, le 587 plus vite → la bannière retenue est toujours celle du port 25."""
+    cache = SmtpProbeCache(ttl=3600, negative_ttl=600)
+
+    def both_ports(host, port, timeout):
+        if port == 25:
+            time.sleep(0.2)
+        smtp = MagicMock()
+        smtp.getwelcome.return_value = f"220 {host} port {port}".encode()
+        smtp.has_extn.return_value = port == 25
+        return smtp
+
+    with patch('core.smtp_probe.smtplib.SMTP', side_effect=both_ports):
+        result = aio.run(cache.probe(["mx.hebergeur.net"]))
+
+    assert (result.port, result.banner, result.starttls) == (25, "220 mx.hebergeur.net port 25", True)
+
+
+def test_executeur_sature_ni_retenu_ni_pris_pour_ports_filtres():
+    """Exécuteur saturé → l'erreur remonte au scan et rien n'est gardé : le scan suivant contacte le serveur."""
+    cache = SmtpProbeCache(ttl=3600, negative_ttl=600)
+
+    with patch('core.smtp_probe.aio.blocking', side_effect=aio.ExecutorSaturated("file pleine")):
+        with pytest.raises(aio.ExecutorSaturated):
+            aio.run(cache.probe(["mx2.hebergeur.net"]))
+
+    with patch('core.smtp_probe.smtplib.SMTP', side_effect=_smtp) as mock_smtp:
+        result = aio.run(cache.probe(["mx2.hebergeur.net"]))
+
+    assert result.port == 587
+    assert mock_smtp.call_count == 2
+
+
+def test_echeance_du_scan_n_est_pas_un_port_filtre():
+    """Serveur qui tarde au-delà de l'échéance du scan → DeadlineExceeded, pas « injoignable »."""
+    cache = SmtpProbeCache(ttl=3600, negative_ttl=600)
+
+    def slow(host, port, timeout):
+        time.sleep(0.5)
+        raise ConnectionRefusedError(f"{host}:{port}")
+
+    with patch('core.smtp_probe.smtplib.SMTP', side_effect=slow):
+        with pytest.raises(TimeoutError):
+            aio.run(cache.probe(["mx1.hebergeur.net"], Deadline(0.3)))
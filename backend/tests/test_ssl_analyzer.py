@@ -1,47 +1,68 @@
-import ssl
 from unittest.mock import patch, MagicMock
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
 from analyzers.ssl_analyzer import analyze_ssl
 from api.models import SeverityLevel
+from core.cert_cache import CertFacts
+from core.tls_probe import TlsProbe
+
+
+def _certificate(not_after, name="example.com"):
+    """Certificat auto-signé expirant à la date donnée (datetime UTC)."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    return (
+        x509.CertificateBuilder()
+        .subject_name(subject).issuer_name(subject).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(not_after - timedelta(days=800)).not_valid_after(not_after)
+        .sign(key, hashes.SHA256())
+    )
 
 
-def _setup_ssl_mocks(cert_not_after, tls_version, hsts_value=None):
+def _setup_ssl_mocks(cert_not_after, tls_version, hsts_value=None, verify_error=None, chain=True):
     """
-    Prépare tous les mocks nécessaires pour analyser un site SSL.
+    Prépare le résultat du handshake unique et la page d'accueil.
     cert_not_after : date d'expiration du certificat au format 'Dec 31 23:59:59 2030 GMT'
     tls_version    : 'TLSv1.3', 'TLSv1.2', 'TLSv1' …
     hsts_value     : valeur du header HSTS si présent, None sinon
+    verify_error   : raison du rejet à la validation locale, None si le certificat est valide
     """
-    mock_ctx = MagicMock()
-    mock_raw_conn = MagicMock()
-    mock_ssock = MagicMock()
-
-    # socket.create_connection() est utilisé comme context manager (with ... as sock)
-    mock_raw_conn.__enter__.return_value = MagicMock()
-
-    # context.wrap_socket() est aussi un context manager (with ... as ssock)
-    mock_ssl_conn = MagicMock()
-    mock_ssl_conn.__enter__.return_value = mock_ssock
-    mock_ctx.wrap_socket.return_value = mock_ssl_conn
-
-    mock_ssock.getpeercert.return_value = {'notAfter': cert_not_after}
-    mock_ssock.version.return_value = tls_version
+    not_after = datetime.strptime(cert_not_after, '%b %d %H:%M:%S %Y GMT').replace(tzinfo=timezone.utc)
+    probe = TlsProbe(
+        version=tls_version,
+        cipher="TLS_AES_256_GCM_SHA384",
+        bits=256,
+        cert=CertFacts.from_chain([_certificate(not_after)]) if chain else None,
+        verify_error=verify_error,
+    )
 
     mock_http = MagicMock()
     mock_http.headers = {'Strict-Transport-Security': hsts_value} if hsts_value else {}
 
-    return mock_ctx, mock_raw_conn, mock_http
+    return probe, mock_http
+
+
+def _patches(probe, mock_http=None, page_error=None, versions=False):
+    """Handshake unique, versions acceptées (aucune par défaut) et page d'accueil."""
+    return (
+        patch('analyzers.ssl_analyzer.tls_probe.probe', return_value=probe),
+        patch('analyzers.ssl_analyzer.tls_probe.accepts', return_value=versions),
+        patch('core.http_fetch.aio.get_text', return_value=mock_http, side_effect=page_error),
+    )
 
 
 def test_score_100_cert_valide_tls13_hsts():
     """Certificat valide loin (2030) + TLSv1.3 + HSTS → score 100."""
-    mock_ctx, mock_conn, mock_http = _setup_ssl_mocks(
+    probe, mock_http = _setup_ssl_mocks(
         'Dec 31 23:59:59 2030 GMT', 'TLSv1.3', 'max-age=31536000'
     )
 
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer.requests.get', return_value=mock_http):
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("example.com")
 
     assert result.score == 100  # 30 (TLS) + 40 (cert valide) + 30 (HSTS)
@@ -50,11 +71,10 @@ def test_score_100_cert_valide_tls13_hsts():
 
 def test_score_reduit_cert_expire():
     """Certificat expiré → recommandation urgente, sévérité HIGH."""
-    mock_ctx, mock_conn, mock_http = _setup_ssl_mocks('Jan 01 00:00:00 2020 GMT', 'TLSv1.3')
+    probe, mock_http = _setup_ssl_mocks('Jan 01 00:00:00 2020 GMT', 'TLSv1.3')
 
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer.requests.get', return_value=mock_http):
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("example.com")
 
     assert result.score == 30  # 30 (TLS) + 0 (cert expiré) + 0 (pas HSTS)
@@ -64,11 +84,10 @@ def test_score_reduit_cert_expire():
 def test_score_reduit_cert_expire_bientot():
     """Certificat expirant dans 15 jours → avertissement, score partiel."""
     expiry_soon = (datetime.now() + timedelta(days=15)).strftime('%b %d %H:%M:%S %Y GMT')
-    mock_ctx, mock_conn, mock_http = _setup_ssl_mocks(expiry_soon, 'TLSv1.3')
+    probe, mock_http = _setup_ssl_mocks(expiry_soon, 'TLSv1.3')
 
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer.requests.get', return_value=mock_http):
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("example.com")
 
     assert result.score == 50  # 30 (TLS) + 20 (expire bientôt) + 0 (pas HSTS)
@@ -77,11 +96,10 @@ def test_score_reduit_cert_expire_bientot():
 
 def test_hsts_non_verifiable_score_rescale_sur_verifiable():
     """HTTPS injoignable pour lire HSTS + TLS/cert parfaits → 70/70 vérifiables → score 100."""
-    mock_ctx, mock_conn, _ = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1.3')
+    probe, _ = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1.3')
 
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer.requests.get', side_effect=Exception("timeout")):
+    p_probe, p_versions, p_page = _patches(probe, page_error=Exception("timeout"))
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("example.com")
 
     assert result.score == 100
@@ -91,18 +109,12 @@ def test_hsts_non_verifiable_score_rescale_sur_verifiable():
 
 
 def test_cert_expire_rejete_au_handshake():
-    """Certificat expiré → le handshake échoue → diagnostic précis, pas d'erreur générique."""
-    error = ssl.SSLCertVerificationError()
-    error.verify_message = "certificate has expired"
-    mock_ctx = MagicMock()
-    mock_ctx.wrap_socket.side_effect = error
-    mock_conn = MagicMock()
-    mock_conn.__enter__.return_value = MagicMock()
-    mock_conn.__exit__.return_value = False  # ne pas avaler l'exception du with
-
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer._fetch_expiry_ignore_validation', side_effect=Exception("inaccessible")):
+    """Certificat expiré → rejeté à la validation → diagnostic précis, pas d'erreur générique."""
+    # date illisible : la chaîne n'a pas pu être lue
+    probe, _ = _setup_ssl_mocks('Jan 01 00:00:00 2020 GMT', 'TLSv1.3', verify_error="certificate has expired", chain=False)
+
+    p_probe, p_versions, p_page = _patches(probe)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("expired.example.com")
 
     assert result.score == 0
@@ -114,17 +126,11 @@ def test_cert_expire_rejete_au_handshake():
 
 def test_cert_invalide_auto_signe():
     """Certificat auto-signé → diagnostic INVALIDE avec recommandation adaptée."""
-    error = ssl.SSLCertVerificationError()
-    error.verify_message = "self-signed certificate"
-    mock_ctx = MagicMock()
-    mock_ctx.wrap_socket.side_effect = error
-    mock_conn = MagicMock()
-    mock_conn.__enter__.return_value = MagicMock()
-    mock_conn.__exit__.return_value = False
-
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer._fetch_expiry_ignore_validation', side_effect=Exception("inaccessible")):
+    # date illisible : la chaîne n'a pas pu être lue
+    probe, _ = _setup_ssl_mocks('Jan 01 00:00:00 2020 GMT', 'TLSv1.3', verify_error="self-signed certificate", chain=False)
+
+    p_probe, p_versions, p_page = _patches(probe)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("selfsigned.example.com")
 
     assert result.score == 0
@@ -134,12 +140,53 @@ def test_cert_invalide_auto_signe():
 
 def test_recommendation_tls_obsolete():
     """Version TLS obsolète → recommandation de mise à jour."""
-    mock_ctx, mock_conn, mock_http = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1')
+    probe, mock_http = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1')
 
-    with patch('analyzers.ssl_analyzer.ssl.create_default_context', return_value=mock_ctx), \
-         patch('analyzers.ssl_analyzer.socket.create_connection', return_value=mock_conn), \
-         patch('analyzers.ssl_analyzer.requests.get', return_value=mock_http):
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page:
         result = analyze_ssl("example.com")
 
     assert result.score == 40  # 0 (TLS obsolète) + 40 (cert valide) + 0 (pas HSTS)
     assert any("TLS" in r or "chiffrement" in r.lower() for r in result.recommendations)
+
+
+def test_chaine_et_protocoles_anciens_rapportes():
+    """Chaîne, suite négociée et versions acceptées (TLS 1.0 encore actif) → détaillées, recommandation dédiée."""
+    probe, mock_http = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1.3', 'max-age=31536000')
+
+    p_probe, _, p_page = _patches(probe, mock_http)
+    with p_probe, p_page, patch('analyzers.ssl_analyzer.tls_probe.accepts',
+                                side_effect=lambda domain, version, *a: version != "TLSv1.1"):
+        result = analyze_ssl("example.com")
+
+    assert result.details["chaine"] == ["example.com"]
+    assert result.details["cipher"] == "TLS_AES_256_GCM_SHA384 (256 bits)"
+    assert result.details["protocoles"]["TLSv1"] == "accepté"
+    assert result.details["protocoles"]["TLSv1.1"] == "refusé"
+    assert any("TLSv1" in r for r in result.recommendations)
+
+
+def test_validation_non_concluante_pas_de_score_zero():
+    """Second avis injoignable → certificat ni déclaré invalide ni pénalisé, le rapport le signale."""
+    probe, mock_http = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1.3', 'max-age=31536000')
+    probe.verify_inconclusive = "candidates exhausted"
+
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page:
+        result = analyze_ssl("example.com")
+
+    assert result.score == 100
+    assert result.details["verification_chaine"].startswith("non concluante")
+
+
+def test_certificat_partage_nombre_seulement():
+    """Certificat déjà présenté par d'autres domaines scannés → le rapport donne leur nombre, jamais leurs noms."""
+    probe, mock_http = _setup_ssl_mocks('Dec 31 23:59:59 2030 GMT', 'TLSv1.3', 'max-age=31536000')
+    seen = ["client-a.fr", "client-b.fr", "example.com"]
+
+    p_probe, p_versions, p_page = _patches(probe, mock_http)
+    with p_probe, p_versions, p_page, patch('analyzers.ssl_analyzer.cert_cache.domains', return_value=seen):
+        result = analyze_ssl("example.com")
+
+    assert result.details["certificat_partage"] == 2
+    assert "client-a.fr" not in str(result.details)
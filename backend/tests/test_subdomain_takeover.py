@@ -1,5 +1,15 @@
+import asyncio
+import json
+import time
+import pytest
 from unittest.mock import patch
-from analyzers.subdomain_takeover_analyzer import detect_subdomain_takeover
+from analyzers.subdomain_takeover_analyzer import (
+    SIGNATURES_FILE, _check_http_body, _resolve_cname, _signatures, detect_subdomain_takeover, load_signatures,
+    load_wordlist,
+)
+from core import aio
+from core.deadline import Deadline
+from tests.test_aio import _streaming_client
 from api.models import SeverityLevel
 
 
@@ -22,7 +32,7 @@ def test_sous_domaine_vulnerable_score_critique(mock_cname, mock_body):
     www.example.com pointe vers GitHub Pages abandonné (orphelin) → CRITIQUE.
     Note : les arguments suivent l'ordre des décorateurs de bas en haut.
     """
-    def cname_effect(subdomain):
+    def cname_effect(subdomain, deadline=None):
         if subdomain == "www.example.com":
             return "example.github.io"
         return None
@@ -43,7 +53,7 @@ def test_sous_domaine_dangling_score_high(mock_cname, mock_body):
     blog.example.com pointe vers WordPress mais service encore actif → HIGH.
     Dangling = CNAME vers service tiers, mais pas orphelin.
     """
-    def cname_effect(subdomain):
+    def cname_effect(subdomain, deadline=None):
         if subdomain == "blog.example.com":
             return "example.wordpress.com"
         return None
@@ -55,3 +65,139 @@ def test_sous_domaine_dangling_score_high(mock_cname, mock_body):
     assert result.score == 90  # 100 - 10 (à surveiller)
     assert result.severity == SeverityLevel.HIGH
     assert len(result.details["at_risk"]) == 1
+
+
+def test_grande_liste_enumeree_en_parallele():
+    """10 000 labels à 20 ms de latence DNS chacun → bien moins d'une minute (~1 s), ordre de la liste conservé."""
+    async def cname_effect(subdomain, deadline=None):
+        await asyncio.sleep(0.02)
+        if subdomain in ("label42.example.com", "label9000.example.com"):
+            return "example.wordpress.com"
+        return None
+
+    wordlist = [f"label{i}" for i in range(10_000)]
+    with patch('analyzers.subdomain_takeover_analyzer._resolve_cname', side_effect=cname_effect), \
+         patch('analyzers.subdomain_takeover_analyzer._check_http_body', return_value=False):
+        start = time.monotonic()
+        result = detect_subdomain_takeover("example.com", wordlist=wordlist)
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 10
+    assert result.details["subdomains_testes"] == 10_000
+    assert [e["subdomain"] for e in result.details["at_risk"]] == ["label42.example.com", "label9000.example.com"]
+
+
+def test_delai_atteint_progression_rapportee():
+    """Échéance atteinte en cours d'énumération → résultat partiel avec le nombre de sous-domaines testés."""
+    async def cname_effect(subdomain, deadline=None):
+        await asyncio.sleep(0.5)
+        return "example.github.io" if subdomain == "label0.example.com" else None
+
+    wordlist = [f"label{i}" for i in range(5_000)]
+    with patch('analyzers.subdomain_takeover_analyzer._resolve_cname', side_effect=cname_effect), \
+         patch('analyzers.subdomain_takeover_analyzer._check_http_body', return_value=True):
+        result = detect_subdomain_takeover("example.com", deadline=Deadline(1.2), wordlist=wordlist)
+
+    assert len(result.details["vulnerable"]) == 1
+    assert 0 < result.details["subdomains_testes"] < 5_000
+    assert result.details["enumeration"].startswith("partielle")
+    assert "échéance du scan" in result.details["enumeration"]  # pas le timeout de 45 s du module
+
+
+def test_interruption_raison_reelle():
+    """Rien trouvé avant l'arrêt → avertissement qui cite ce qui a vraiment arrêté l'énumération."""
+    async def cname_effect(subdomain, deadline=None):
+        await asyncio.sleep(0.5)
+        return None
+
+    wordlist = [f"label{i}" for i in range(5_000)]
+    with patch('analyzers.subdomain_takeover_analyzer._resolve_cname', side_effect=cname_effect):
+        by_scan = detect_subdomain_takeover("example.com", deadline=Deadline(1.2), wordlist=wordlist)
+        with patch('analyzers.subdomain_takeover_analyzer.TAKEOVER_TIMEOUT', 1):
+            by_module = detect_subdomain_takeover("example.com", deadline=Deadline(30), wordlist=wordlist)
+
+    assert by_scan.details["warning"] == "analyse interrompue (échéance du scan, 1s disponibles)"
+    assert by_module.details["warning"] == "analyse interrompue (timeout 1s)"
+
+
+def test_fichier_de_labels(tmp_path):
+    """Liste chargée depuis un fichier : commentaires, lignes vides et doublons ignorés."""
+    path = tmp_path / "labels.txt"
+    path.write_text("# top labels\nwww\n\nAPI\nwww\nmail.\n", encoding="utf-8")
+
+    assert load_wordlist(str(path)) == ("www", "api", "mail")
+
+
+def test_base_de_signatures_compilee():
+    """CNAME reconnu par suffixe (pas par sous-chaîne) et empreinte de page cherchée sans tenir compte de la casse."""
+    db = load_signatures(str(SIGNATURES_FILE))
+    github = db.match_cname("example.github.io.")
+
+    assert github.service == "GitHub Pages"
+    assert db.match_cname("bucket.s3-website-eu-west-1.amazonaws.com").service == "Amazon S3"
+    assert db.match_cname("example.notgithub.io") is None
+    assert db.body_matches("<h1>THERE ISN'T A GITHUB PAGES SITE HERE.</h1>", github)
+    assert not db.body_matches("<h1>NoSuchBucket</h1>", github)
+
+
+def test_format_can_i_take_over_xyz(tmp_path):
+    """Le fichier fingerprints.json de can-i-take-over-xyz se charge tel quel (services non vulnérables ignorés)."""
+    path = tmp_path / "fingerprints.json"
+    path.write_text(json.dumps([
+        {"service": "Agile CRM", "cname": ["agilecrm.com"], "fingerprint": "Sorry, this page is no longer available.",
+         "nxdomain": False, "vulnerable": True},
+        {"service": "Akamai", "cname": [], "fingerprint": "", "nxdomain": False, "vulnerable": False},
+        {"service": "Discourse", "cname": ["trydiscourse.com"], "fingerprint": "NXDOMAIN", "nxdomain": True, "vulnerable": True},
+    ]), encoding="utf-8")
+
+    db = load_signatures(str(path))
+
+    assert [s.service for s in db.signatures] == ["Agile CRM", "Discourse"]
+    assert db.match_cname("x.trydiscourse.com").fingerprints == ()
+
+
+def test_page_coupee_des_que_l_empreinte_est_vue():
+    """Empreinte GitHub Pages à cheval sur les morceaux 2 et 3 d'une page de 1 000 morceaux → lecture arrêtée au 3e."""
+    sent = []
+    chunks = [b"<html>" + b" " * 1000, b"There isn't a GitHub ", b"Pages site here</html>"] + [b" " * 1024] * 1000
+    client = _streaming_client(chunks, sent)
+    github = _signatures().match_cname("example.github.io")
+
+    with patch.object(aio.engine, 'client', return_value=client):
+        orphan = aio.run(_check_http_body("www.example.com", github))
+
+    assert orphan is True
+    assert len(sent) == 3
+
+
+@patch('analyzers.subdomain_takeover_analyzer._check_http_body', return_value=True)
+@patch('analyzers.subdomain_takeover_analyzer._resolve_cname')
+def test_joker_dns_regroupe(mock_cname, mock_body):
+    """*.example.com → app.herokuapp.com : une seule entrée *.example.com et une seule sonde HTTP,
+    les sous-domaines au CNAME propre restent évalués à part."""
+    def cname_effect(subdomain, deadline=None):
+        if subdomain == "blog.example.com":
+            return "example.wordpress.com"
+        return "app.herokuapp.com"  # tout le reste résout via le joker
+
+    mock_cname.side_effect = cname_effect
+
+    result = detect_subdomain_takeover("example.com")
+
+    assert result.details["wildcard_dns"] == ["app.herokuapp.com"]
+    assert [e["subdomain"] for e in result.details["vulnerable"]] == ["*.example.com", "blog.example.com"]
+    assert result.details["regroupes_joker"] == result.details["subdomains_testes"] - 1
+    assert mock_body.call_count == 2
+
+
+def test_cname_cache_des_balayages_et_delai_borne():
+    """Requête CNAME dans le cache des balayages, délai borné par l'échéance ; échéance passée → TimeoutError."""
+    answer = [type("Rdata", (), {"target": "example.github.io."})()]
+    with patch('core.dns_cache.resolve_sweep_async', return_value=answer) as sweep, \
+         patch('core.dns_cache.resolve_async') as shared:
+        assert aio.run(_resolve_cname("blog.example.com", Deadline(2))) == "example.github.io"
+        with pytest.raises(TimeoutError):
+            aio.run(_resolve_cname("blog.example.com", Deadline(0)))
+
+    assert 0 < sweep.call_args.kwargs["lifetime"] <= 2
+    shared.assert_not_called()
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+import warnings
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.x509.oid import AuthorityInformationAccessOID, ExtendedKeyUsageOID, NameOID
+from cryptography.x509.verification import Store
+
+from core import tls_probe
+from core.cert_cache import CertCache
+from core.tls_probe import validate
+from tests.test_ssl_analyzer import _certificate
+
+
+def test_validation_locale_termes_openssl():
+    """Chaîne lue sans validation → raison du rejet dans les termes d'OpenSSL."""
+    now = datetime.now(timezone.utc)
+
+    assert validate([], "example.com") == "no certificate presented"
+    assert validate([_certificate(now - timedelta(days=1))], "example.com") == "certificate has expired"
+    assert validate([_certificate(now + timedelta(days=90))], "example.com") == "self-signed certificate"
+
+
+def test_versions_testees_en_parallele():
+    """Une connexion par version ; version non testable ou délai dépassé → None, pas d'erreur."""
+    answers = {"TLSv1": False, "TLSv1.1": None, "TLSv1.2": True, "TLSv1.3": TimeoutError()}
+
+    def accepts(domain, version, *args):
+        answer = answers[version]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    with patch("core.tls_probe.accepts", side_effect=accepts):
+        versions = tls_probe.aio.run(tls_probe.enumerate_versions("example.com"))
+
+    assert versions == {"TLSv1": False, "TLSv1.1": None, "TLSv1.2": True, "TLSv1.3": None}
+
+
+def test_second_avis_muet_sans_verdict():
+    """Second handshake en échec (délai, connexion refusée) → None (non concluant), pas « invalide »."""
+    with patch("core.tls_probe.socket.create_connection", side_effect=TimeoutError("timed out")):
+        assert tls_probe._openssl_accepts("example.com", 443, None) is None
+    with patch("core.tls_probe.socket.create_connection", side_effect=ConnectionRefusedError()):
+        assert tls_probe._openssl_accepts("example.com", 443, None) is None
+
+
+def test_chaine_api_publique_et_magasin_sans_avertissement():
+    """Chaîne lue par l'API publique si elle existe, sinon le certificat seul ; certifi chargé sans alerte."""
+    class Socket:
+        def getpeercert(self, binary_form=False):
+            return b"feuille"
+
+    class SocketRecent(Socket):
+        def get_unverified_chain(self):
+            return [b"feuille", b"intermediaire"]
+
+    assert tls_probe._peer_chain(Socket()) == [b"feuille"]
+    assert tls_probe._peer_chain(SocketRecent()) == [b"feuille", b"intermediaire"]
+    tls_probe._trust_store.cache_clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        tls_probe._trust_store()
+
+
+def _ca_chain():
+    """Autorité racine → intermédiaire (adresse AIA) → certificat de www.example.com."""
+    now = datetime.now(timezone.utc)
+
+    def build(subject, issuer, key, signing_key, ca, extensions=()):
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, subject)]))
+            .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer)]))
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=90))
+            .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+            .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(signing_key.public_key()), critical=False)
+            .add_extension(x509.KeyUsage(
+                digital_signature=not ca, content_commitment=False, key_encipherment=False,
+                data_encipherment=False, key_agreement=False, key_cert_sign=ca, crl_sign=ca,
+                encipher_only=False, decipher_only=False,
+            ), critical=True)
+        )
+        for extension in extensions:
+            builder = builder.add_extension(extension, critical=False)
+        return builder.sign(signing_key, hashes.SHA256())
+
+    root_key, inter_key, leaf_key = (ec.generate_private_key(ec.SECP256R1()) for _ in range(3))
+    root = build("Racine de test", "Racine de test", root_key, root_key, True)
+    intermediate = build("Intermediaire de test", "Racine de test", inter_key, root_key, True)
+    leaf = build("www.example.com", "Intermediaire de test", leaf_key, inter_key, False, (
+        x509.SubjectAlternativeName([x509.DNSName("www.example.com")]),
+        x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]),
+        x509.AuthorityInformationAccess([x509.AccessDescription(
+            AuthorityInformationAccessOID.CA_ISSUERS, x509.UniformResourceIdentifier("http://ca.test/inter.der"),
+        )]),
+    ))
+    return root, intermediate, leaf
+
+
+def test_intermediaire_telecharge_par_aia():
+    """Serveur qui n'envoie que son certificat → intermédiaire récupéré par AIA, valide sans second handshake."""
+    root, intermediate, leaf = _ca_chain()
+    response = MagicMock(content=intermediate.public_bytes(Encoding.DER))
+    tls_probe._aia_cache.clear()
+
+    with patch("core.tls_probe._trust_anchors", return_value=(root,)), \
+         patch("core.tls_probe._trust_store", return_value=Store([root])), \
+         patch("core.tls_probe._root_names", return_value=frozenset([root.subject])), \
+         patch("core.tls_probe.aio.get", return_value=response) as get, \
+         patch("core.tls_probe._openssl_accepts") as second:
+        assert validate([leaf], "www.example.com") is not None  # intermédiaire absent
+        assert tls_probe.verify_chain([leaf], "www.example.com") is None
+        assert tls_probe.verify_chain([leaf], "www.example.com") is None
+
+    assert get.call_count == 1  # intermédiaire gardé pour les sites suivants
+    second.assert_not_called()
+
+
+def test_second_avis_injoignable_non_concluant_et_non_retenu():
+    """Chaîne incomplète sans AIA et second handshake en échec → non concluant, revalidé au scan suivant."""
+    root, _, leaf = _ca_chain()
+    cache = CertCache()
+    der = leaf.public_bytes(Encoding.DER)
+    verify = lambda chain: tls_probe.verify_chain(chain, "www.example.com")
+
+    with patch("core.tls_probe._trust_store", return_value=Store([root])), \
+         patch("core.tls_probe.complete_chain", side_effect=lambda chain, deadline=None: chain), \
+         patch("core.tls_probe._openssl_accepts", return_value=None) as second:
+        for _ in range(2):
+            with pytest.raises(tls_probe.VerificationInconclusive):
+                cache.inspect([der], "www.example.com", verify)
+
+    assert second.call_count == 2  # aucun verdict « invalide » gardé en cache
+    assert cache.facts(der).subject == "www.example.com"
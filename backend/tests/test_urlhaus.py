@@ -0,0 +1,87 @@
+import time
+from unittest.mock import patch
+from analyzers.osint_breaches import analyze_osint_breaches
+from core.urlhaus import HostSnapshot, UrlhausFeed, build_snapshot
+
+
+def _download(body: bytes):
+    """Téléchargement factice : écrit le corps dans le fichier demandé, comme aio.download."""
+    async def download(url, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(body)
+        return len(body)
+    return download
+
+
+def test_instantane_formats_urlhaus(tmp_path):
+    """Hostfile, CSV et liste d'URL : seuls les domaines listés sont reconnus."""
+    (tmp_path / "hostfile.txt").write_text("# URLhaus Host file\n127.0.0.1\tmalware.example.com\n")
+    (tmp_path / "online.csv").write_text(
+        '# id,dateadded,url,url_status\n'
+        '"1","2026-10-01","http://Bad.Example.org/payload.exe","online"\n'
+    )
+    (tmp_path / "urls.txt").write_text("https://evil.test:8080/x\n")
+    output = tmp_path / "urlhaus.bin"
+
+    count = build_snapshot([str(tmp_path / n) for n in ("hostfile.txt", "online.csv", "urls.txt")], str(output))
+    snapshot = HostSnapshot(str(output))
+
+    assert count == 3
+    assert "malware.example.com" in snapshot
+    assert "bad.example.org" in snapshot
+    assert "evil.test" in snapshot
+    assert "example.com" not in snapshot
+
+
+def test_recherche_sans_aller_retour_reseau(tmp_path):
+    """100 000 domaines listés : recherche en quelques microsecondes, sans toucher au disque ni au réseau."""
+    source = tmp_path / "hosts.txt"
+    source.write_text("".join(f"0.0.0.0 host{i}.test\n" for i in range(100_000)))
+    build_snapshot([str(source)], str(tmp_path / "urlhaus.bin"))
+    feed = UrlhausFeed(str(tmp_path / "urlhaus.bin"), "http://unused", 3600)
+    feed.lookup("warmup.test")
+
+    start = time.perf_counter()
+    hits = sum(feed.lookup(f"host{i}.test") for i in range(0, 100_000, 10))
+    elapsed = (time.perf_counter() - start) / 10_000
+
+    assert hits == 10_000
+    assert elapsed < 20e-6
+
+
+@patch('analyzers.osint_breaches.settings')
+@patch('analyzers.osint_breaches.aio.post')
+@patch('core.hibp.catalog.lookup', return_value=([], 0))
+def test_osint_utilise_l_instantane_rafraichi(mock_catalog, mock_post, mock_settings, tmp_path):
+    """Instantané téléchargé par le rafraîchissement : domaine absent → aucun appel à l'API URLhaus."""
+    mock_settings.HIBP_API_KEY = None
+    feed = UrlhausFeed(str(tmp_path / "urlhaus.bin"), "https://urlhaus.abuse.ch/downloads/hostfile/", 3600)
+
+    with patch('core.urlhaus.aio.download', side_effect=_download(b"127.0.0.1\tmalware.example.com\n")):
+        feed.refresh()
+    with patch('core.urlhaus.feed', feed):
+        result = analyze_osint_breaches("example.com")
+
+    assert feed.lookup("malware.example.com") is True
+    assert result.details["malware_urlhaus"] == "Non référencé"
+    mock_post.assert_not_called()
+
+
+def test_instantane_rafraichi_pris_en_compte(tmp_path):
+    """Instantané déjà ouvert puis remplacé (rafraîchissement ou autre processus) → la nouvelle liste est lue."""
+    path = str(tmp_path / "urlhaus.bin")
+    feed = UrlhausFeed(path, "https://urlhaus.abuse.ch/downloads/hostfile/", 3600)
+    with patch('core.urlhaus.aio.download', side_effect=_download(b"0.0.0.0 old.test\n")):
+        feed.refresh()
+    assert feed.lookup("old.test") is True
+
+    with patch('core.urlhaus.aio.download', side_effect=_download(b"0.0.0.0 new.test\n")):
+        feed.refresh()
+    assert feed.lookup("new.test") is True and feed.lookup("old.test") is False
+
+    source = tmp_path / "hosts.txt"
+    source.write_text("0.0.0.0 other.test\n")
+    build_snapshot([str(source)], path)  # reconstruit ailleurs, sans passer par ce feed
+    assert feed.lookup("other.test") is False  # vérifié au plus toutes les RELOAD_CHECK secondes
+    with patch('core.urlhaus.RELOAD_CHECK', 0):
+        assert feed.lookup("other.test") is True
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from whois.exceptions import WhoisQuotaExceededError
+from analyzers.domain_expiration import analyze_domain_expiration
+from core.whois_cache import WhoisCache
+from core.whois_dispatch import WhoisDispatcher, WhoisUnavailable
+
+
+def _fake_whois(delay, active, peak):
+    """WHOIS simulé : note le nombre max de requêtes simultanées par extension."""
+    lock = threading.Lock()
+
+    def query(domain, **kwargs):
+        tld = domain.rsplit(".", 1)[-1]
+        with lock:
+            active[tld] = active.get(tld, 0) + 1
+            peak[tld] = max(peak.get(tld, 0), active[tld])
+        time.sleep(delay)
+        with lock:
+            active[tld] -= 1
+        return MagicMock(text="")
+    return query
+
+
+def test_connexions_bornees_par_registre():
+    """Lot de .fr et de .com : au plus 2 requêtes simultanées par registre, les deux registres en parallèle."""
+    active, peak = {}, {}
+    dispatcher = WhoisDispatcher(concurrency=2, rate_per_minute=600)
+    domains = [f"site{i}.fr" for i in range(8)] + [f"site{i}.com" for i in range(8)]
+
+    async def batch():
+        await asyncio.gather(*(dispatcher.lookup(d) for d in domains))
+
+    with patch('core.whois_dispatch.whois.whois', side_effect=_fake_whois(0.05, active, peak)):
+        start = time.monotonic()
+        asyncio.run(batch())
+        elapsed = time.monotonic() - start
+
+    assert peak == {"fr": 2, "com": 2}
+    assert elapsed < 0.4  # 4 vagues de 50 ms, registres traités en même temps
+    stats = dispatcher.stats()
+    assert stats["fr"]["lookups"] == 8
+    assert stats["fr"]["latency_ms"] >= 50
+
+
+@patch('core.whois_dispatch.BACKOFF', 0.01)
+def test_erreur_reseau_et_quota_retentes():
+    """Connexion coupée puis quota dépassé : retentés avec attente, le registre est mis en pause."""
+    answer = MagicMock(text="")
+    dispatcher = WhoisDispatcher(concurrency=1, rate_per_minute=600, attempts=3)
+
+    with patch('core.whois_dispatch.whois.whois',
+               side_effect=[ConnectionResetError(), WhoisQuotaExceededError("quota"), answer]):
+        with patch('core.whois_dispatch.THROTTLE_PAUSE', 0):
+            result = asyncio.run(dispatcher.lookup("example.fr"))
+
+    stats = dispatcher.stats()["fr"]
+    assert result is answer
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 1
+    assert stats["failures"] == 0
+
+
+@patch('core.whois_dispatch.BACKOFF', 0.01)
+def test_registre_injoignable_apres_tentatives():
+    """Connexion coupée à chaque tentative → WhoisUnavailable, rapporté « non disponible » (50), pas une erreur."""
+    dispatcher = WhoisDispatcher(concurrency=1, rate_per_minute=600, attempts=2)
+
+    with patch('core.whois_dispatch.whois.whois', side_effect=ConnectionResetError()):
+        with pytest.raises(WhoisUnavailable):
+            asyncio.run(dispatcher.lookup("example.fr"))
+        with patch('core.whois_dispatch.dispatcher', dispatcher), \
+             patch('core.whois_cache.cache', WhoisCache()):
+            result = analyze_domain_expiration("example.fr")
+
+    assert (result.status, result.score) == ("warning", 50)
+    assert result.details["expiration_date"] == "non disponible (registre WHOIS .fr injoignable)"
+    assert dispatcher.stats()["fr"]["failures"] == 2
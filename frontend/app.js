@@ -214,7 +214,7 @@ function buildLoading() {
       <div class="mod-loading">
         ${MOD_NAMES.map((name, i) => {
           const isDone   = done.includes(i);
-          const isActive = !isDone && done.length === i;
+          const isActive = !isDone;  // tous les modules tournent en parallèle
           return `<div class="mod-row ${isDone ? 'done' : isActive ? 'active' : ''}">
             <span class="mod-icon">${isDone ? IC.check : isActive ? '<span class="spin-sm">⟳</span>' : '·'}</span>
             <span>${h(name)}</span>
@@ -510,11 +510,16 @@ async function onScanSubmit(e) {
 
     const reader = resp.body.getReader();
     const dec    = new TextDecoder();
+    let buf      = '';
 
     outer: while (true) {
       const { done, value } = await reader.read();
       if (done) break;
-      for (const line of dec.decode(value).split('\n')) {
+      // un évènement (résultat d'un module) peut arriver en plusieurs morceaux
+      buf += dec.decode(value, { stream: true });
+      const lines = buf.split('\n');
+      buf = lines.pop();
+      for (const line of lines) {
         if (!line.startsWith('data: ')) continue;
         const raw = line.slice(6).trim();
         let evt;
@@ -527,10 +532,11 @@ async function onScanSubmit(e) {
           render();
           break outer;
         }
-        if (evt.step !== undefined) {
-          S.loadingStep = evt.step;
+        if (evt.module) {
+          // modules rendus dans leur ordre de fin, pas dans l'ordre de la liste
+          S.loadingStep = `${evt.step} terminé`;
           S.loadingProgress = evt.progress;
-          S.loadingDone = [...Array(evt.progress).keys()];
+          S.loadingDone = [...S.loadingDone, MOD_NAMES.indexOf(evt.step)];
           render();
         }
       }